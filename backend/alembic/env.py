@@ -19,7 +19,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from app.core.config import settings
 from app.db.base_class import Base
 
-from app.db.models import User 
+from app.db.models import EmailMessage, OutboxCursor, OutboxEvent, RefreshTokenFamily, User, UserTombstone 
 
 
 # =======================================================================================================
@@ -27,6 +27,11 @@ from app.db.models import User
 # =======================================================================================================
 
 _ = User 
+_ = RefreshTokenFamily
+_ = EmailMessage
+_ = OutboxEvent
+_ = OutboxCursor
+_ = UserTombstone
 
 config = context.config
 
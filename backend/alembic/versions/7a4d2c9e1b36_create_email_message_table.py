@@ -0,0 +1,60 @@
+"""create_email_message_table
+
+Revision ID: 7a4d2c9e1b36
+Revises: e5b2f9c4d718
+Create Date: 2026-10-17 14:38:05.512907
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = '7a4d2c9e1b36'
+down_revision: Union[str, None] = 'e5b2f9c4d718'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient', sa.String(length=255), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=16), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_email_message_due',
+        'email_message',
+        ['next_attempt_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+        sqlite_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_message_due', table_name='email_message')
+    op.drop_table('email_message')
@@ -0,0 +1,80 @@
+"""add_user_search_indexes
+
+Revision ID: a3c9e1f27b54
+Revises: 595de6c503ca
+Create Date: 2026-10-16 10:12:41.318207
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = 'a3c9e1f27b54'
+down_revision: Union[str, None] = '595de6c503ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+# Índices para os filtros de GET /users. O B-tree ix_user_full_name continua servindo à ordenação
+# por full_name, mas não a buscas por substring: para ILIKE '%termo%' o PostgreSQL usa o GIN de
+# trigramas (pg_trgm). Em outros bancos (SQLite nos testes) o índice de trigramas é omitido.
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_postgresql = op.get_context().dialect.name == 'postgresql'
+
+    op.create_index(
+        'ix_user_email_lower',
+        'user',
+        [sa.func.lower(sa.column('email')).label('email_lower')],
+        unique=False,
+        postgresql_ops={'email_lower': 'varchar_pattern_ops'},
+    )
+    op.create_index(
+        'ix_user_inactive_id',
+        'user',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('is_active = false'),
+        sqlite_where=sa.text('is_active = 0'),
+    )
+    op.create_index(
+        'ix_user_superuser_id',
+        'user',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('is_superuser = true'),
+        sqlite_where=sa.text('is_superuser = 1'),
+    )
+    if is_postgresql:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_user_full_name_trgm',
+            'user',
+            ['full_name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'full_name': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'postgresql':
+        op.drop_index('ix_user_full_name_trgm', table_name='user')
+    op.drop_index('ix_user_superuser_id', table_name='user')
+    op.drop_index('ix_user_inactive_id', table_name='user')
+    op.drop_index('ix_user_email_lower', table_name='user')
@@ -0,0 +1,47 @@
+"""add_refresh_token_family_prune_columns
+
+Revision ID: a9d4e6b1c352
+Revises: f3a8c1d5b742
+Create Date: 2026-10-17 21:14:36.208517
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = 'a9d4e6b1c352'
+down_revision: Union[str, None] = 'f3a8c1d5b742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+# Expurgo de famílias de refresh token: revoked_at marca quando a família foi revogada e os
+# índices em expires_at/revoked_at servem à busca do lote a remover. As famílias já revogadas
+# recebem o instante da migração (a carência conta a partir dele).
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_token_family', sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(sa.text('UPDATE refresh_token_family SET revoked_at = CURRENT_TIMESTAMP WHERE revoked'))
+    op.create_index(op.f('ix_refresh_token_family_revoked_at'), 'refresh_token_family', ['revoked_at'], unique=False)
+    op.create_index(op.f('ix_refresh_token_family_expires_at'), 'refresh_token_family', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_token_family_expires_at'), table_name='refresh_token_family')
+    op.drop_index(op.f('ix_refresh_token_family_revoked_at'), table_name='refresh_token_family')
+    op.drop_column('refresh_token_family', 'revoked_at')
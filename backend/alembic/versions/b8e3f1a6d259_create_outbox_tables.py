@@ -0,0 +1,54 @@
+"""create_outbox_tables
+
+Revision ID: b8e3f1a6d259
+Revises: 7a4d2c9e1b36
+Create Date: 2026-10-17 16:21:43.094118
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = 'b8e3f1a6d259'
+down_revision: Union[str, None] = '7a4d2c9e1b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_event',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('topic', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('outbox_cursor',
+    sa.Column('sink', sa.String(length=64), nullable=False),
+    sa.Column('last_offset', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('sink')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('outbox_cursor')
+    op.drop_table('outbox_event')
@@ -0,0 +1,63 @@
+"""add_user_change_seq_and_tombstones
+
+Revision ID: d7f2a4c8e913
+Revises: b8e3f1a6d259
+Create Date: 2026-10-17 18:02:11.417306
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = 'd7f2a4c8e913'
+down_revision: Union[str, None] = 'b8e3f1a6d259'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_sqlite = op.get_context().dialect.name == 'sqlite'
+    if not is_sqlite:
+        op.execute(sa.schema.CreateSequence(sa.Sequence('user_change_seq')))
+    # A coluna entra anulável, é preenchida com a sequência (no SQLite, com o id) e só então
+    # (fora do SQLite) ganha NOT NULL.
+    op.add_column('user', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    if is_sqlite:
+        op.execute(sa.text('UPDATE "user" SET change_seq = id'))
+    else:
+        op.execute(sa.text('UPDATE "user" SET change_seq = nextval(\'user_change_seq\')'))
+        op.alter_column('user', 'change_seq', existing_type=sa.BigInteger(), nullable=False)
+    op.create_index(op.f('ix_user_change_seq'), 'user', ['change_seq'], unique=False)
+    op.create_table('user_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_tombstone_change_seq'), 'user_tombstone', ['change_seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_tombstone_change_seq'), table_name='user_tombstone')
+    op.drop_table('user_tombstone')
+    op.drop_index(op.f('ix_user_change_seq'), table_name='user')
+    op.drop_column('user', 'change_seq')
+    if op.get_context().dialect.name != 'sqlite':
+        op.execute(sa.schema.DropSequence(sa.Sequence('user_change_seq')))
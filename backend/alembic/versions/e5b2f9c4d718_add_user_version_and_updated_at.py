@@ -0,0 +1,49 @@
+"""add_user_version_and_updated_at
+
+Revision ID: e5b2f9c4d718
+Revises: c41d7e8a2f63
+Create Date: 2026-10-17 09:14:52.301846
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = 'e5b2f9c4d718'
+down_revision: Union[str, None] = 'c41d7e8a2f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    # O SQLite não aceita ADD COLUMN com default não constante: a coluna entra anulável,
+    # é preenchida e só então (fora do SQLite) ganha NOT NULL e o default now().
+    op.add_column('user', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(sa.text('UPDATE "user" SET updated_at = CURRENT_TIMESTAMP'))
+    if op.get_context().dialect.name != 'sqlite':
+        op.alter_column(
+            'user', 'updated_at',
+            existing_type=sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'updated_at')
+    op.drop_column('user', 'version')
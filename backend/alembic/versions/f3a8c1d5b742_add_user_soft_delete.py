@@ -0,0 +1,102 @@
+"""add_user_soft_delete
+
+Revision ID: f3a8c1d5b742
+Revises: d7f2a4c8e913
+Create Date: 2026-10-17 19:37:05.882143
+
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# =======================================================================================================
+# --- Revisão e Identificadores ---                                                                 #####
+# =======================================================================================================
+
+revision: str = 'f3a8c1d5b742'
+down_revision: Union[str, None] = 'd7f2a4c8e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# =======================================================================================================
+# --- Upgrade e Downgrade do Alembic ---                                                            #####
+# =======================================================================================================
+# Soft delete: coluna deleted_at e índices parciais. A unicidade do email e os índices de busca
+# passam a cobrir só as linhas não removidas (deleted_at IS NULL); ix_user_deleted_at cobre só
+# as removidas, na ordem em que o expurgo as consome.
+
+def _drop_search_indexes() -> None:
+    op.drop_index('ix_user_superuser_id', table_name='user')
+    op.drop_index('ix_user_inactive_id', table_name='user')
+    op.drop_index('ix_user_email_lower', table_name='user')
+    op.drop_index('ix_user_email', table_name='user')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    _drop_search_indexes()
+    op.create_index(
+        'ix_user_email', 'user', ['email'], unique=True,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+        sqlite_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_user_email_lower',
+        'user',
+        [sa.func.lower(sa.column('email')).label('email_lower')],
+        unique=False,
+        postgresql_ops={'email_lower': 'varchar_pattern_ops'},
+        postgresql_where=sa.text('deleted_at IS NULL'),
+        sqlite_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_user_inactive_id', 'user', ['id'], unique=False,
+        postgresql_where=sa.text('is_active = false AND deleted_at IS NULL'),
+        sqlite_where=sa.text('is_active = 0 AND deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_user_superuser_id', 'user', ['id'], unique=False,
+        postgresql_where=sa.text('is_superuser = true AND deleted_at IS NULL'),
+        sqlite_where=sa.text('is_superuser = 1 AND deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_user_deleted_at', 'user', ['deleted_at'], unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+        sqlite_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Sem soft delete, as linhas removidas seriam usuários visíveis (e poderiam repetir emails
+    # recadastrados): elas são expurgadas antes de restaurar o índice único global.
+    op.execute(sa.text('DELETE FROM "user" WHERE deleted_at IS NOT NULL'))
+    op.drop_index('ix_user_deleted_at', table_name='user')
+    _drop_search_indexes()
+    op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=True)
+    op.create_index(
+        'ix_user_email_lower',
+        'user',
+        [sa.func.lower(sa.column('email')).label('email_lower')],
+        unique=False,
+        postgresql_ops={'email_lower': 'varchar_pattern_ops'},
+    )
+    op.create_index(
+        'ix_user_inactive_id', 'user', ['id'], unique=False,
+        postgresql_where=sa.text('is_active = false'),
+        sqlite_where=sa.text('is_active = 0'),
+    )
+    op.create_index(
+        'ix_user_superuser_id', 'user', ['id'], unique=False,
+        postgresql_where=sa.text('is_superuser = true'),
+        sqlite_where=sa.text('is_superuser = 1'),
+    )
+    op.drop_column('user', 'deleted_at')
@@ -0,0 +1,48 @@
+# app/api/conditional.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import List, Optional
+
+from app.core.user_response_cache import versions_from_etags
+
+# =======================================================================================================
+# --- Requisições Condicionais (ETag) ---                                                           #####
+# =======================================================================================================
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Compara o ETag com uma lista de If-None-Match (comparação fraca, RFC 9110 §13.1.2):
+    `*` casa com qualquer representação existente.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque_tag(candidate) == _opaque_tag(etag) for candidate in header.split(","))
+
+
+def if_match_tags(header: Optional[str]) -> Optional[List[str]]:
+    """
+    ETags fortes de um If-Match (comparação forte, RFC 9110 §13.1.1: ETags fracos nunca casam).
+    Retorna None quando não há pré-condição (cabeçalho ausente ou `*`).
+    """
+    if not header or header.strip() == "*":
+        return None
+    return [tag for tag in (candidate.strip() for candidate in header.split(",")) if tag and not tag.startswith("W/")]
+
+
+def expected_user_versions(user_id: int, if_match: Optional[str]) -> Optional[List[int]]:
+    """
+    Versões aceitas pelo If-Match para a atualização otimista do usuário (None = incondicional).
+    Uma lista vazia (nenhum ETag válido) faz a atualização falhar com 412.
+    """
+    tags = if_match_tags(if_match)
+    return None if tags is None else versions_from_etags(user_id, tags)
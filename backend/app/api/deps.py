@@ -4,19 +4,20 @@
 # --- Importações ---                                                            =====
 # ====================================================================================
 
-from typing import Generator
+import sys
+from typing import Any, AsyncGenerator, Callable, Generator, Optional, TypeVar, Union
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError
-from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import SessionLocal
-from app.core import security
+from app.db.routing import CLIENT_KEY, client_key, read_from_primary
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.core import principal_cache, security
 from app.core.config import settings
 from app.db.models.user import User as UserModel 
-from app.schemas.token import TokenData
 from app.crud import user as crud_user 
 
 # ====================================================================================
@@ -28,52 +29,101 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 # ====================================================================================
-# --- Funções ---                                                                =====
+# --- Sessões de Banco de Dados ---                                              =====
 # ====================================================================================
 
-def get_db() -> Generator[Session, None, None]: # pragma: no cover
+T = TypeVar("T")
+
+DBSession = Union[Session, AsyncSession]
+
+
+def _request_client_key(request: Request) -> Optional[str]:
+    return client_key(request.headers.get("authorization"), request.client.host if request.client else None)
+
+
+def get_db(request: Request) -> Generator[Session, None, None]: # pragma: no cover
     """
     Dependência para obter uma sessão do banco de dados por request.
+    A sessão identifica o cliente para o roteamento de réplicas (leitura das próprias escritas).
     """
-    db = SessionLocal()
+    db = SessionLocal(info={CLIENT_KEY: _request_client_key(request)})
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]: # pragma: no cover
+    """
+    Dependência para obter uma sessão assíncrona (AsyncSession) por request.
+    """
+    async with AsyncSessionLocal(info={CLIENT_KEY: _request_client_key(request)}) as db:
+        yield db
+
+
+# Sessão usada pelos routers: o stack assíncrono é escolhido via settings.DB_ASYNC_ENABLED.
+get_session = get_async_db if settings.DB_ASYNC_ENABLED else get_db
+
+
+async def run_crud(db: DBSession, crud_fn: Callable[..., T], /, **kwargs: Any) -> T:
+    """
+    Executa uma função CRUD com a sessão do request sem bloquear o event loop.
+    - Session: executa `crud_fn` no threadpool.
+    - AsyncSession: aguarda a variante `<crud_fn>_async` definida no mesmo módulo.
+    """
+    if isinstance(db, AsyncSession):
+        async_fn = getattr(sys.modules[crud_fn.__module__], f"{crud_fn.__name__}_async")
+        return await async_fn(db, **kwargs)
+    return await run_in_threadpool(crud_fn, db, **kwargs)
+
+# ====================================================================================
+# --- Funções ---                                                                =====
+# ====================================================================================
+
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+    db: DBSession = Depends(get_session), token: str = Depends(reusable_oauth2)
 ) -> UserModel:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = security.decode_token(token)
-        if payload is None:
-            raise credentials_exception
-        
-        token_email_from_payload = payload.get("sub")
-        if token_email_from_payload is None:
-            raise credentials_exception
-        
-        token_data = TokenData(email=token_email_from_payload)
-
-    except (JWTError, ValidationError):
+    # Só access tokens ('aud' = JWT_AUDIENCE, sem 'type'); refresh e recuperação de senha não valem.
+    payload = security.decode_access_token(token)
+    if payload is None:
         raise credentials_exception
 
-    if token_data.email is None: 
-        raise credentials_exception # pragma: no cover
+    # O 'sub' foi assinado por nós ao emitir o token; basta garantir que é uma string. Um
+    # subject que não seja email de usuário simplesmente não é encontrado abaixo (401).
+    email = payload.get("sub")
+    if not isinstance(email, str) or not email:
+        raise credentials_exception
+
+    cached_principal = principal_cache.get_principal(email)
+    if cached_principal is not None:
+        return await _attach_principal(db, cached_principal)
 
-    user = crud_user.get_user_by_email(db, email=token_data.email)
-    
+    # O principal que vai para o cache vem do primário: uma réplica atrasada devolveria os
+    # valores (is_active, is_superuser) que a escrita acabou de invalidar.
+    with read_from_primary(db):
+        user = await run_crud(db, crud_user.get_user_by_email, email=email)
     if user is None:
         raise credentials_exception
+    principal_cache.store_principal(user)
     return user
 
 
+async def _attach_principal(db: DBSession, snapshot: principal_cache.PrincipalSnapshot) -> UserModel:
+    """
+    Anexa o principal em cache à sessão do request via merge(load=False): nenhum SELECT é
+    emitido e o objeto retornado pode ser atualizado/deletado normalmente pelo CRUD.
+    """
+    user = principal_cache.user_from_snapshot(snapshot)
+    if isinstance(db, AsyncSession):
+        return await db.merge(user, load=False)
+    return db.merge(user, load=False)
+
+
 async def get_current_active_user(
     current_user: UserModel = Depends(get_current_user),
 ) -> UserModel:
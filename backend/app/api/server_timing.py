@@ -0,0 +1,90 @@
+# app/api/server_timing.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import logging
+import random
+import time
+from typing import Any, Callable, List
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.query_stats import QueryStats, begin_request_stats
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Middleware de Server-Timing ---                                                               #####
+# =======================================================================================================
+# Middleware ASGI puro (sem BaseHTTPMiddleware): abre as estatísticas de consultas do request
+# (app/db/query_stats.py), adiciona o cabeçalho Server-Timing quando a resposta começa e, ao
+# final, registra um log estruturado. Requests com consulta lenta são sempre logados; os demais
+# com a probabilidade DB_QUERY_LOG_SAMPLE_RATE.
+
+
+def server_timing_header(stats: QueryStats, elapsed_seconds: float) -> str:
+    """Ex.: `db;dur=3.21;desc="4 queries", db-slowest;dur=1.02, app;dur=7.90`."""
+    metrics: List[str] = [f'db;dur={stats.total_seconds * 1000:.2f};desc="{stats.count} queries"']
+    if stats.count:
+        metrics.append(f"db-slowest;dur={stats.slowest_seconds * 1000:.2f}")
+    metrics.append(f"app;dur={elapsed_seconds * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """
+    Expõe, por request, o número de consultas, o tempo total no banco e a consulta mais lenta.
+    `rng` permite fixar a amostragem nos testes.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float, rng: Callable[[], float] = random.random) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self._rng = rng
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = begin_request_stats()
+        status_code: List[int] = []
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status_code.append(message["status"])
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_header(stats, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self._log(scope, stats, status_code[0] if status_code else None, time.perf_counter() - started)
+
+    def _log(self, scope: Scope, stats: QueryStats, status_code: Any, elapsed_seconds: float) -> None:
+        if not stats.slow_count and not (self.sample_rate and self._rng() < self.sample_rate):
+            return
+        summary = stats.snapshot()
+        logger.log(
+            logging.WARNING if stats.slow_count else logging.INFO,
+            "%s %s -> %s: %d consultas em %.1fms (mais lenta %.1fms), total %.1fms",
+            scope["method"],
+            scope["path"],
+            status_code,
+            summary["queries"],
+            summary["total_ms"],
+            summary["slowest_ms"],
+            elapsed_seconds * 1000,
+            extra={
+                "http_method": scope["method"],
+                "http_path": scope["path"],
+                "http_status": status_code,
+                "duration_ms": round(elapsed_seconds * 1000, 3),
+                "db": summary,
+            },
+        )
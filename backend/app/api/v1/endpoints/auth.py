@@ -4,11 +4,11 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
-from typing import Any, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm 
-from sqlalchemy.orm import Session
 
 from app.schemas.user import ( 
     UserCreate,
@@ -18,16 +18,29 @@ from app.schemas.user import (
     PasswordRecoveryRequest, 
     PasswordResetForm        
 )
-from app.schemas.token import Token
+from app.schemas.token import RefreshTokenRequest, Token
 from app.crud.user import ( 
+    EmailAlreadyRegistered,
     get_user_by_email,
+    get_user_password_hash,
     create_user,
     update_user,
+    update_user_password_hash,
     delete_user 
 )
+from app.crud.email import enqueue_email
+from app.crud.refresh_token import (
+    create_refresh_token_family,
+    revoke_user_refresh_token_families,
+    rotate_refresh_token_family,
+)
 from app.api import deps
-from app.core import security
+from app.api.conditional import expected_user_versions
+from app.core import rate_limit, security
 from app.core.config import settings
+from app.core.email_queue import email_worker
+from app.core.email_templates import render_email
+from app.core.user_response_cache import user_etag
 from app.db.models.user import User as UserModel 
 
 # =======================================================================================================
@@ -36,65 +49,134 @@ from app.db.models.user import User as UserModel
 
 router = APIRouter()
 
+# =======================================================================================================
+# --- Helpers ---                                                                                   #####
+# =======================================================================================================
+
+def _token_pair(email: str, family_id: str, generation: int, expires_at: datetime) -> Dict[str, str]:
+    """
+    Emite um access token e o refresh token da geração informada (expira junto com a família).
+    """
+    return {
+        "access_token": security.create_access_token(data={"sub": email}),
+        "refresh_token": security.create_refresh_token(
+            data={"sub": email, "fam": family_id, "gen": generation, "exp": expires_at}
+        ),
+        "token_type": "bearer",
+    }
+
+async def _queue_email(db: deps.DBSession, recipient: str, template: str, **context: Any) -> None:
+    """
+    Renderiza o template e enfileira a mensagem (app/core/email_queue.py); o envio SMTP
+    acontece fora do request.
+    """
+    message = render_email(template, **context)
+    await deps.run_crud(db, enqueue_email, recipient=recipient, subject=message.subject, body=message.body)
+    email_worker.notify()
+
 # =======================================================================================================
 # --- Endpoints ---                                                                                 #####
 # =======================================================================================================
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_new_user(
+async def register_new_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
     user_in: UserCreate,
 ) -> Any:
     """
     Cria um novo usuário.
+    Um único INSERT ... RETURNING: o email duplicado é detectado pela restrição de unicidade.
     """
-    user = get_user_by_email(db, email=user_in.email)
-    if user:
+    hashed_password = await security.get_password_hash_async(user_in.password)
+    try:
+        new_user = await deps.run_crud(db, create_user, user=user_in, hashed_password=hashed_password)
+    except EmailAlreadyRegistered:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user with this email already exists in the system.",
         )
-    new_user = create_user(db=db, user=user_in)
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(deps.get_db),
+async def login_for_access_token(
+    request: Request,
+    db: deps.DBSession = Depends(deps.get_session),
     form_data: OAuth2PasswordRequestForm = Depends() 
 ) -> Any:
     """
     OAuth2 compatível com endpoint de token, login com email e senha.
-    Retorna um access_token e um refresh_token (opcional).
+    Retorna um access_token e um refresh_token (renovável em /auth/refresh sem a senha).
+    Tentativas acima do limite por IP ou por email são rejeitadas com 429 antes do hashing.
     """
-    user = get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    limiter = rate_limit.login_rate_limiter
+    await limiter.check(request.client.host if request.client else None, form_data.username)
+
+    user = await deps.run_crud(db, get_user_by_email, email=form_data.username)
+    if user:
+        verified, new_hash = await security.verify_password_and_update_async(
+            form_data.password, user.hashed_password
+        )
+    else:
+        # Email desconhecido: mesmo custo de uma verificação real (tempo de resposta uniforme).
+        verified, new_hash = await security.verify_dummy_password_async(form_data.password), None
+    if not user or not verified:
+        # A tentativa já foi contada para o email em check(); a reserva fica como falha.
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await limiter.record_success(form_data.username)
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
-    
-    access_token = security.create_access_token(
-        data={"sub": user.email} 
+    if new_hash is not None:
+        # Hash com esquema/custo antigo: regravado com a política atual (sem migração), sem
+        # nova versão nem evento: para os clientes, o usuário não mudou.
+        await deps.run_crud(db, update_user_password_hash, user_id=user.id, hashed_password=new_hash)
+
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    family = await deps.run_crud(db, create_refresh_token_family, user_id=user.id, expires_at=expires_at)
+    return _token_pair(user.email, family.id, family.generation, expires_at)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    refresh_data: RefreshTokenRequest,
+    db: deps.DBSession = Depends(deps.get_session),
+) -> Any:
+    """
+    Troca um refresh token válido por um novo par de tokens, sem verificar a senha.
+    O refresh token é rotacionado: o antigo deixa de valer e reapresentá-lo revoga
+    toda a família (detecção de reutilização), exigindo um novo login.
+    """
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-    }
+    payload = security.decode_refresh_token(refresh_data.refresh_token)
+    if payload is None:
+        raise invalid_token
+    rotation = await deps.run_crud(
+        db, rotate_refresh_token_family, family_id=payload["fam"], generation=payload["gen"]
+    )
+    if rotation is None:
+        raise invalid_token
+    return _token_pair(rotation.email, rotation.family_id, rotation.generation, rotation.expires_at)
 
 
 @router.get("/me", response_model=UserRead)
 def read_users_me(
+    response: Response,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Obtém o usuário atual.
+    O ETag (versão da linha) pode ser enviado em If-Match no PATCH /me.
     """
+    response.headers["ETag"] = user_etag(current_user)
     return current_user
 
 
@@ -109,40 +191,62 @@ def read_current_superuser(
     return current_user
 
 
-@router.patch("/me", response_model=UserRead)
-def update_user_me(
+@router.patch(
+    "/me",
+    response_model=UserRead,
+    responses={status.HTTP_412_PRECONDITION_FAILED: {"description": "If-Match não corresponde à versão atual."}},
+)
+async def update_user_me(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
+    response: Response,
     user_update_data: UserUpdate, 
-    current_user: UserModel = Depends(deps.get_current_active_user) 
+    current_user: UserModel = Depends(deps.get_current_active_user),
+    if_match: Optional[str] = Header(default=None),
 ) -> Any:
     """
     Atualiza os dados do usuário autenticado.
     Permite atualizar email, full_name, password (se enviado).
     Campos como is_active e is_superuser não devem ser atualizáveis pelo próprio usuário aqui.
+    Com If-Match (ETag do GET /me), a atualização só ocorre se a versão não mudou; caso contrário 412.
     """
-    if user_update_data.email and user_update_data.email != current_user.email:
-        existing_user = get_user_by_email(db, email=user_update_data.email)
-        if existing_user and existing_user.id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered by another user.",
-            )
-
     update_data_for_crud = user_update_data.model_dump(exclude_unset=True)
     if "is_active" in update_data_for_crud:
         del update_data_for_crud["is_active"] 
     if "is_superuser" in update_data_for_crud:
         del update_data_for_crud["is_superuser"] 
 
-    updated_user = update_user(db=db, db_user=current_user, user_in=update_data_for_crud)
+    hashed_password = None
+    if update_data_for_crud.get("password"):
+        hashed_password = await security.get_password_hash_async(update_data_for_crud["password"])
+
+    try:
+        updated_user = await deps.run_crud(
+            db,
+            update_user,
+            db_user=current_user,
+            user_in=update_data_for_crud,
+            hashed_password=hashed_password,
+            expected_versions=expected_user_versions(current_user.id, if_match),
+        )
+    except EmailAlreadyRegistered:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered by another user.",
+        )
+    if updated_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="User was modified by another request. Reload and try again.",
+        )
+    response.headers["ETag"] = user_etag(updated_user)
     return updated_user
 
 
 @router.put("/me/password", status_code=status.HTTP_204_NO_CONTENT)
-def update_current_user_password(
+async def update_current_user_password(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
     password_data: UserPasswordChange, 
     current_user: UserModel = Depends(deps.get_current_active_user)
 ) -> None: 
@@ -150,73 +254,68 @@ def update_current_user_password(
     Atualiza a senha do usuário autenticado.
     Requer a senha atual e a nova senha (com confirmação).
     """
+    # O hash não faz parte do principal em cache: lido aqui, sob demanda.
+    current_hash = await deps.run_crud(db, get_user_password_hash, user_id=current_user.id)
+    if current_hash is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
     # 1. Verificar se a senha atual fornecida está correta
-    if not security.verify_password(password_data.current_password, current_user.hashed_password):
+    if not await security.verify_password_async(password_data.current_password, current_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password",
         )
     
     # 2. Verificar se a nova senha é diferente da antiga 
-    if security.verify_password(password_data.new_password, current_user.hashed_password):
+    if await security.verify_password_async(password_data.new_password, current_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="New password cannot be the same as the current password.",
         )
 
     # 3. Gerar o hash da nova senha
-    hashed_password = security.get_password_hash(password_data.new_password)
-    current_user.hashed_password = hashed_password 
-    
-    db.add(current_user)
-    db.commit()
+    hashed_password = await security.get_password_hash_async(password_data.new_password)
+    await deps.run_crud(db, update_user, db_user=current_user, user_in={}, hashed_password=hashed_password)
+    await deps.run_crud(db, revoke_user_refresh_token_families, user_id=current_user.id)
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user_me(
+async def delete_user_me(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
     current_user: UserModel = Depends(deps.get_current_active_user)
 ) -> None: 
     """
     Deleta a conta do usuário autenticado.
+    Com soft delete (padrão), apenas marca a remoção; a linha é expurgada em segundo plano.
     """
-    delete_user(db=db, db_user=current_user)
+    await deps.run_crud(db, delete_user, db_user=current_user)
     return None
 
 
 @router.post("/password-recovery", response_model=Dict[str, str])
 async def request_password_recovery(
     recovery_data: PasswordRecoveryRequest,
-    db: Session = Depends(deps.get_db)
+    db: deps.DBSession = Depends(deps.get_session)
 ) -> Any:
     """
     Inicia o processo de recuperação de senha.
-    Gera um token de recuperação se o usuário existir.
-    (Simula o envio de e-mail printando o token e um link de exemplo).
+    Gera um token de recuperação se o usuário existir e enfileira o email com o token e o link.
     """
-    user = get_user_by_email(db, email=recovery_data.email)
+    user = await deps.run_crud(db, get_user_by_email, email=recovery_data.email)
     if not user:
         return {"message": "Se um usuário com este email existir, um link de recuperação foi enviado."}
 
     password_reset_token = security.create_password_reset_token(email=user.email)
-    
     reset_link = f"{settings.SERVER_HOST}{settings.API_V1_STR}/auth/reset-password-form?token={password_reset_token}" 
-    
-    print("---- SIMULAÇÃO DE ENVIO DE E-MAIL ----")
-    print(f"Para: {user.email}")
-    print(f"Assunto: Recuperação de Senha - {settings.PROJECT_NAME}")
-    print(f"Use o seguinte token para resetar sua senha (ou clique no link): {password_reset_token}")
-    print(f"Ou acesse o link: {reset_link}")
-    print("--------------------------------------")
-    
+    await _queue_email(db, user.email, "password_recovery", token=password_reset_token, reset_link=reset_link)
     return {"message": "Se um usuário com este email existir, um link de recuperação foi enviado."}
 
 
 @router.post("/reset-password", status_code=status.HTTP_204_NO_CONTENT)
 async def reset_user_password(
     reset_form_data: PasswordResetForm = Body(...),
-    db: Session = Depends(deps.get_db)
+    db: deps.DBSession = Depends(deps.get_session)
 ) -> None:
     """
     Reseta a senha do usuário usando um token de recuperação válido.
@@ -228,7 +327,7 @@ async def reset_user_password(
             detail="Token de recuperação de senha inválido ou expirado.",
         )
     
-    user = get_user_by_email(db, email=email_from_token)
+    user = await deps.run_crud(db, get_user_by_email, email=email_from_token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -238,16 +337,9 @@ async def reset_user_password(
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuário inativo.")
     
-    hashed_password = security.get_password_hash(reset_form_data.new_password)
-    user.hashed_password = hashed_password
-    db.add(user)
-    db.commit()
-
-    # Simulação de envio de e-mail de confirmação:
-    print(f"---- SIMULAÇÃO DE ENVIO DE E-MAIL ----")         
-    print(f"Para: {user.email}")                            
-    print(f"Assunto: Sua senha foi alterada - {settings.PROJECT_NAME}")
-    print(f"Sua senha foi alterada com sucesso.")              
-    print("--------------------------------------") 
+    hashed_password = await security.get_password_hash_async(reset_form_data.new_password)
+    await deps.run_crud(db, update_user, db_user=user, user_in={}, hashed_password=hashed_password)
+    await deps.run_crud(db, revoke_user_refresh_token_families, user_id=user.id)
 
+    await _queue_email(db, user.email, "password_changed")
     return None
\ No newline at end of file
@@ -0,0 +1,55 @@
+# app/api/v1/endpoints/metrics.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, status
+
+from app.api import deps
+from app.core.count_cache import user_count_cache
+from app.core import rate_limit
+from app.core.cache import cache
+from app.core.email_queue import email_worker
+from app.core.outbox import outbox_relay
+from app.core.user_purge import user_purger
+from app.core.principal_cache import principal_cache
+from app.core.token_cache import token_cache
+from app.db.pool import pool_stats
+from app.db.query_stats import query_stats
+from app.db.session import replica_router
+from app.db.models.user import User as UserModel
+
+# =======================================================================================================
+# --- Rotas ---                                                                                     #####
+# =======================================================================================================
+
+router = APIRouter()
+
+# =======================================================================================================
+# --- Endpoints (Métricas Internas) ---                                                             #####
+# =======================================================================================================
+
+@router.get("/", response_model=Dict[str, Any], status_code=status.HTTP_200_OK)
+def read_metrics(
+    current_admin: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Retorna contadores internos da aplicação (caches, pools, limitadores) deste processo.
+    Acessível apenas por superusuários.
+    """
+    return {
+        "cache": cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "user_count_cache": user_count_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "login_rate_limit": rate_limit.login_rate_limiter.stats(),
+        "email_queue": email_worker.stats(),
+        "outbox": outbox_relay.stats(),
+        "user_purge": user_purger.stats(),
+        "db_pool": pool_stats(),
+        "db_queries": query_stats(),
+        "db_replicas": replica_router.stats(),
+    }
@@ -4,15 +4,27 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter,Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter,Depends, Header, HTTPException, Query, Response, status
 
 from app.api import deps
+from app.api.conditional import etag_matches, expected_user_versions
+from app.core import security
+from app.core.user_response_cache import get_user_response, user_etag
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
 from app.crud import user as crud_user
 from app.db.models.user import User as UserModel
-from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.db.routing import read_from_primary
+from app.schemas.user import (
+    SortOrder,
+    UserCountMode,
+    UserCreate,
+    UserRead,
+    UserSearchFilters,
+    UserSortKey,
+    UserUpdate,
+)
 
 
 # =======================================================================================================
@@ -21,101 +33,225 @@ from app.schemas.user import UserCreate, UserRead, UserUpdate
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# =======================================================================================================
+# --- Helpers ---                                                                                   #####
+# =======================================================================================================
+
+def user_search_filters(
+    is_active: Optional[bool] = Query(None, description="Filtra por usuários ativos/inativos"),
+    is_superuser: Optional[bool] = Query(None, description="Filtra por superusuários"),
+    email_prefix: Optional[str] = Query(
+        None, min_length=1, max_length=255, description="Prefixo do e-mail (sem diferenciar maiúsculas)"
+    ),
+    full_name: Optional[str] = Query(
+        None, min_length=1, max_length=255, description="Trecho do nome completo (sem diferenciar maiúsculas)"
+    ),
+) -> UserSearchFilters:
+    """
+    Dependência que reúne os filtros de busca da listagem de usuários.
+    """
+    return UserSearchFilters(
+        is_active=is_active, is_superuser=is_superuser, email_prefix=email_prefix, full_name=full_name
+    )
+
+
+def _parse_users_cursor(cursor: str, order_by: str, order: str) -> List[Any]:
+    """
+    Decodifica o cursor da listagem e valida que ele pertence à ordenação pedida.
+    """
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Cursor de paginação inválido para esta ordenação.",
+    )
+    try:
+        data = decode_cursor(cursor)
+    except InvalidCursor:
+        raise invalid_cursor
+    values = data.get("v")
+    if data.get("k") != order_by or data.get("d", "asc") != order or not isinstance(values, list) or not crud_user.is_valid_keyset(order_by, values):
+        raise invalid_cursor
+    return values
+
 # =======================================================================================================
 # --- Endpoints (Administração de Usuários) ---                                                     #####
 # =======================================================================================================
 
 @router.get("/", response_model=List[UserRead], status_code=status.HTTP_200_OK)
-def read_users(
-    db: Session = Depends(deps.get_db),
-    skip: int = Query(0, ge=0, description="Número de registros a pular para paginação"),
+async def read_users(
+    response: Response,
+    db: deps.DBSession = Depends(deps.get_session),
+    skip: int = Query(0, ge=0, description="Número de registros a pular (legado; prefira `cursor`)"),
     limit: int = Query(100, ge=1, le=200, description="Número máximo de registros a retornar"),
+    cursor: Optional[str] = Query(None, description=f"Cursor opaco retornado no header {NEXT_CURSOR_HEADER}"),
+    order_by: UserSortKey = Query("id", description="Chave de ordenação (desempate por id)"),
+    order: SortOrder = Query("asc", description="Direção da ordenação"),
+    filters: UserSearchFilters = Depends(user_search_filters),
+    count: Optional[UserCountMode] = Query(
+        None, description=f"Inclui o total (com os filtros) no header {TOTAL_COUNT_HEADER}: exato ou estimado"
+    ),
     current_admin: UserModel = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
-    Recupera uma lista de usuários.
+    Recupera uma lista de usuários, opcionalmente filtrada e ordenada.
     Acessível apenas por superusuários.
+    Quando a página vem cheia, o header X-Next-Cursor traz o cursor da próxima página
+    (paginação por keyset, com latência constante independentemente da profundidade).
+    O cursor vale para a mesma ordenação; os filtros devem ser repetidos a cada página.
+    Com `count`, o header X-Total-Count traz o total: `exact` (COUNT em cache, invalidado
+    pelas escritas) ou `estimated` (estatísticas do PostgreSQL, sem varrer a tabela).
     """
-    users = crud_user.get_users(db, skip=skip, limit=limit)
+    after = None
+    if cursor:
+        if skip:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use `skip` ou `cursor` para paginar, não ambos.",
+            )
+        after = _parse_users_cursor(cursor, order_by, order)
+
+    users = await deps.run_crud(
+        db,
+        crud_user.get_users,
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        after=after,
+        descending=order == "desc",
+        filters=filters,
+    )
+    if len(users) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            {"k": order_by, "d": order, "v": crud_user.keyset_values(users[-1], order_by)}
+        )
+    if count is not None:
+        count_fn = crud_user.count_users if count == "exact" else crud_user.estimate_user_count
+        response.headers[TOTAL_COUNT_HEADER] = str(await deps.run_crud(db, count_fn, filters=filters))
     return users
 
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user_by_admin_endpoint(
+async def create_user_by_admin_endpoint(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
     user_in: UserCreate,
     current_admin: UserModel = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Cria um novo usuário no sistema.
     Acessível apenas por superusuários. Permite definir todos os campos, incluindo is_active e is_superuser.
+    Um único INSERT ... RETURNING: o email duplicado é detectado pela restrição de unicidade.
     """
-    user = crud_user.get_user_by_email(db, email=user_in.email)
-    if user:
+    hashed_password = await security.get_password_hash_async(user_in.password)
+    try:
+        new_user = await deps.run_crud(
+            db, crud_user.create_user_by_admin, user=user_in, hashed_password=hashed_password
+        )
+    except crud_user.EmailAlreadyRegistered:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="O usuário com este email já existe no sistema.",
         )
-    new_user = crud_user.create_user_by_admin(db=db, user=user_in)
     return new_user
 
 
-@router.get("/{user_id}", response_model=UserRead, status_code=status.HTTP_200_OK)
-def read_user_by_id_admin(
+@router.get(
+    "/{user_id}",
+    response_model=UserRead,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Representação inalterada (If-None-Match)."}},
+)
+async def read_user_by_id_admin(
     user_id: int,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
     current_admin: UserModel = Depends(deps.get_current_active_superuser),
+    if_none_match: Optional[str] = Header(default=None),
 ) -> Any:
     """
     Obtém um usuário específico pelo ID.
     Acessível apenas por superusuários.
+    A resposta traz um ETag (versão da linha); com If-None-Match igual ao ETag atual responde
+    304 sem corpo. O JSON fica em cache por usuário e é descartado pelas escritas do CRUD.
     """
-    user = crud_user.get_user(db, user_id=user_id)
-    if not user:
+    async def load_user() -> Optional[UserModel]:
+        # O que vai para o cache vem do primário: uma réplica atrasada devolveria a versão
+        # que a escrita acabou de invalidar.
+        with read_from_primary(db):
+            return await deps.run_crud(db, crud_user.get_user, user_id=user_id)
+
+    cached = await get_user_response(user_id, load_user)
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="O usuário com este ID não foi encontrado no sistema.",
         )
-    return user
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
-@router.put("/{user_id}", response_model=UserRead, status_code=status.HTTP_200_OK)
-def update_user_by_admin_endpoint(
+@router.put(
+    "/{user_id}",
+    response_model=UserRead,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_412_PRECONDITION_FAILED: {"description": "If-Match não corresponde à versão atual."}},
+)
+async def update_user_by_admin_endpoint(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
+    response: Response,
     user_id: int,
     user_in: UserUpdate,
     current_admin: UserModel = Depends(deps.get_current_active_superuser),
+    if_match: Optional[str] = Header(default=None),
 ) -> Any:
     """
     Atualiza um usuário existente pelo ID.
     Acessível apenas por superusuários. Permite atualizar todos os campos editáveis,
     incluindo is_active, is_superuser e, opcionalmente, a senha.
+    Com If-Match (ETag do GET), a atualização só ocorre se a versão não mudou; caso contrário 412.
+    A escrita é um único UPDATE ... RETURNING, sem SELECT prévio da linha nem do email.
     """
-    user = crud_user.get_user(db, user_id=user_id)
-    if not user:
+    hashed_password = None
+    if user_in.password:
+        hashed_password = await security.get_password_hash_async(user_in.password)
+
+    try:
+        updated_user = await deps.run_crud(
+            db,
+            crud_user.update_user_by_id,
+            user_id=user_id,
+            user_in=user_in,
+            hashed_password=hashed_password,
+            expected_versions=expected_user_versions(user_id, if_match),
+        )
+    except crud_user.EmailAlreadyRegistered:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="O usuário com este ID não foi encontrado no sistema.",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O novo email fornecido já está registrado por outro usuário.",
         )
-
-    if user_in.email and user_in.email != user.email:
-        existing_user_with_new_email = crud_user.get_user_by_email(db, email=user_in.email)
-        if existing_user_with_new_email:
+    if updated_user is None:
+        # Nenhuma linha casou: o usuário não existe ou a versão mudou desde o ETag enviado.
+        if await deps.run_crud(db, crud_user.get_user, user_id=user_id) is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="O novo email fornecido já está registrado por outro usuário.",
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="O usuário com este ID não foi encontrado no sistema.",
             )
-
-    updated_user = crud_user.update_user(db=db, db_user=user, user_in=user_in)
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="O usuário foi alterado por outra requisição. Recarregue e tente novamente.",
+        )
+    response.headers["ETag"] = user_etag(updated_user)
     return updated_user
 
 
 @router.delete("/{user_id}", response_model=UserRead, status_code=status.HTTP_200_OK)
-def delete_user_by_admin_endpoint(
+async def delete_user_by_admin_endpoint(
     *,
-    db: Session = Depends(deps.get_db),
+    db: deps.DBSession = Depends(deps.get_session),
     user_id: int,
     current_admin: UserModel = Depends(deps.get_current_active_superuser),
 ) -> Any:
@@ -123,6 +259,7 @@ def delete_user_by_admin_endpoint(
     Deleta um usuário específico pelo ID.
     Acessível apenas por superusuários.
     Não permite que um superusuário delete a si mesmo através deste endpoint.
+    Com soft delete (padrão), apenas marca a remoção; a linha é expurgada em segundo plano.
     """
     if current_admin.id == user_id:
         raise HTTPException(
@@ -130,12 +267,12 @@ def delete_user_by_admin_endpoint(
             detail="Superusuários não podem deletar a si mesmos através deste endpoint. Use /auth/me.",
         )
 
-    user_to_delete = crud_user.get_user(db, user_id=user_id)
+    user_to_delete = await deps.run_crud(db, crud_user.get_user, user_id=user_id)
     if not user_to_delete:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="O usuário com este ID não foi encontrado no sistema para deleção.",
         )
 
-    deleted_user = crud_user.delete_user(db=db, db_user=user_to_delete)
+    deleted_user = await deps.run_crud(db, crud_user.delete_user, db_user=user_to_delete)
     return deleted_user
\ No newline at end of file
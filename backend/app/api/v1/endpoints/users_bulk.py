@@ -0,0 +1,296 @@
+# app/api/v1/endpoints/users_bulk.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, Literal, Optional, Sequence, Set, Tuple, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.crud import user as crud_user
+from app.db.models.user import User as UserModel
+from app.schemas.user import (
+    UserBulkImportCreated,
+    UserBulkImportError,
+    UserBulkImportResult,
+    UserCreate,
+)
+
+# =======================================================================================================
+# --- Rotas ---                                                                                     #####
+# =======================================================================================================
+
+router = APIRouter()
+
+# Linha da entrada: (índice, dados do usuário) ou (índice, mensagem de erro de parsing).
+RawRow = Tuple[int, Union[Dict[str, Any], str]]
+
+# =======================================================================================================
+# --- Leitura da Entrada (JSON / NDJSON / CSV) ---                                                  #####
+# =======================================================================================================
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Lê o corpo do request em streaming, linha a linha, sem carregá-lo inteiro em memória."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def _iter_json_rows(request: Request) -> AsyncIterator[RawRow]:
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="JSON inválido.")
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="O corpo JSON deve ser uma lista de usuários."
+        )
+    for index, item in enumerate(payload):
+        yield index, item if isinstance(item, dict) else "Cada item deve ser um objeto JSON."
+
+
+async def _iter_ndjson_rows(request: Request) -> AsyncIterator[RawRow]:
+    index = 0
+    async for line in _iter_lines(request):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield index, "Linha NDJSON inválida."
+        else:
+            yield index, item if isinstance(item, dict) else "Cada linha deve ser um objeto JSON."
+        index += 1
+
+
+async def _iter_csv_rows(request: Request) -> AsyncIterator[RawRow]:
+    """
+    CSV com cabeçalho (email,password,full_name,is_active,is_superuser); campos vazios são omitidos.
+    Cada registro deve ocupar uma única linha.
+    """
+    header: Optional[List[str]] = None
+    index = 0
+    async for line in _iter_lines(request):
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield index, "Número de colunas diferente do cabeçalho."
+        else:
+            yield index, {name: value for name, value in zip(header, values) if value != ""}
+        index += 1
+
+
+ROW_READERS = {
+    "application/json": _iter_json_rows,
+    "application/x-ndjson": _iter_ndjson_rows,
+    "text/csv": _iter_csv_rows,
+}
+
+# =======================================================================================================
+# --- Importação ---                                                                                #####
+# =======================================================================================================
+
+def _first_error_message(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error.get("loc", ()))
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+async def _import_batch(
+    db: deps.DBSession, batch: List[RawRow], seen_emails: Set[str], result: UserBulkImportResult
+) -> None:
+    """
+    Processa um lote: valida as linhas, descarta duplicados (na entrada e no banco, com uma
+    única consulta), gera os hashes em paralelo e insere com um INSERT multi-linha.
+    """
+    valid_rows: List[Tuple[int, UserCreate]] = []
+    for index, raw in batch:
+        if isinstance(raw, str):
+            result.errors.append(UserBulkImportError(index=index, detail=raw))
+            continue
+        email = raw.get("email") if isinstance(raw.get("email"), str) else None
+        try:
+            user_in = UserCreate.model_validate(raw)
+        except ValidationError as exc:
+            result.errors.append(UserBulkImportError(index=index, email=email, detail=_first_error_message(exc)))
+            continue
+        if user_in.email in seen_emails:
+            result.errors.append(UserBulkImportError(index=index, email=user_in.email, detail="E-mail duplicado na entrada."))
+            continue
+        seen_emails.add(user_in.email)
+        valid_rows.append((index, user_in))
+
+    existing_emails = await deps.run_crud(
+        db, crud_user.get_existing_emails, emails=[user_in.email for _, user_in in valid_rows]
+    )
+    new_rows: List[Tuple[int, UserCreate]] = []
+    for index, user_in in valid_rows:
+        if user_in.email in existing_emails:
+            result.errors.append(UserBulkImportError(index=index, email=user_in.email, detail="O usuário com este email já existe no sistema."))
+        else:
+            new_rows.append((index, user_in))
+
+    hashed_passwords = await security.get_password_hashes_async([user_in.password for _, user_in in new_rows])
+    ids = await deps.run_crud(
+        db,
+        crud_user.create_users_bulk,
+        users=[
+            crud_user.user_insert_values(user_in, hashed_password)
+            for (_, user_in), hashed_password in zip(new_rows, hashed_passwords)
+        ],
+    )
+    for (index, user_in), user_id in zip(new_rows, ids):
+        if user_id is None:
+            result.errors.append(UserBulkImportError(index=index, email=user_in.email, detail="O usuário com este email já existe no sistema."))
+        else:
+            result.users.append(UserBulkImportCreated(index=index, id=user_id, email=user_in.email))
+
+# =======================================================================================================
+# --- Exportação (NDJSON / CSV) ---                                                                 #####
+# =======================================================================================================
+# As linhas vêm do banco como tuplas de colunas (sem ORM nem Pydantic) e cada lote é serializado
+# direto para texto, então a memória fica limitada a um lote independentemente do tamanho da tabela.
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _ndjson_chunk(rows: Sequence[Sequence[Any]]) -> str:
+    columns = crud_user.USER_EXPORT_COLUMNS
+    return "".join(
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows
+    )
+
+
+def _csv_chunk(rows: Iterable[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _export_header(export_format: ExportFormat) -> str:
+    return _csv_chunk([crud_user.USER_EXPORT_COLUMNS]) if export_format == "csv" else ""
+
+
+def _stream_export(db: deps.DBSession, export_format: ExportFormat) -> Union[Iterable[str], AsyncIterator[str]]:
+    """
+    Gera o corpo da exportação. Com Session o gerador é síncrono (o StreamingResponse o consome
+    no threadpool); com AsyncSession é um gerador assíncrono sobre AsyncSession.stream.
+    """
+    serialize = _csv_chunk if export_format == "csv" else _ndjson_chunk
+    batch_size = settings.USER_EXPORT_BATCH_SIZE
+
+    if isinstance(db, AsyncSession):
+        async def stream_async() -> AsyncIterator[str]:
+            yield _export_header(export_format)
+            async for rows in crud_user.iter_user_export_batches_async(db, batch_size=batch_size):
+                yield serialize(rows)
+        return stream_async()
+
+    def stream_sync() -> Iterable[str]:
+        yield _export_header(export_format)
+        for rows in crud_user.iter_user_export_batches(db, batch_size=batch_size):
+            yield serialize(rows)
+    return stream_sync()
+
+# =======================================================================================================
+# --- Endpoints (Operações em Massa) ---                                                            #####
+# =======================================================================================================
+
+@router.post(
+    "/bulk",
+    response_model=UserBulkImportResult,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": UserCreate.model_json_schema()}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_create_users(
+    request: Request,
+    db: deps.DBSession = Depends(deps.get_session),
+    current_admin: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Cria usuários em massa a partir de uma lista JSON, de NDJSON ou de CSV (com cabeçalho)
+    enviados em streaming; o formato é escolhido pelo Content-Type.
+    Os usuários são inseridos em lotes de USER_BULK_IMPORT_BATCH_SIZE; linhas inválidas ou
+    duplicadas são reportadas em `errors` (com o índice da linha) sem abortar o lote.
+    Acessível apenas por superusuários.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    read_rows = ROW_READERS.get(content_type)
+    if read_rows is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type não suportado. Use um de: {', '.join(ROW_READERS)}.",
+        )
+
+    result = UserBulkImportResult()
+    seen_emails: Set[str] = set()
+    batch: List[RawRow] = []
+    async for row in read_rows(request):
+        batch.append(row)
+        if len(batch) >= settings.USER_BULK_IMPORT_BATCH_SIZE:
+            await _import_batch(db, batch, seen_emails, result)
+            batch = []
+    if batch:
+        await _import_batch(db, batch, seen_emails, result)
+
+    result.errors.sort(key=lambda error: error.index)
+    result.created = len(result.users)
+    result.failed = len(result.errors)
+    return result
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Usuários exportados, um por linha (NDJSON) ou com cabeçalho (CSV).",
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        }
+    },
+)
+async def export_users(
+    db: deps.DBSession = Depends(deps.get_session),
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    current_admin: UserModel = Depends(deps.get_current_active_superuser),
+) -> StreamingResponse:
+    """
+    Exporta todos os usuários (ordenados por id) em NDJSON ou CSV, em streaming.
+    A leitura usa cursor do lado do servidor em lotes de USER_EXPORT_BATCH_SIZE linhas.
+    Acessível apenas por superusuários.
+    """
+    return StreamingResponse(
+        _stream_export(db, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'},
+    )
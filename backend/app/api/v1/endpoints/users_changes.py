@@ -0,0 +1,94 @@
+# app/api/v1/endpoints/users_changes.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api import deps
+from app.core.config import settings
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.crud import user as crud_user
+from app.db.models.user import User as UserModel
+from app.schemas.user import UserChangesRead, UserRead
+
+# =======================================================================================================
+# --- Rotas ---                                                                                     #####
+# =======================================================================================================
+
+router = APIRouter()
+
+# =======================================================================================================
+# --- Helpers ---                                                                                   #####
+# =======================================================================================================
+
+def _is_count(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _parse_since(since: Optional[str]) -> crud_user.ChangesPosition:
+    """
+    Decodifica o watermark do delta sync: (change_seq, id) da última mudança entregue, o
+    change_seq assentado e o par (change_seq, xmax) pendente, se houver.
+    """
+    if not since:
+        return crud_user.ChangesPosition()
+    invalid_token = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Token de sincronização inválido.",
+    )
+    try:
+        data = decode_cursor(since)
+    except InvalidCursor:
+        raise invalid_token
+    seq, last_id, settled, pending = data.get("s"), data.get("i"), data.get("n", 0), data.get("p")
+    if not all(_is_count(value) for value in (seq, last_id, settled)):
+        raise invalid_token
+    if pending is not None and not (
+        isinstance(pending, list) and len(pending) == 2 and all(_is_count(value) for value in pending)
+    ):
+        raise invalid_token
+    return crud_user.ChangesPosition(
+        after=(seq, last_id), settled=settled, pending=tuple(pending) if pending is not None else None
+    )
+
+
+def _encode_since(position: crud_user.ChangesPosition) -> str:
+    (seq, last_id), data = position.after, {}
+    if position.pending is not None:
+        data["p"] = list(position.pending)
+    return encode_cursor({"s": seq, "i": last_id, "n": position.settled, **data})
+
+# =======================================================================================================
+# --- Endpoints (Delta Sync) ---                                                                    #####
+# =======================================================================================================
+
+@router.get("/changes", response_model=UserChangesRead, status_code=status.HTTP_200_OK)
+async def read_user_changes(
+    db: deps.DBSession = Depends(deps.get_session),
+    since: Optional[str] = Query(None, description="Watermark retornado pela chamada anterior (vazio: desde o início)"),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de mudanças a retornar"),
+    current_admin: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Delta sync: usuários criados ou alterados e ids removidos depois do watermark `since`,
+    com o novo watermark. O custo acompanha o volume de mudanças, não o tamanho da tabela.
+    Mudanças de transações que ainda podem estar abertas abaixo delas ficam para uma próxima
+    chamada: escritas confirmadas fora de ordem não são puladas. Acessível apenas por superusuários.
+    """
+    changes = await deps.run_crud(
+        db,
+        crud_user.get_user_changes,
+        position=_parse_since(since),
+        limit=limit,
+        lag_seconds=settings.USER_CHANGES_LAG_SECONDS,
+    )
+    return UserChangesRead(
+        users=[UserRead.model_validate(user) for user in changes.users],
+        deleted=changes.deleted,
+        since=_encode_since(changes.position),
+        has_more=changes.has_more,
+    )
@@ -0,0 +1,462 @@
+# app/core/cache.py
+
+"""
+Camada de cache assíncrona com backends intercambiáveis.
+
+- InProcessCacheBackend: LRU + TTL em memória (por processo), o padrão.
+- RespCacheBackend: servidor compatível com o protocolo do Redis (RESP2), compartilhado entre
+  workers/instâncias. Cliente mínimo sobre asyncio streams, sem dependências extras.
+
+Cache (a fachada usada pela aplicação) acrescenta:
+- serialização com msgpack (datetimes com fuso viram o timestamp nativo do msgpack);
+- namespaces com invalidação em O(1): cada namespace tem um token de versão que compõe as
+  chaves; invalidar é trocar o token, e as entradas antigas expiram sozinhas pelo TTL;
+- gerações por chave: delete troca o token de geração da chave em vez de remover o valor, então
+  um loader iniciado antes da remoção grava sob a geração antiga, que ninguém mais lê;
+- proteção contra stampede (single-flight): chamadas concorrentes de get_or_load para a mesma
+  chave, no mesmo processo, aguardam um único loader;
+- degradação: erros do backend (servidor fora, timeout) viram miss e são contados, nunca
+  derrubam o request.
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import asyncio
+import logging
+import secrets
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+from urllib.parse import unquote, urlsplit
+
+import anyio.from_thread
+import msgpack
+
+from app.core.config import settings
+from app.core.lru import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# =======================================================================================================
+# --- Backends ---                                                                                  #####
+# =======================================================================================================
+
+class CacheError(Exception):
+    """Falha de comunicação ou resposta de erro do backend de cache."""
+
+
+class CacheReplyError(CacheError):
+    """Resposta de erro do servidor (ex.: -ERR); a conexão continua utilizável."""
+
+
+class CacheBackend(ABC):
+    """Interface assíncrona dos backends: valores são bytes; `ttl` em segundos (None = sem expiração)."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Valor da chave ou None (ausente ou expirada)."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        """Grava o valor; com `only_if_absent` só grava se a chave não existir. Retorna se gravou."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove as chaves."""
+
+    async def close(self) -> None:
+        return None
+
+
+class InProcessCacheBackend(CacheBackend):
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self._cache: TTLLRUCache[str, bytes] = TTLLRUCache(maxsize=maxsize, ttl=float("inf"), clock=clock)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        with self._lock:
+            if only_if_absent and self._cache.get(key) is not None:
+                return False
+            self._cache.set(key, value, ttl=ttl)
+            return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.pop(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+RespReply = Union[None, int, str, bytes, List[Any]]
+
+
+def _encode_command(*args: Union[str, bytes, int, float]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> RespReply:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Conexão com o servidor de cache encerrada.")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body.decode()
+    if prefix == b"-":
+        raise CacheReplyError(body.decode())
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise CacheError(f"Resposta RESP inválida: {line!r}")
+
+
+class _RespConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *args: Union[str, bytes, int, float]) -> RespReply:
+        [reply] = await self.execute_many([args])
+        return reply
+
+    async def execute_many(self, commands: Sequence[Sequence[Union[str, bytes, int, float]]]) -> List[RespReply]:
+        """Pipeline: envia os comandos de uma vez e lê todas as respostas (mesmo após um -ERR)."""
+        self.writer.write(b"".join(_encode_command(*args) for args in commands))
+        await self.writer.drain()
+        replies: List[RespReply] = []
+        error: Optional[CacheReplyError] = None
+        for _ in commands:
+            try:
+                replies.append(await _read_reply(self.reader))
+            except CacheReplyError as exc:
+                error = error or exc
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+# Backends RESP vivos: run_sync fecha as conexões abertas no seu loop próprio antes de encerrá-lo.
+_resp_backends: "weakref.WeakSet[RespCacheBackend]" = weakref.WeakSet()
+
+
+class RespCacheBackend(CacheBackend):
+    """
+    Backend para servidores RESP (Redis, Valkey, KeyDB...). URL: redis://[:senha@]host[:porta][/db].
+    Mantém até `pool_size` conexões; cada comando tem `timeout` segundos (conexão incluída) e
+    uma conexão que falha é descartada. As conexões pertencem ao event loop que as abriu: ao
+    trocar de loop, as ociosas do loop anterior são fechadas nele.
+    """
+
+    def __init__(self, url: str, pool_size: int = 10, timeout: float = 0.5) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", "resp"):
+            raise ValueError(f"URL de cache não suportada: {url}")
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.username = unquote(parts.username) if parts.username else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: List[_RespConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        _resp_backends.add(self)
+
+    def _discard_idle(self) -> None:
+        """Fecha as conexões ociosas no loop que as abriu (chamável de qualquer loop ou thread)."""
+        idle, loop, self._idle = self._idle, self._loop, []
+        for connection in idle:
+            if loop is None or loop.is_closed():
+                continue  # loop já encerrado: nada a agendar (run_sync fecha antes disso)
+            try:
+                loop.call_soon_threadsafe(connection.close)
+            except RuntimeError:
+                pass  # o loop foi encerrado entretanto
+
+    async def _connect(self) -> _RespConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = _RespConnection(reader, writer)
+        try:
+            if self.password is not None:
+                auth = (self.username, self.password) if self.username else (self.password,)
+                await connection.execute("AUTH", *auth)
+            if self.db:
+                await connection.execute("SELECT", self.db)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    async def execute(self, *args: Union[str, bytes, int, float]) -> RespReply:
+        [reply] = await self.pipeline(args)
+        return reply
+
+    async def pipeline(self, *commands: Sequence[Union[str, bytes, int, float]]) -> List[RespReply]:
+        """Executa os comandos em uma única ida e volta, na mesma conexão."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            # Conexões pertencem ao event loop que as abriu (ex.: run_sync usa um loop próprio).
+            self._discard_idle()
+            self._slots, self._loop = asyncio.Semaphore(self.pool_size), loop
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), self.timeout)
+                replies = await asyncio.wait_for(connection.execute_many(commands), self.timeout)
+            except CacheReplyError:
+                if connection is not None:
+                    self._idle.append(connection)
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as exc:
+                if connection is not None:
+                    connection.close()
+                raise CacheError(f"Servidor de cache indisponível: {exc!r}") from exc
+            except BaseException:
+                if connection is not None:
+                    connection.close()  # cancelado no meio do comando: o protocolo ficou dessincronizado
+                raise
+            self._idle.append(connection)
+            return replies
+
+    async def get(self, key: str) -> Optional[bytes]:
+        reply = await self.execute("GET", key)
+        return reply if isinstance(reply, bytes) else None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        args: List[Union[str, bytes, int, float]] = ["SET", key, value]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        if only_if_absent:
+            args.append("NX")
+        return await self.execute(*args) == "OK"
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.execute("DEL", *keys)
+
+    async def close(self) -> None:
+        self._discard_idle()
+        self._slots, self._loop = None, None
+        await asyncio.sleep(0)  # deixa rodar os fechamentos agendados no loop corrente
+
+    async def close_loop_connections(self) -> None:
+        """Fecha as conexões abertas no loop corrente (antes de um loop temporário terminar)."""
+        if self._loop is asyncio.get_running_loop():
+            await self.close()
+
+# =======================================================================================================
+# --- Fachada: Serialização, Namespaces e Single-Flight ---                                         #####
+# =======================================================================================================
+
+def dumps(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True, datetime=True)
+
+
+def loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, timestamp=3)
+
+
+class Cache:
+    def __init__(
+        self, backend: CacheBackend, prefix: str = "cache", default_ttl: float = 60.0, generation_ttl: float = 86400.0
+    ) -> None:
+        self.backend = backend
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        # Validade dos tokens de geração: sem o token, a chave ganha uma geração nova (um miss).
+        self.generation_ttl = generation_ttl
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._counters: Dict[str, int] = {"hits": 0, "misses": 0, "loads": 0, "coalesced": 0, "errors": 0}
+
+    def _count(self, counter: str) -> None:
+        self._counters[counter] += 1
+
+    async def _version(self, version_key: str, ttl: Optional[float] = None) -> str:
+        # Token de versão (do namespace ou da geração de uma chave). Se não existir (primeiro uso,
+        # expirado ou despejado pelo backend), cria um token novo e único: versões antigas nunca
+        # são reaproveitadas.
+        version = await self.backend.get(version_key)
+        if version is None:
+            await self.backend.set(version_key, secrets.token_hex(8).encode(), ttl=ttl, only_if_absent=True)
+            version = await self.backend.get(version_key)
+        return (version or b"0").decode()
+
+    async def _generation_key(self, namespace: str, key: str) -> str:
+        namespace_version = await self._version(f"{self.prefix}:{namespace}:version")
+        return f"{self.prefix}:{namespace}:{namespace_version}:{key}:generation"
+
+    async def _key(self, namespace: str, key: str) -> str:
+        generation_key = await self._generation_key(namespace, key)
+        generation = await self._version(generation_key, ttl=self.generation_ttl)
+        return f"{generation_key.rpartition(':')[0]}:{generation}"
+
+    async def _lookup(self, namespace: str, key: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """(chave completa, valor serializado); (None, None) se o backend falhou."""
+        try:
+            full_key = await self._key(namespace, key)
+            return full_key, await self.backend.get(full_key)
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Cache indisponível (leitura de %s:%s): %s", namespace, key, exc)
+            return None, None
+
+    async def _store(self, full_key: str, value: Any, ttl: Optional[float]) -> None:
+        try:
+            await self.backend.set(full_key, dumps(value), ttl=self.default_ttl if ttl is None else ttl)
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Cache indisponível (escrita de %s): %s", full_key, exc)
+
+    async def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        _, data = await self._lookup(namespace, key)
+        if data is None:
+            self._count("misses")
+            return default
+        self._count("hits")
+        return loads(data)
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            full_key = await self._key(namespace, key)
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Cache indisponível (escrita de %s:%s): %s", namespace, key, exc)
+            return
+        await self._store(full_key, value, ttl)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        """Invalida a chave trocando sua geração (ver docstring do módulo)."""
+        try:
+            await self.backend.set(
+                await self._generation_key(namespace, key), secrets.token_hex(8).encode(), ttl=self.generation_ttl
+            )
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Cache indisponível (remoção de %s:%s): %s", namespace, key, exc)
+
+    async def invalidate(self, namespace: str) -> None:
+        """Invalida todas as chaves do namespace trocando seu token de versão."""
+        try:
+            await self.backend.set(f"{self.prefix}:{namespace}:version", secrets.token_hex(8).encode())
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Cache indisponível (invalidação de %s): %s", namespace, exc)
+
+    async def get_or_load(
+        self, namespace: str, key: str, loader: Callable[[], Awaitable[T]], ttl: Optional[float] = None
+    ) -> T:
+        """
+        Retorna o valor em cache ou executa `loader` e armazena o resultado. Enquanto um loader
+        da mesma chave estiver em andamento, as demais chamadas aguardam o resultado dele. O
+        resultado é gravado sob a geração lida antes do loader: se a chave for removida nesse
+        meio-tempo, o valor (possivelmente anterior à remoção) não é servido depois dela.
+        """
+        full_key, data = await self._lookup(namespace, key)
+        if data is not None:
+            self._count("hits")
+            return loads(data)  # type: ignore[no-any-return]
+        self._count("misses")
+        flight_key = full_key or f"{self.prefix}:{namespace}:?:{key}"
+
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self._count("coalesced")
+            return await asyncio.shield(pending)  # type: ignore[no-any-return]
+
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            self._count("loads")
+            value = await loader()
+            if full_key is not None:
+                await self._store(full_key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # marca como consumida: sem aviso se ninguém estiver aguardando
+            raise
+        finally:
+            self._inflight.pop(flight_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self.backend).__name__, "inflight": len(self._inflight), **self._counters}
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def run_sync(fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+    """
+    Executa uma operação assíncrona do cache a partir de código síncrono: no event loop da
+    aplicação quando chamada de uma thread de worker (CRUD via run_in_threadpool), ou em um
+    loop próprio fora dele (scripts, testes). Não pode ser chamada da thread do event loop.
+    """
+    started = False
+
+    async def call() -> T:
+        nonlocal started
+        started = True
+        return await fn(*args)
+
+    try:
+        return anyio.from_thread.run(call)
+    except RuntimeError:
+        if started:
+            raise  # o erro veio da própria operação
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_call_in_own_loop(call))
+    raise RuntimeError("run_sync não pode ser chamada da thread do event loop; use a API assíncrona.")
+
+
+async def _call_in_own_loop(call: Callable[[], Awaitable[T]]) -> T:
+    # As conexões abertas neste loop não podem ser fechadas depois que ele terminar.
+    try:
+        return await call()
+    finally:
+        for backend in list(_resp_backends):
+            await backend.close_loop_connections()
+
+
+def build_cache_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "resp":
+        return RespCacheBackend(
+            settings.CACHE_URL, pool_size=settings.CACHE_POOL_SIZE, timeout=settings.CACHE_TIMEOUT_SECONDS
+        )
+    return InProcessCacheBackend(maxsize=settings.CACHE_MAX_ENTRIES)
+
+
+cache = Cache(build_cache_backend(), prefix=settings.CACHE_KEY_PREFIX, default_ttl=settings.CACHE_DEFAULT_TTL_SECONDS)
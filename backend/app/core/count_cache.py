@@ -0,0 +1,35 @@
+# app/core/count_cache.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Optional
+
+from app.core.config import settings
+from app.core.lru import TTLLRUCache
+
+# =======================================================================================================
+# --- Cache de Contagem de Usuários ---                                                             #####
+# =======================================================================================================
+# Guarda o COUNT(*) exato da listagem de usuários por combinação de filtros (X-Total-Count).
+# Qualquer escrita do CRUD de usuários (criação, alteração, deleção) limpa o cache inteiro, já que
+# pode mudar o total de qualquer filtro; escritas feitas fora da aplicação (ou por outro worker)
+# ficam visíveis no máximo após USER_COUNT_CACHE_TTL_SECONDS.
+
+user_count_cache: TTLLRUCache[str, int] = TTLLRUCache(
+    maxsize=settings.USER_COUNT_CACHE_SIZE,
+    ttl=settings.USER_COUNT_CACHE_TTL_SECONDS,
+)
+
+
+def get_user_count(key: str) -> Optional[int]:
+    return user_count_cache.get(key)
+
+
+def store_user_count(key: str, total: int) -> None:
+    user_count_cache.set(key, total)
+
+
+def invalidate_user_counts() -> None:
+    user_count_cache.clear()
@@ -0,0 +1,180 @@
+# app/core/email_queue.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.mailer import EmailTransport, build_email_transport
+from app.crud.email import claim_email_batch, mark_emails_sent, prune_email_messages, reschedule_email
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Worker da Fila de Emails ---                                                                  #####
+# =======================================================================================================
+# Os handlers só inserem a mensagem na tabela email_message (app/crud/email.py) e chamam
+# notify(). Cada thread do worker reivindica um lote de mensagens vencidas, envia o lote por
+# uma conexão do pool SMTP e registra o resultado: enviadas, reagendadas com backoff
+# exponencial (falhas temporárias) ou marcadas como falha (5xx ou tentativas esgotadas).
+# Sem notify (ex.: mensagem enfileirada por outro processo), a fila é verificada a cada
+# EMAIL_POLL_INTERVAL_SECONDS. Periodicamente, as mensagens encerradas há mais de
+# EMAIL_RETENTION_SECONDS são removidas.
+
+SessionFactory = Callable[[], ContextManager[Session]]
+
+
+class EmailWorker:
+    # Intervalo mínimo entre duas limpezas de mensagens encerradas.
+    prune_interval = 60.0
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        transport: EmailTransport,
+        threads: int,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_seconds: float,
+        backoff_max_seconds: float,
+        lease_seconds: float,
+        retention_seconds: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.transport = transport
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._counters: Dict[str, int] = {"batches": 0, "sent": 0, "retried": 0, "failed": 0, "pruned": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff exponencial: base, 2x base, 4x base... limitado a backoff_max_seconds."""
+        return min(self.backoff_seconds * 2 ** max(attempts - 1, 0), self.backoff_max_seconds)
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += amount
+
+    def run_once(self) -> int:
+        """Processa um lote de mensagens vencidas; retorna quantas foram reivindicadas."""
+        with self.session_factory() as db:
+            claimed = claim_email_batch(db, limit=self.batch_size, lease_seconds=self.lease_seconds)
+            if not claimed:
+                return 0
+            results = self.transport.send_batch(claimed)
+            mark_emails_sent(db, [email.id for email, failure in zip(claimed, results) if failure is None])
+            now = datetime.now(timezone.utc)
+            for email, failure in zip(claimed, results):
+                if failure is None:
+                    continue
+                give_up = failure.permanent or email.attempts >= self.max_attempts
+                retry_at: Optional[datetime] = None
+                if not give_up:
+                    retry_at = now + timedelta(seconds=self.retry_delay(email.attempts))
+                reschedule_email(db, email.id, failure.error, retry_at)
+                self._count("failed" if give_up else "retried")
+                logger.warning(
+                    "Falha no envio do email %d para %s (tentativa %d%s): %s",
+                    email.id, email.recipient, email.attempts, ", sem novas tentativas" if give_up else "", failure.error,
+                )
+        self._count("batches")
+        self._count("sent", sum(1 for failure in results if failure is None))
+        return len(claimed)
+
+    def prune(self) -> int:
+        with self.session_factory() as db:
+            pruned = prune_email_messages(db, self.retention_seconds)
+        self._count("pruned", pruned)
+        return pruned
+
+    def _maybe_prune(self) -> None:
+        # Uma thread por intervalo faz a limpeza (as demais seguem enviando).
+        with self._lock:
+            if time.monotonic() - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = time.monotonic()
+        self.prune()
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_once()
+                self._maybe_prune()
+            except Exception:
+                logger.exception("Erro no worker da fila de emails.")
+                processed = 0
+            if processed < self.batch_size:
+                # Fila vazia (ou lote incompleto): espera um notify() ou o intervalo de polling.
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def notify(self) -> None:
+        """Acorda os workers (chamado após enfileirar)."""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"email-worker-{index}", daemon=True)
+            for index in range(self.threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Encerra as threads (após o lote em andamento) e fecha as conexões SMTP ociosas."""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.transport.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"running": self.running, **counters, "transport": self.transport.stats()}
+
+
+def build_email_worker() -> EmailWorker:
+    return EmailWorker(
+        session_factory=SessionLocal,
+        transport=build_email_transport(),
+        threads=settings.EMAIL_WORKER_THREADS,
+        batch_size=settings.EMAIL_BATCH_SIZE,
+        poll_interval=settings.EMAIL_POLL_INTERVAL_SECONDS,
+        max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+        backoff_seconds=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+        backoff_max_seconds=settings.EMAIL_RETRY_BACKOFF_MAX_SECONDS,
+        lease_seconds=settings.EMAIL_LEASE_SECONDS,
+        retention_seconds=settings.EMAIL_RETENTION_SECONDS,
+    )
+
+
+email_worker = build_email_worker()
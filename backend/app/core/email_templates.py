@@ -0,0 +1,50 @@
+# app/core/email_templates.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, NamedTuple, Tuple
+
+from app.core.config import settings
+
+# =======================================================================================================
+# --- Templates de Email ---                                                                        #####
+# =======================================================================================================
+# Templates `string.Template` ($variavel), compilados uma vez por nome e mantidos em cache.
+# `project_name` está sempre disponível. A renderização acontece no enfileiramento: a fila
+# guarda a mensagem pronta e os workers só a enviam.
+
+EMAIL_TEMPLATES: Dict[str, Tuple[str, str]] = {
+    "password_recovery": (
+        "Recuperação de Senha - $project_name",
+        "Use o seguinte token para resetar sua senha (ou clique no link): $token\n"
+        "\n"
+        "Ou acesse o link: $reset_link\n",
+    ),
+    "password_changed": (
+        "Sua senha foi alterada - $project_name",
+        "Sua senha foi alterada com sucesso.\n",
+    ),
+}
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    body: str
+
+
+@lru_cache(maxsize=None)
+def compiled_template(name: str) -> Tuple[Template, Template]:
+    """Template (assunto, corpo) compilado; KeyError se o nome não existir."""
+    subject, body = EMAIL_TEMPLATES[name]
+    return Template(subject), Template(body)
+
+
+def render_email(name: str, **context: Any) -> RenderedEmail:
+    """Renderiza o template `name`; variável ausente no contexto levanta KeyError."""
+    subject, body = compiled_template(name)
+    values = {"project_name": settings.PROJECT_NAME, **context}
+    return RenderedEmail(subject.substitute(values), body.substitute(values))
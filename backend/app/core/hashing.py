@@ -0,0 +1,196 @@
+# app/core/hashing.py
+
+"""
+Política de hashing de senhas (esquema e custos) configurável pelo Settings.
+
+- PASSWORD_HASH_SCHEME escolhe o esquema dos novos hashes: argon2id, bcrypt ou scrypt.
+- Hashes de outros esquemas ou com custos diferentes dos configurados continuam sendo
+  verificados, mas ficam "desatualizados" (`needs_update`): o login refaz o hash com a política
+  atual após uma verificação bem-sucedida, sem migração.
+- PASSWORD_HASH_MEMORY_KIB é o orçamento de memória por hash (memory_cost do argon2id e teto
+  de 128 * r * N do scrypt).
+
+Calibração (escolhe os custos que atingem a latência de verificação alvo neste hardware):
+
+    python -m app.core.hashing calibrate --scheme argon2id --target-ms 250 --memory-kib 65536
+
+argon2id requer o pacote argon2-cffi; scrypt usa o hashlib (OpenSSL).
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import argparse
+import statistics
+import time
+from typing import Dict, List, NamedTuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+# =======================================================================================================
+# --- Política de Hashing ---                                                                       #####
+# =======================================================================================================
+
+# Nome do esquema no Settings -> nome do handler no passlib.
+PASSLIB_SCHEMES: Dict[str, str] = {"argon2id": "argon2", "bcrypt": "bcrypt", "scrypt": "scrypt"}
+
+
+class PasswordHashPolicy(NamedTuple):
+    scheme: str = "bcrypt"
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_parallelism: int = 4
+    memory_kib: int = 65536
+    scrypt_rounds: int = 16  # log2(N)
+    scrypt_block_size: int = 8
+    scrypt_parallelism: int = 1
+
+
+def policy_from_settings() -> PasswordHashPolicy:
+    return PasswordHashPolicy(
+        scheme=settings.PASSWORD_HASH_SCHEME,
+        bcrypt_rounds=settings.PASSWORD_HASH_BCRYPT_ROUNDS,
+        argon2_time_cost=settings.PASSWORD_HASH_ARGON2_TIME_COST,
+        argon2_parallelism=settings.PASSWORD_HASH_ARGON2_PARALLELISM,
+        memory_kib=settings.PASSWORD_HASH_MEMORY_KIB,
+        scrypt_rounds=settings.PASSWORD_HASH_SCRYPT_ROUNDS,
+        scrypt_block_size=settings.PASSWORD_HASH_SCRYPT_BLOCK_SIZE,
+        scrypt_parallelism=settings.PASSWORD_HASH_SCRYPT_PARALLELISM,
+    )
+
+
+def build_password_context(policy: PasswordHashPolicy) -> CryptContext:
+    """
+    CryptContext que gera hashes com o esquema da política e aceita os demais esquemas.
+    min_rounds == max_rounds faz qualquer custo diferente do configurado contar como
+    desatualizado (o argon2 já compara memory_cost/tipo por conta própria).
+    """
+    default = PASSLIB_SCHEMES[policy.scheme]
+    return CryptContext(
+        schemes=[default] + [name for name in PASSLIB_SCHEMES.values() if name != default],
+        default=default,
+        deprecated="auto",
+        bcrypt__rounds=policy.bcrypt_rounds,
+        bcrypt__min_rounds=policy.bcrypt_rounds,
+        bcrypt__max_rounds=policy.bcrypt_rounds,
+        argon2__type="ID",
+        argon2__rounds=policy.argon2_time_cost,
+        argon2__min_rounds=policy.argon2_time_cost,
+        argon2__max_rounds=policy.argon2_time_cost,
+        argon2__memory_cost=policy.memory_kib,
+        argon2__parallelism=policy.argon2_parallelism,
+        scrypt__rounds=policy.scrypt_rounds,
+        scrypt__min_rounds=policy.scrypt_rounds,
+        scrypt__max_rounds=policy.scrypt_rounds,
+        scrypt__block_size=policy.scrypt_block_size,
+        scrypt__parallelism=policy.scrypt_parallelism,
+    )
+
+# =======================================================================================================
+# --- Calibração ---                                                                                #####
+# =======================================================================================================
+
+def measure_verify_ms(policy: PasswordHashPolicy, repeat: int = 3) -> float:
+    """Mediana do tempo (ms) de uma verificação de senha com a política informada."""
+    context = build_password_context(policy)
+    hashed = context.hash("calibration-password")
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _scrypt_memory_kib(rounds: int, block_size: int) -> int:
+    return 128 * block_size * (2 ** rounds) // 1024
+
+
+def calibrate(scheme: str, target_ms: float, memory_kib: int, repeat: int = 3) -> PasswordHashPolicy:
+    """
+    Sobe o custo do esquema enquanto a verificação ficar dentro de `target_ms` e a memória dentro
+    de `memory_kib`; retorna a política mais cara que cabe (ou a mínima, se nenhuma couber).
+    - bcrypt: rounds (log2 das iterações), de 4 a 31.
+    - argon2id: usa todo o orçamento de memória e sobe time_cost; se time_cost=1 já passa do alvo,
+      reduz a memória pela metade (até 8 MiB).
+    - scrypt: sobe log2(N) a partir de 10 enquanto 128 * r * N couber no orçamento.
+    """
+    base = PasswordHashPolicy(scheme=scheme, memory_kib=memory_kib)
+
+    def fits(policy: PasswordHashPolicy) -> bool:
+        return measure_verify_ms(policy, repeat) <= target_ms
+
+    if scheme == "bcrypt":
+        best = base._replace(bcrypt_rounds=4)
+        for rounds in range(5, 32):
+            candidate = base._replace(bcrypt_rounds=rounds)
+            if not fits(candidate):
+                break
+            best = candidate
+        return best
+
+    if scheme == "argon2id":
+        memory = memory_kib
+        while memory > 8192 and not fits(base._replace(memory_kib=memory, argon2_time_cost=1)):
+            memory //= 2
+        best = base._replace(memory_kib=max(memory, 8192), argon2_time_cost=1)
+        for time_cost in range(2, 65):
+            candidate = best._replace(argon2_time_cost=time_cost)
+            if not fits(candidate):
+                break
+            best = candidate
+        return best
+
+    if scheme == "scrypt":
+        best = base._replace(scrypt_rounds=10)
+        for rounds in range(11, 32):
+            candidate = base._replace(scrypt_rounds=rounds)
+            if _scrypt_memory_kib(rounds, candidate.scrypt_block_size) > memory_kib or not fits(candidate):
+                break
+            best = candidate
+        return best._replace(memory_kib=memory_kib)
+
+    raise ValueError(f"Esquema de hashing desconhecido: {scheme}")
+
+
+def policy_env_lines(policy: PasswordHashPolicy) -> List[str]:
+    """Variáveis de ambiente (Settings) correspondentes à política."""
+    lines = [f"PASSWORD_HASH_SCHEME={policy.scheme}"]
+    if policy.scheme == "bcrypt":
+        lines.append(f"PASSWORD_HASH_BCRYPT_ROUNDS={policy.bcrypt_rounds}")
+    elif policy.scheme == "argon2id":
+        lines += [
+            f"PASSWORD_HASH_ARGON2_TIME_COST={policy.argon2_time_cost}",
+            f"PASSWORD_HASH_ARGON2_PARALLELISM={policy.argon2_parallelism}",
+            f"PASSWORD_HASH_MEMORY_KIB={policy.memory_kib}",
+        ]
+    else:
+        lines += [
+            f"PASSWORD_HASH_SCRYPT_ROUNDS={policy.scrypt_rounds}",
+            f"PASSWORD_HASH_SCRYPT_BLOCK_SIZE={policy.scrypt_block_size}",
+            f"PASSWORD_HASH_SCRYPT_PARALLELISM={policy.scrypt_parallelism}",
+            f"PASSWORD_HASH_MEMORY_KIB={policy.memory_kib}",
+        ]
+    return lines
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Calibra os custos do hashing de senhas neste hardware.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = subparsers.add_parser("calibrate")
+    calibrate_parser.add_argument("--scheme", choices=sorted(PASSLIB_SCHEMES), default=settings.PASSWORD_HASH_SCHEME)
+    calibrate_parser.add_argument("--target-ms", type=float, default=250.0)
+    calibrate_parser.add_argument("--memory-kib", type=int, default=settings.PASSWORD_HASH_MEMORY_KIB)
+    calibrate_parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    policy = calibrate(args.scheme, args.target_ms, args.memory_kib, args.repeat)
+    print(f"# verificação: {measure_verify_ms(policy, args.repeat):.1f} ms (alvo: {args.target_ms:.0f} ms)")
+    print("\n".join(policy_env_lines(policy)))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,184 @@
+# app/core/keys.py
+
+"""
+Chaveiro (key ring) de assinatura de JWT indexado por `kid`.
+
+- HS256 (padrão): uma única chave simétrica (SECRET_KEY); nada é publicado no JWKS.
+- RS256 / ES256: as chaves ficam em JWT_KEYS_DIR como `<kid>.pem` (privada: assina e verifica)
+  ou `<kid>.pub.pem` (pública: apenas verifica). JWT_ACTIVE_KID escolhe a chave de assinatura.
+  As chaves públicas são publicadas no JWKS para que outros serviços validem os tokens localmente.
+
+As chaves são lidas e convertidas em objetos do python-jose uma única vez, no carregamento;
+assinar/verificar não faz parsing de PEM por request.
+
+Rotação sem downtime:
+  1. gere a nova chave (`python -m app.core.keys generate --kid <novo> --dir <JWT_KEYS_DIR>`) e
+     faça o deploy: ela passa a constar no JWKS, mas ainda não assina;
+  2. depois que os consumidores atualizarem o JWKS, aponte JWT_ACTIVE_KID para ela;
+  3. após o maior tempo de vida de um token, substitua a chave antiga por `<kid>.pub.pem`
+     ou remova-a.
+
+Tipos de token: todos são assinados pela mesma chave ativa, então quem valida pelo JWKS precisa
+distinguir o access token dos demais. O access token leva o header `typ: at+jwt` (RFC 9068) e
+`aud` = JWT_AUDIENCE; refresh tokens e tokens de recuperação de senha levam `aud` próprios
+(`<JWT_AUDIENCE>:refresh`, `<JWT_AUDIENCE>:password_reset`) e a claim `type`. Um consumidor deve
+exigir `aud == JWT_AUDIENCE` (e, se puder, `typ == at+jwt`) antes de aceitar um token.
+
+EdDSA não é suportado pelo python-jose; as opções assimétricas são RS256 e ES256.
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from app.core.config import settings
+
+# =======================================================================================================
+# --- Chaveiro ---                                                                                  #####
+# =======================================================================================================
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+PRIVATE_KEY_SUFFIX = ".pem"
+PUBLIC_KEY_SUFFIX = ".pub.pem"
+
+
+class KeyRingError(RuntimeError):
+    """Configuração de chaves de JWT inválida."""
+
+
+class JWTKey(NamedTuple):
+    kid: str
+    signing_key: Optional[Key]  # None para chaves apenas de verificação
+    verifying_key: Key
+    public_jwk: Optional[Dict[str, Any]]  # None para chaves simétricas (nunca publicadas)
+
+
+class KeyRing:
+    def __init__(self, algorithm: str, keys: List[JWTKey], active_kid: str) -> None:
+        self.algorithm = algorithm
+        self._keys = {key.kid: key for key in keys}
+        if active_kid not in self._keys or self._keys[active_kid].signing_key is None:
+            raise KeyRingError(f"A chave ativa '{active_kid}' não existe ou não tem parte privada.")
+        self.active_kid = active_kid
+
+    @property
+    def kids(self) -> List[str]:
+        return sorted(self._keys)
+
+    def sign(self, claims: Dict[str, Any], typ: Optional[str] = None) -> str:
+        active = self._keys[self.active_kid]
+        headers = {"kid": active.kid} if typ is None else {"kid": active.kid, "typ": typ}
+        return jwt.encode(claims, active.signing_key, algorithm=self.algorithm, headers=headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verifica assinatura e expiração com a chave indicada pelo `kid` do header.
+        Tokens sem `kid` só são aceitos com HS256 (emitidos antes do chaveiro).
+        O `aud` não é conferido aqui: cada tipo de token exige o seu em app/core/security.py.
+        Levanta JWTError se o token for inválido ou o `kid` desconhecido.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None and self.algorithm not in ASYMMETRIC_ALGORITHMS:
+            kid = self.active_kid
+        key = self._keys.get(kid) if isinstance(kid, str) else None
+        if key is None:
+            raise JWTError("Chave de assinatura desconhecida.")
+        return jwt.decode(
+            token, key.verifying_key, algorithms=[self.algorithm], options={"verify_aud": False}
+        )
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """JSON Web Key Set com as chaves públicas (vazio para HS256)."""
+        return {"keys": [key.public_jwk for key in self._keys.values() if key.public_jwk is not None]}
+
+
+def _public_jwk(kid: str, algorithm: str, public_key: Key) -> Dict[str, Any]:
+    return {**public_key.to_dict(), "kid": kid, "alg": algorithm, "use": "sig"}
+
+
+def _load_asymmetric_key(path: Path, algorithm: str) -> JWTKey:
+    is_public = path.name.endswith(PUBLIC_KEY_SUFFIX)
+    kid = path.name[: -len(PUBLIC_KEY_SUFFIX if is_public else PRIVATE_KEY_SUFFIX)]
+    parsed = jwk.construct(path.read_text(), algorithm)
+    public_key = parsed if is_public else parsed.public_key()
+    return JWTKey(kid, None if is_public else parsed, public_key, _public_jwk(kid, algorithm, public_key))
+
+
+def build_key_ring(
+    algorithm: str, secret_key: str, keys_dir: Optional[str] = None, active_kid: Optional[str] = None
+) -> KeyRing:
+    """
+    Monta o chaveiro a partir da configuração (ver docstring do módulo).
+    """
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        kid = active_kid or "default"
+        key = jwk.construct(secret_key, algorithm)
+        return KeyRing(algorithm, [JWTKey(kid, key, key, None)], kid)
+
+    if not keys_dir or not Path(keys_dir).is_dir():
+        raise KeyRingError(f"{algorithm} requer JWT_KEYS_DIR apontando para o diretório de chaves.")
+    loaded: Dict[str, JWTKey] = {}
+    for path in sorted(Path(keys_dir).glob(f"*{PRIVATE_KEY_SUFFIX}")):
+        key = _load_asymmetric_key(path, algorithm)
+        if key.kid not in loaded or key.signing_key is not None:  # a privada prevalece sobre a .pub
+            loaded[key.kid] = key
+    keys = list(loaded.values())
+    if active_kid is None:
+        private_kids = [key.kid for key in keys if key.signing_key is not None]
+        if len(private_kids) != 1:
+            raise KeyRingError("Defina JWT_ACTIVE_KID quando houver zero ou várias chaves privadas.")
+        active_kid = private_kids[0]
+    return KeyRing(algorithm, keys, active_kid)
+
+
+key_ring = build_key_ring(
+    settings.ALGORITHM, settings.SECRET_KEY, settings.JWT_KEYS_DIR, settings.JWT_ACTIVE_KID
+)
+
+# =======================================================================================================
+# --- Geração de Chaves (CLI) ---                                                                   #####
+# =======================================================================================================
+
+def generate_private_key_pem(algorithm: str) -> bytes:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    private_key: Any
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise KeyRingError(f"Algoritmo assimétrico não suportado: {algorithm}")
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Gera uma chave privada para o chaveiro de JWT.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate = subparsers.add_parser("generate")
+    generate.add_argument("--kid", required=True)
+    generate.add_argument("--algorithm", choices=ASYMMETRIC_ALGORITHMS, default="RS256")
+    generate.add_argument("--dir", required=True)
+    args = parser.parse_args()
+
+    path = Path(args.dir) / f"{args.kid}{PRIVATE_KEY_SUFFIX}"
+    if path.exists():
+        raise SystemExit(f"{path} já existe.")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(generate_private_key_pem(args.algorithm))
+    path.chmod(0o600)
+    print(f"Chave '{args.kid}' ({args.algorithm}) gravada em {path}.")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
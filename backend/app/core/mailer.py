@@ -0,0 +1,217 @@
+# app/core/mailer.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import logging
+import smtplib
+import ssl
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from email.message import EmailMessage as MIMEMessage
+from email.utils import formataddr
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from app.core.config import settings
+from app.crud.email import ClaimedEmail
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Resultado de Envio ---                                                                        #####
+# =======================================================================================================
+
+class SendFailure(NamedTuple):
+    """Falha no envio de uma mensagem; `permanent` (SMTP 5xx) dispensa novas tentativas."""
+    error: str
+    permanent: bool
+
+
+DeliveryResults = List[Optional[SendFailure]]
+
+
+def build_mime_message(email: ClaimedEmail, sender: str) -> MIMEMessage:
+    message = MIMEMessage()
+    message["From"] = sender
+    message["To"] = email.recipient
+    message["Subject"] = email.subject
+    message.set_content(email.body)
+    return message
+
+
+def default_sender() -> str:
+    address = settings.EMAILS_FROM_EMAIL or f"no-reply@{settings.PROJECT_NAME.lower()}.local"
+    return formataddr((settings.EMAILS_FROM_NAME or settings.PROJECT_NAME, str(address)))
+
+# =======================================================================================================
+# --- Pool de Conexões SMTP ---                                                                     #####
+# =======================================================================================================
+
+class SMTPConnectionPool:
+    """
+    Conexões SMTP persistentes (EHLO, STARTTLS e AUTH só na abertura), limitadas a `size`
+    em uso simultâneo. Uma conexão ociosa é testada com NOOP antes do reuso; conexões que
+    falharem durante o uso são descartadas em vez de devolvidas.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_tls: bool,
+        username: Optional[str],
+        password: Optional[str],
+        timeout: float,
+        size: int,
+        smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._smtp_factory = smtp_factory
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._idle: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reuses = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = self._smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        with self._lock:
+            self.connects += 1
+        return smtp
+
+    def _take_idle(self) -> Optional[smtplib.SMTP]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                smtp = self._idle.pop()
+            try:
+                if smtp.noop()[0] == 250:
+                    with self._lock:
+                        self.reuses += 1
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            smtp.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        with self._slots:
+            smtp = self._take_idle() or self._connect()
+            try:
+                yield smtp
+            except BaseException:
+                smtp.close()
+                raise
+            with self._lock:
+                self._idle.append(smtp)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp in idle:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"idle": len(self._idle), "connects": self.connects, "reuses": self.reuses}
+
+# =======================================================================================================
+# --- Transportes ---                                                                               #####
+# =======================================================================================================
+
+class EmailTransport(ABC):
+    """Interface dos transportes usados pelo worker da fila de emails."""
+
+    @abstractmethod
+    def send_batch(self, emails: Sequence[ClaimedEmail]) -> DeliveryResults:
+        """Envia o lote; retorna, na mesma ordem, None (enviada) ou a falha de cada mensagem."""
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class SMTPTransport(EmailTransport):
+    """Envia cada lote por uma única conexão do pool (um MAIL FROM/RCPT/DATA por mensagem)."""
+
+    def __init__(self, pool: SMTPConnectionPool, sender: str) -> None:
+        self.pool = pool
+        self.sender = sender
+
+    def send_batch(self, emails: Sequence[ClaimedEmail]) -> DeliveryResults:
+        results: DeliveryResults = []
+        try:
+            with self.pool.connection() as smtp:
+                for email in emails:
+                    try:
+                        smtp.send_message(build_mime_message(email, self.sender))
+                    except smtplib.SMTPRecipientsRefused as exc:
+                        code, reply = next(iter(exc.recipients.values()))
+                        results.append(SendFailure(f"{code} {reply!r}", permanent=code >= 500))
+                    except smtplib.SMTPResponseException as exc:
+                        # O smtplib já enviou RSET: a conexão segue utilizável para as próximas.
+                        results.append(SendFailure(f"{exc.smtp_code} {exc.smtp_error!r}", permanent=exc.smtp_code >= 500))
+                    else:
+                        results.append(None)
+        except (smtplib.SMTPException, OSError) as exc:
+            # Conexão perdida (ou falha ao abrir): o restante do lote fica para a próxima tentativa.
+            failure = SendFailure(f"{type(exc).__name__}: {exc}", permanent=False)
+            results.extend(failure for _ in range(len(emails) - len(results)))
+        return results
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def stats(self) -> Dict[str, int]:
+        return self.pool.stats()
+
+
+class LoggingTransport(EmailTransport):
+    """
+    Sem SMTP_HOST configurado (desenvolvimento): registra as mensagens no log em vez de enviar.
+    O corpo (que pode conter tokens) só aparece no nível DEBUG.
+    """
+
+    def send_batch(self, emails: Sequence[ClaimedEmail]) -> DeliveryResults:
+        for email in emails:
+            logger.info("Email (sem SMTP_HOST) para %s: %s", email.recipient, email.subject)
+            logger.debug("Corpo do email para %s:\n%s", email.recipient, email.body)
+        return [None] * len(emails)
+
+
+def build_email_transport() -> EmailTransport:
+    """Transporte configurado pelas settings SMTP_* (LoggingTransport sem SMTP_HOST)."""
+    if not settings.SMTP_HOST:
+        return LoggingTransport()
+    pool = SMTPConnectionPool(
+        host=settings.SMTP_HOST,
+        port=settings.SMTP_PORT or (587 if settings.SMTP_TLS else 25),
+        use_tls=settings.SMTP_TLS,
+        username=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
+        size=settings.EMAIL_WORKER_THREADS,
+    )
+    return SMTPTransport(pool, default_sender())
@@ -0,0 +1,316 @@
+# app/core/outbox.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.outbox import (
+    OutboxRecord, advance_cursor, fetch_events_after, lock_cursor, prune_outbox_events, transaction_horizon,
+)
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Sinks ---                                                                                     #####
+# =======================================================================================================
+# Um sink recebe lotes de eventos em ordem de offset. publish() deve levantar exceção se o lote
+# não foi entregue por inteiro: o cursor do sink não avança e o lote é reenviado no próximo ciclo
+# (entrega ao menos uma vez; consumidores deduplicam pelo offset).
+
+class OutboxSink(ABC):
+    """Interface dos destinos do relay; `name` identifica o cursor do sink na tabela outbox_cursor."""
+
+    name = "sink"
+
+    @abstractmethod
+    def publish(self, records: Sequence[OutboxRecord]) -> None:
+        """Entrega o lote inteiro ou levanta exceção (ver comentário da seção)."""
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink(OutboxSink):
+    """Acrescenta os eventos a um arquivo NDJSON (fsync por lote)."""
+
+    def __init__(self, path: str, name: str = "file") -> None:
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+
+    def publish(self, records: Sequence[OutboxRecord]) -> None:
+        lines = "".join(json.dumps(record.as_dict(), default=str) + "\n" for record in records)
+        with self._lock, open(self.path, "a", encoding="utf-8") as output:
+            output.write(lines)
+            output.flush()
+            os.fsync(output.fileno())
+
+
+class QueueSink(OutboxSink):
+    """Entrega os eventos (dicts de OutboxRecord.as_dict) a consumidores no mesmo processo."""
+
+    def __init__(self, events: Optional["queue.Queue[Dict[str, object]]"] = None, name: str = "queue") -> None:
+        self.events: "queue.Queue[Dict[str, object]]" = events if events is not None else queue.Queue()
+        self.name = name
+
+    def publish(self, records: Sequence[OutboxRecord]) -> None:
+        for record in records:
+            self.events.put(record.as_dict())
+
+
+class WebhookSink(OutboxSink):
+    """POST de `{"events": [...]}` por lote; qualquer resposta fora de 2xx conta como falha."""
+
+    def __init__(self, url: str, timeout: float, name: str = "webhook") -> None:
+        self.url = url
+        self.timeout = timeout
+        self.name = name
+
+    def publish(self, records: Sequence[OutboxRecord]) -> None:
+        body = json.dumps({"events": [record.as_dict() for record in records]}, default=str).encode()
+        request = urllib.request.Request(
+            self.url, data=body, method="POST", headers={"Content-Type": "application/json"}
+        )
+        # urlopen levanta HTTPError para respostas 4xx/5xx.
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise urllib.error.HTTPError(self.url, response.status, response.reason, response.headers, None)
+
+# =======================================================================================================
+# --- Relay ---                                                                                     #####
+# =======================================================================================================
+# Para cada sink, em uma transação: bloqueia o cursor (FOR UPDATE), lê os eventos seguintes ao
+# offset, publica o lote e avança o cursor. Como ids são atribuídos no INSERT e não no commit,
+# um offset menor pode ficar visível depois de um maior (transação mais lenta): o relay só
+# publica o prefixo contíguo e não passa de um offset ausente enquanto a transação que o
+# reservou puder estar aberta.
+#
+# No PostgreSQL isso é verificado pelo snapshot (transaction_horizon): o offset ausente foi
+# reservado antes do offset seguinte, já confirmado, então por uma transação já iniciada. Um
+# ciclo depois de ver a lacuna (tempo de sobra para essa transação ter recebido seu id), o relay
+# guarda o xmax corrente; quando o xmin passa dele, todas essas transações terminaram e a
+# lacuna é definitiva (rollback ou valor de sequence descartado). Sem essa informação (SQLite,
+# em que as escritas são serializadas), e como último recurso no PostgreSQL, a lacuna é
+# descartada após OUTBOX_GAP_TIMEOUT_SECONDS, com log de erro: eventos confirmados depois disso
+# seriam perdidos, então o prazo deve ficar muito acima da transação mais longa.
+
+SessionFactory = Callable[[], ContextManager[Session]]
+
+
+class OutboxRelay:
+    # Intervalo mínimo entre duas limpezas de eventos já entregues.
+    prune_interval = 60.0
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        sinks: Sequence[OutboxSink],
+        batch_size: int,
+        poll_interval: float,
+        gap_timeout: float,
+        retention_seconds: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.retention_seconds = retention_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        # Por sink: (primeiro offset ausente, xmax guardado) da lacuna em observação.
+        self._gaps: Dict[str, Tuple[int, Optional[int]]] = {}
+        self._counters: Dict[str, int] = {
+            "batches": 0, "published": 0, "failures": 0, "pruned": 0, "gaps_settled": 0, "gaps_timed_out": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += amount
+
+    @staticmethod
+    def first_gap(records: Sequence[OutboxRecord], offset: int) -> Optional[int]:
+        """Primeiro offset ausente entre `offset` e os registros lidos (None se contíguos)."""
+        expected = offset + 1
+        for record in records:
+            if record.offset != expected:
+                return expected
+            expected = record.offset + 1
+        return None
+
+    def deliverable(
+        self, records: Sequence[OutboxRecord], offset: int, settled_gap: Optional[int] = None
+    ) -> List[OutboxRecord]:
+        """
+        Prefixo de `records` sem lacunas em aberto após `offset` (ver comentário da seção).
+        `settled_gap` é o primeiro offset de uma lacuna já comprovada como definitiva.
+        """
+        gap_cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.gap_timeout)
+        ready: List[OutboxRecord] = []
+        expected = offset + 1
+        for record in records:
+            if record.offset != expected:
+                created_at = record.created_at.replace(tzinfo=record.created_at.tzinfo or timezone.utc)
+                if expected == settled_gap:
+                    self._count("gaps_settled")
+                    logger.warning(
+                        "Offsets %d-%d do outbox ausentes sem transação aberta (rollback); seguindo.",
+                        expected, record.offset - 1,
+                    )
+                elif created_at <= gap_cutoff:
+                    self._count("gaps_timed_out")
+                    logger.error(
+                        "Offsets %d-%d do outbox ausentes há mais de %.0fs; seguindo sem eles (eventos "
+                        "confirmados depois disso não serão publicados).",
+                        expected, record.offset - 1, self.gap_timeout,
+                    )
+                else:
+                    break
+            ready.append(record)
+            expected = record.offset + 1
+        return ready
+
+    def settled_gap(self, db: Session, sink: OutboxSink, records: Sequence[OutboxRecord], offset: int) -> Optional[int]:
+        """Primeiro offset da lacuna do sink, se comprovada como definitiva pelo snapshot (PostgreSQL)."""
+        missing = self.first_gap(records, offset)
+        if missing is None:
+            self._gaps.pop(sink.name, None)
+            return None
+        horizon = transaction_horizon(db)
+        if horizon is None:
+            return None
+        xmin, xmax = horizon
+        seen = self._gaps.get(sink.name)
+        if seen is None or seen[0] != missing:
+            self._gaps[sink.name] = (missing, None)
+            return None
+        if seen[1] is None:
+            self._gaps[sink.name] = (missing, xmax)
+            return None
+        return missing if xmin >= seen[1] else None
+
+    def relay_sink(self, db: Session, sink: OutboxSink) -> int:
+        """Publica um lote no sink; retorna quantos eventos foram entregues (0 em caso de falha)."""
+        offset = lock_cursor(db, sink.name)
+        fetched = fetch_events_after(db, offset, self.batch_size)
+        records = self.deliverable(fetched, offset, self.settled_gap(db, sink, fetched, offset))
+        published = 0
+        if records:
+            try:
+                sink.publish(records)
+            except Exception:
+                self._count("failures")
+                logger.exception(
+                    "Falha ao publicar %d eventos do outbox (offsets %d-%d) no sink %s.",
+                    len(records), records[0].offset, records[-1].offset, sink.name,
+                )
+            else:
+                advance_cursor(db, sink.name, records[-1].offset)
+                published = len(records)
+        # Confirma o avanço do cursor (ou só libera o bloqueio, quando nada foi entregue).
+        db.commit()
+        if published:
+            self._count("batches")
+            self._count("published", published)
+        return published
+
+    def run_once(self) -> int:
+        """Um ciclo em todos os sinks; retorna o maior lote entregue a um sink."""
+        largest = 0
+        for sink in self.sinks:
+            with self.session_factory() as db:
+                largest = max(largest, self.relay_sink(db, sink))
+        return largest
+
+    def prune(self) -> int:
+        with self.session_factory() as db:
+            pruned = prune_outbox_events(db, [sink.name for sink in self.sinks], self.retention_seconds)
+        self._count("pruned", pruned)
+        return pruned
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                published = self.run_once()
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception:
+                logger.exception("Erro no relay do outbox.")
+                published = 0
+            if published < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def notify(self) -> None:
+        """Acorda o relay antes do próximo intervalo de polling."""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None or not self.sinks:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Encerra a thread após o ciclo em andamento e fecha os sinks."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        for sink in self.sinks:
+            sink.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"running": self.running, **counters, "sinks": [sink.name for sink in self.sinks]}
+
+
+def build_outbox_sinks() -> List[OutboxSink]:
+    """Sinks configurados pelas settings OUTBOX_*; consumidores no processo podem acrescentar um QueueSink."""
+    sinks: List[OutboxSink] = []
+    if settings.OUTBOX_FILE_SINK_PATH:
+        sinks.append(FileSink(settings.OUTBOX_FILE_SINK_PATH))
+    if settings.OUTBOX_WEBHOOK_URL:
+        sinks.append(WebhookSink(settings.OUTBOX_WEBHOOK_URL, settings.OUTBOX_WEBHOOK_TIMEOUT_SECONDS))
+    return sinks
+
+
+def build_outbox_relay() -> OutboxRelay:
+    return OutboxRelay(
+        session_factory=SessionLocal,
+        sinks=build_outbox_sinks(),
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        gap_timeout=settings.OUTBOX_GAP_TIMEOUT_SECONDS,
+        retention_seconds=settings.OUTBOX_RETENTION_SECONDS,
+    )
+
+
+outbox_relay = build_outbox_relay()
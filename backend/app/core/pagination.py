@@ -0,0 +1,37 @@
+# app/core/pagination.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+# =======================================================================================================
+# --- Cursores Opacos (Keyset Pagination) ---                                                       #####
+# =======================================================================================================
+# O cursor carrega a chave de ordenação e os valores da última linha entregue, para que a
+# próxima página seja buscada com `WHERE (sort_key, id) > (:valor, :id)` em vez de OFFSET.
+# É apenas codificado (base64 de JSON compacto): o servidor valida o conteúdo ao decodificar.
+
+
+class InvalidCursor(ValueError):
+    """Levantada quando o cursor recebido não pode ser decodificado."""
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor("Cursor inválido.") from exc
+    if not isinstance(data, dict):
+        raise InvalidCursor("Cursor inválido.")
+    return data
@@ -0,0 +1,74 @@
+# app/core/principal_cache.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.lru import TTLLRUCache
+from app.db.models.user import User as UserModel
+
+# =======================================================================================================
+# --- Cache de Principal Autenticado ---                                                            #####
+# =======================================================================================================
+# Evita o SELECT por request em deps.get_current_user. A chave é o subject do token (email)
+# e o valor é um snapshot imutável das colunas de autorização (PRINCIPAL_FIELDS); o hash da
+# senha e as demais colunas não ficam em memória e são lidos sob demanda (ex.: troca de senha).
+# A invalidação é local: atualizações/deleções feitas pelo CRUD neste processo invalidam a
+# entrada na hora, e a recarga lê do primário (não de uma réplica atrasada). Por isso o cache
+# só vale com um único processo servindo a API: app.serve recusa vários workers com ele
+# ligado, e implantações com várias instâncias devem usar PRINCIPAL_CACHE_ENABLED=false.
+# Escritas feitas fora da aplicação ficam visíveis no máximo após PRINCIPAL_CACHE_TTL_SECONDS.
+
+PrincipalSnapshot = Dict[str, Any]
+
+# Colunas usadas na autorização e nas respostas de /users/me (UserRead, ETag).
+PRINCIPAL_FIELDS = ("id", "email", "full_name", "is_active", "is_superuser", "version")
+
+principal_cache: TTLLRUCache[str, PrincipalSnapshot] = TTLLRUCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE if settings.PRINCIPAL_CACHE_ENABLED else 0,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def snapshot_user(user: UserModel) -> PrincipalSnapshot:
+    """Copia os valores de PRINCIPAL_FIELDS (sem referência à sessão de origem)."""
+    return {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+
+
+def user_from_snapshot(snapshot: PrincipalSnapshot) -> UserModel:
+    """
+    Reconstrói um UserModel "detached" e limpo (sem alterações pendentes) a partir do snapshot,
+    pronto para ser anexado a uma sessão com `merge(..., load=False)` sem emitir SELECT.
+    As colunas fora do snapshot ficam não carregadas.
+    """
+    user = UserModel()
+    for key, value in snapshot.items():
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    return user
+
+
+def get_principal(subject: str) -> Optional[PrincipalSnapshot]:
+    return principal_cache.get(subject)
+
+
+def store_principal(user: UserModel) -> None:
+    principal_cache.set(user.email, snapshot_user(user))
+
+
+def invalidate_principal(*subjects: Optional[str]) -> None:
+    """Remove os principals informados do cache (ex.: email antigo e novo após uma alteração)."""
+    for subject in subjects:
+        if subject:
+            principal_cache.pop(subject)
+
+
+def invalidate_principal_by_id(user_id: int) -> None:
+    """Remove o principal do usuário sem conhecer o email (ex.: troca de email sem SELECT prévio)."""
+    principal_cache.pop_matching(lambda snapshot: snapshot.get("id") == user_id)
@@ -0,0 +1,295 @@
+# app/core/rate_limit.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import CacheError, RespCacheBackend, cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Stores de Contadores ---                                                                      #####
+# =======================================================================================================
+# O limitador só precisa de contadores com expiração (INCRBY + EXPIRE): o store em memória vale
+# por processo; com CACHE_BACKEND=resp os contadores ficam no servidor do cache, compartilhados
+# entre workers/instâncias (ver build_rate_limit_store).
+
+class RateLimitStore(ABC):
+    """Interface dos stores de contadores usados pelo limitador."""
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        """
+        Soma `amount` ao contador (criando-o com expiração `ttl` se não existir) e retorna o
+        novo valor, de forma atômica.
+        """
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> List[int]:
+        """Valores atuais dos contadores (0 para ausentes ou expirados)."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove os contadores."""
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Store em memória, thread-safe e limitado a `maxsize` contadores (despejo LRU)."""
+
+    def __init__(self, maxsize: int = 100_000, clock: Callable[[], float] = time.time) -> None:
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        now = self._clock()
+        with self._lock:
+            expires_at, value = self._data.get(key, (0.0, 0))
+            if expires_at <= now:
+                expires_at, value = now + ttl, 0
+            self._data[key] = (expires_at, value + amount)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value + amount
+
+    async def get_many(self, keys: Sequence[str]) -> List[int]:
+        now = self._clock()
+        with self._lock:
+            values = []
+            for key in keys:
+                expires_at, value = self._data.get(key, (0.0, 0))
+                values.append(value if expires_at > now else 0)
+            return values
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RespRateLimitStore(RateLimitStore):
+    """
+    Contadores no servidor RESP do cache (INCRBY + PEXPIRE no mesmo pipeline). A expiração é
+    renovada a cada incremento; como as chaves levam o índice da janela, isso só adia a
+    remoção de um contador que já não é lido.
+    """
+
+    def __init__(self, backend: RespCacheBackend, prefix: str) -> None:
+        self.backend = backend
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        full_key = self._key(key)
+        value, _ = await self.backend.pipeline(
+            ("INCRBY", full_key, amount), ("PEXPIRE", full_key, max(1, int(ttl * 1000)))
+        )
+        return int(value)  # type: ignore[arg-type]
+
+    async def get_many(self, keys: Sequence[str]) -> List[int]:
+        if not keys:
+            return []
+        values = await self.backend.execute("MGET", *(self._key(key) for key in keys))
+        return [int(value) if value is not None else 0 for value in values]  # type: ignore[union-attr]
+
+    async def delete(self, *keys: str) -> None:
+        await self.backend.delete(*(self._key(key) for key in keys))
+
+# =======================================================================================================
+# --- Janela Deslizante ---                                                                         #####
+# =======================================================================================================
+
+class SlidingWindow:
+    """
+    Contador de janela deslizante aproximada: a contagem é a da janela fixa atual somada à
+    da anterior, ponderada pela fração da janela anterior que ainda está dentro da janela
+    deslizante. Usa só dois contadores por chave e funciona com qualquer RateLimitStore.
+    """
+
+    def __init__(
+        self, store: RateLimitStore, prefix: str, limit: int, window_seconds: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self.prefix = prefix
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._clock = clock
+
+    def _buckets(self, key: str) -> Tuple[str, str, float]:
+        now = self._clock()
+        index = math.floor(now / self.window_seconds)
+        elapsed = now / self.window_seconds - index
+        return f"{self.prefix}:{key}:{index}", f"{self.prefix}:{key}:{index - 1}", elapsed
+
+    def _retry_after(self, current: int, previous: int, elapsed: float) -> Optional[float]:
+        # Um release na virada da janela pode deixar o contador atual negativo.
+        current, previous = max(0, current), max(0, previous)
+        if previous * (1 - elapsed) + current < self.limit:
+            return None
+        if current < self.limit:
+            # A parcela da janela anterior cai com o tempo: (1 - e) * previous + current < limit.
+            return (1 - (self.limit - current) / previous - elapsed) * self.window_seconds
+        # Na próxima janela a atual vira a anterior: (1 - e) * current < limit.
+        return (1 - elapsed + 1 - self.limit / current) * self.window_seconds
+
+    async def retry_after(self, key: str) -> Optional[float]:
+        """None se a chave está abaixo do limite; senão, segundos até voltar a ficar abaixo."""
+        current_key, previous_key, elapsed = self._buckets(key)
+        current, previous = await self.store.get_many([current_key, previous_key])
+        return self._retry_after(current, previous, elapsed)
+
+    async def acquire(self, key: str) -> Optional[float]:
+        """
+        Reserva uma tentativa: incrementa primeiro e decide com o valor devolvido pelo store,
+        de modo que tentativas concorrentes nunca passam juntas do limite. Retorna None se a
+        tentativa foi aceita; senão, desfaz a reserva e retorna o retry_after.
+        """
+        current_key, previous_key, elapsed = self._buckets(key)
+        current = await self.store.incr(current_key, ttl=2 * self.window_seconds)
+        [previous] = await self.store.get_many([previous_key])
+        retry_after = self._retry_after(current - 1, previous, elapsed)
+        if retry_after is not None:
+            await self.release(key)
+        return retry_after
+
+    async def release(self, key: str) -> None:
+        current_key, _, _ = self._buckets(key)
+        await self.store.incr(current_key, ttl=2 * self.window_seconds, amount=-1)
+
+    async def hit(self, key: str) -> None:
+        current_key, _, _ = self._buckets(key)
+        await self.store.incr(current_key, ttl=2 * self.window_seconds)
+
+    async def reset(self, key: str) -> None:
+        current_key, previous_key, _ = self._buckets(key)
+        await self.store.delete(current_key, previous_key)
+
+# =======================================================================================================
+# --- Limitador de Login ---                                                                        #####
+# =======================================================================================================
+
+class LoginRateLimited(Exception):
+    """Levantada quando o login é rejeitado pelo limitador (convertida em 429 pela API)."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(retry_after)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class LoginRateLimiter:
+    """
+    Limita POST /auth/login antes de qualquer verificação de senha:
+    - por IP: todas as tentativas (barra o credential stuffing de uma origem);
+    - por email: tentativas sem sucesso (barra a força bruta distribuída contra uma conta).
+    check() reserva a tentativa nos dois contadores antes do hashing; a reserva do email só é
+    desfeita por um login bem-sucedido (record_success zera o contador), então tentativas
+    concorrentes contra o mesmo email nunca passam do limite, mesmo vindas de vários IPs.
+    Se o store estiver indisponível (servidor do cache fora), o login não é bloqueado.
+    """
+
+    def __init__(
+        self, store: RateLimitStore, ip_limit: int, ip_window_seconds: float,
+        email_limit: int, email_window_seconds: float, enabled: bool = True,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self.enabled = enabled
+        self.per_ip = SlidingWindow(store, "login:ip", ip_limit, ip_window_seconds, clock)
+        self.per_email = SlidingWindow(store, "login:email", email_limit, email_window_seconds, clock)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"ip": 0, "email": 0, "errors": 0}
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        # O email não vai em claro para o store (que pode ser compartilhado).
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _reject(self, kind: str, retry_after: float) -> LoginRateLimited:
+        self._count(kind)
+        return LoginRateLimited(retry_after)
+
+    async def check(self, ip: Optional[str], email: str) -> None:
+        """Reserva a tentativa do IP e do email ou levanta LoginRateLimited se algum estourou o limite."""
+        if not self.enabled:
+            return
+        ip_key = ip or "unknown"
+        try:
+            retry_after = await self.per_ip.acquire(ip_key)
+            if retry_after is not None:
+                raise self._reject("ip", retry_after)
+            retry_after = await self.per_email.acquire(self._email_key(email))
+            if retry_after is not None:
+                await self.per_ip.release(ip_key)
+                raise self._reject("email", retry_after)
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Store do limitador de login indisponível; tentativa liberada: %s", exc)
+
+    async def record_success(self, email: str) -> None:
+        """Zera as falhas do email (inclusive a reserva feita por check)."""
+        if not self.enabled:
+            return
+        try:
+            await self.per_email.reset(self._email_key(email))
+        except CacheError as exc:
+            self._count("errors")
+            logger.warning("Store do limitador de login indisponível: %s", exc)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "enabled": self.enabled,
+            "store": type(self.store).__name__,
+            "rejected_ip": counters["ip"],
+            "rejected_email": counters["email"],
+            "errors": counters["errors"],
+        }
+
+
+def build_rate_limit_store() -> RateLimitStore:
+    """Store no servidor do cache com CACHE_BACKEND=resp (compartilhado); senão, em memória."""
+    if isinstance(cache.backend, RespCacheBackend):
+        return RespRateLimitStore(cache.backend, prefix=f"{settings.CACHE_KEY_PREFIX}:ratelimit")
+    return InMemoryRateLimitStore()
+
+
+def configure_login_rate_limiter(store: RateLimitStore) -> LoginRateLimiter:
+    """(Re)cria o limitador de login com o store informado, mantendo os limites do Settings."""
+    global login_rate_limiter
+    login_rate_limiter = LoginRateLimiter(
+        store,
+        ip_limit=settings.LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+        ip_window_seconds=settings.LOGIN_RATE_LIMIT_IP_WINDOW_SECONDS,
+        email_limit=settings.LOGIN_RATE_LIMIT_EMAIL_FAILURES,
+        email_window_seconds=settings.LOGIN_RATE_LIMIT_EMAIL_WINDOW_SECONDS,
+        enabled=settings.LOGIN_RATE_LIMIT_ENABLED,
+    )
+    return login_rate_limiter
+
+
+login_rate_limiter = configure_login_rate_limiter(build_rate_limit_store())
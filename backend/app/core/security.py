@@ -5,20 +5,27 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
+import asyncio
+import os
+import secrets
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Any, Dict
-
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Optional, Any, Callable, Dict, List, Sequence, Tuple, TypeVar
 
+from jose import JWTError
 from app.core.config import settings
+from app.core.hashing import build_password_context, policy_from_settings
+from app.core.keys import key_ring
+from app.core.token_cache import get_verified_claims, store_verified_claims, token_digest
 
 
 # =======================================================================================================
 # --- Configuração do Passlib para hashing de senhas ---                                            #####
 # =======================================================================================================
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Esquema e custos vêm do Settings (app/core/hashing.py).
+pwd_context = build_password_context(policy_from_settings())
 
 ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
@@ -26,6 +33,17 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 PASSWORD_RESET_TOKEN_EXPIRE_HOURS = settings.PASSWORD_RESET_TOKEN_EXPIRE_HOURS
 
+# Header `typ` do access token (RFC 9068). O `aud` de cada tipo de token é derivado de
+# settings.JWT_AUDIENCE (ver docstring de app/core/keys.py).
+ACCESS_TOKEN_TYP = "at+jwt"
+
+def _audience(token_type: Optional[str] = None) -> str:
+    return settings.JWT_AUDIENCE if token_type is None else f"{settings.JWT_AUDIENCE}:{token_type}"
+
+def _has_audience(payload: Dict[str, Any], token_type: str) -> bool:
+    # Refresh/recuperação emitidos antes do 'aud' ainda valem (a claim 'type' já os distingue).
+    return payload.get("aud", _audience(token_type)) == _audience(token_type)
+
 # =======================================================================================================
 # --- Funções ---                                                                                   #####
 # =======================================================================================================
@@ -38,40 +56,195 @@ def get_password_hash(password: str) -> str:
     """Gera o hash de uma senha."""
     return pwd_context.hash(password)
 
+_dummy_password_hash: Optional[str] = None
+
+def verify_dummy_password(plain_password: str) -> bool:
+    """
+    Verifica a senha contra um hash descartável com a política atual e retorna sempre False.
+    Usada quando o email não existe, para que o tempo de resposta do login não revele
+    se a conta existe.
+    """
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = pwd_context.hash(secrets.token_urlsafe(16))
+    pwd_context.verify(plain_password, _dummy_password_hash)
+    return False
+
+def verify_password_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e, se o hash estiver desatualizado (`needs_update`: outro esquema ou
+    custos diferentes dos configurados), retorna também o novo hash com a política atual.
+    """
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+# =======================================================================================================
+# --- Pool de Hashing de Senhas ---                                                                 #####
+# =======================================================================================================
+
+T = TypeVar("T")
+
+
+class PasswordHashingPoolSaturated(Exception):
+    """Levantada quando o pool de hashing atingiu o limite de tarefas pendentes."""
+
+
+class PasswordHashingPool:
+    """
+    Executa o hashing de senhas (verify/hash) fora do event loop, em um pool dedicado.
+    O número de tarefas em andamento (executando + na fila) é limitado a
+    `max_workers + max_queue`; acima disso a chamada falha imediatamente com
+    PasswordHashingPoolSaturated (back-pressure, convertida em 503 pela API).
+    """
+
+    def __init__(self, kind: str, max_workers: Optional[int], max_queue: int) -> None:
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hashing"
+                    )
+            return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                raise PasswordHashingPoolSaturated()
+            self._in_flight += 1
+
+    def _release(self, *_: Any) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Agenda `fn(*args)` no pool e aguarda o resultado sem bloquear o event loop."""
+        self._acquire()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # O slot só é liberado quando o worker termina, mesmo que o request seja cancelado.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """Encerra o executor; um novo é criado sob demanda no próximo uso."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hashing_pool = PasswordHashingPool(
+    kind=settings.PASSWORD_HASH_POOL_KIND,
+    max_workers=settings.PASSWORD_HASH_POOL_SIZE,
+    max_queue=settings.PASSWORD_HASH_POOL_MAX_QUEUE,
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versão assíncrona de verify_password, executada no pool de hashing."""
+    return await password_hashing_pool.run(verify_password, plain_password, hashed_password)
+
+async def verify_password_and_update_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Versão assíncrona de verify_password_and_update, executada no pool de hashing."""
+    return await password_hashing_pool.run(verify_password_and_update, plain_password, hashed_password)
+
+async def verify_dummy_password_async(plain_password: str) -> bool:
+    """Versão assíncrona de verify_dummy_password, executada no pool de hashing."""
+    return await password_hashing_pool.run(verify_dummy_password, plain_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Versão assíncrona de get_password_hash, executada no pool de hashing."""
+    return await password_hashing_pool.run(get_password_hash, password)
+
+def _hash_passwords(passwords: Sequence[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+async def get_password_hashes_async(passwords: Sequence[str]) -> List[str]:
+    """
+    Gera hashes em lote (importação em massa), distribuindo o trabalho entre no máximo metade
+    dos workers do pool para preservar capacidade para logins. Em vez de falhar com 503 quando
+    o pool está saturado, aguarda e tenta novamente (trabalho em lote tem prioridade menor).
+    """
+    if not passwords:
+        return []
+    parallelism = max(1, min(len(passwords), password_hashing_pool.max_workers // 2))
+    chunk_size = -(-len(passwords) // parallelism)
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+
+    async def hash_chunk(chunk: Sequence[str]) -> List[str]:
+        while True:
+            try:
+                return await password_hashing_pool.run(_hash_passwords, chunk)
+            except PasswordHashingPoolSaturated:
+                await asyncio.sleep(0.05)
+
+    results = await asyncio.gather(*(hash_chunk(chunk) for chunk in chunks))
+    return [hashed for chunk_result in results for hashed in chunk_result]
+
+# =======================================================================================================
+# --- Tokens JWT ---                                                                                #####
+# =======================================================================================================
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+    """Cria um access token JWT (header 'typ' = 'at+jwt', 'aud' = JWT_AUDIENCE)."""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    to_encode.update({"exp": expire, "aud": _audience()})
+    return key_ring.sign(to_encode, typ=ACCESS_TOKEN_TYP)
 
 def create_refresh_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
-    """Cria um novo refresh token JWT."""
+    """
+    Cria um novo refresh token JWT (claim 'type' = 'refresh' e 'aud' próprio, nunca aceito
+    como access token).
+    Um 'exp' já presente em `data` (ex.: fim da família de tokens) é mantido.
+    """
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    to_encode.setdefault("exp", expire)
+    to_encode["type"] = "refresh"
+    to_encode["aud"] = _audience("refresh")
+    return key_ring.sign(to_encode)
 
 def create_password_reset_token(email: str) -> str:
     """
     Gera um token JWT específico para recuperação de senha.
-    O 'sub' do token será o email. Adiciona 'type' claim.
+    O 'sub' do token será o email. Adiciona 'type' claim e 'aud' próprio.
     """
     expire = datetime.now(timezone.utc) + timedelta(hours=PASSWORD_RESET_TOKEN_EXPIRE_HOURS)
     to_encode: Dict[str, Any] = {
         "exp": expire,
         "sub": email,
-        "type": "password_reset" 
+        "type": "password_reset",
+        "aud": _audience("password_reset"),
     }
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return key_ring.sign(to_encode)
 
 def verify_password_reset_token(token: str) -> Optional[str]:
     """
@@ -80,8 +253,8 @@ def verify_password_reset_token(token: str) -> Optional[str]:
     caso contrário, retorna None.
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") == "password_reset":
+        payload = key_ring.decode(token)
+        if payload.get("type") == "password_reset" and _has_audience(payload, "password_reset"):
             email_sub = payload.get("sub")
             if isinstance(email_sub, str): 
                  return email_sub
@@ -89,13 +262,49 @@ def verify_password_reset_token(token: str) -> Optional[str]:
     except JWTError: 
         return None
 
+def decode_refresh_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verifica (HMAC e expiração) um refresh token e retorna o payload se ele for do tipo
+    'refresh' e trouxer família ('fam') e geração ('gen'); caso contrário, None.
+    """
+    payload = decode_token(token)
+    if (
+        payload is None
+        or payload.get("type") != "refresh"
+        or not _has_audience(payload, "refresh")
+        or not isinstance(payload.get("fam"), str)
+        or not isinstance(payload.get("gen"), int)
+    ):
+        return None
+    return payload
+
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verifica um access token: além de assinatura e expiração, exige 'aud' = JWT_AUDIENCE e
+    nenhuma claim 'type'. Refresh tokens e tokens de recuperação de senha (assinados pela
+    mesma chave) são recusados.
+    """
+    payload = decode_token(token)
+    if payload is None or payload.get("aud") != _audience() or payload.get("type") is not None:
+        return None
+    return payload
+
 def decode_token(token: str) -> Optional[dict[str, Any]]:
-    """Decodifica um token JWT e retorna o payload se válido, None caso contrário."""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    """
+    Decodifica um token JWT e retorna o payload se válido, None caso contrário.
+    A chave de verificação (já convertida em objeto) vem do chaveiro, pelo `kid` do header.
+    Tokens já verificados e ainda não expirados são servidos do cache (app/core/token_cache.py).
+    """
+    digest = token_digest(token)
+    payload = get_verified_claims(digest)
+    if payload is not None:
         return payload
+    try:
+        payload = key_ring.decode(token)
     except JWTError:
         return None
+    store_verified_claims(digest, payload)
+    return payload
 
 def get_subject_from_token(token: str) -> Optional[str]:
     """
@@ -0,0 +1,52 @@
+# app/core/token_cache.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import hashlib
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.lru import TTLLRUCache
+
+# =======================================================================================================
+# --- Cache de Tokens Verificados ---                                                               #####
+# =======================================================================================================
+# Evita repetir o parsing JOSE e a verificação de assinatura quando o mesmo token chega várias
+# vezes. A chave é o digest SHA-256 do token (o token em claro nunca fica em memória no cache) e
+# o valor são as claims já verificadas junto com o `exp`. A entrada vive no máximo até o `exp`
+# do token, e o `exp` é conferido de novo no relógio de parede a cada hit, de modo que um token
+# nunca é aceito após expirar. Tokens sem `exp` numérico não são armazenados.
+
+VerifiedClaims = Dict[str, Any]
+
+token_cache: TTLLRUCache[bytes, Tuple[float, VerifiedClaims]] = TTLLRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE if settings.TOKEN_CACHE_ENABLED else 0,
+    ttl=0.0,  # sempre sobrescrito pelo tempo restante até o `exp`
+)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def get_verified_claims(digest: bytes) -> Optional[VerifiedClaims]:
+    entry = token_cache.get(digest)
+    if entry is None:
+        return None
+    expires_at, claims = entry
+    if expires_at <= time.time():
+        token_cache.pop(digest)
+        return None
+    return dict(claims)  # cópia: quem chama pode alterar o payload sem afetar o cache
+
+
+def store_verified_claims(digest: bytes, claims: VerifiedClaims) -> None:
+    expires_at = claims.get("exp")
+    if isinstance(expires_at, bool) or not isinstance(expires_at, (int, float)):
+        return
+    remaining = expires_at - time.time()
+    if remaining > 0:
+        token_cache.set(digest, (float(expires_at), dict(claims)), ttl=remaining)
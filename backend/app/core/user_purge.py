@@ -0,0 +1,114 @@
+# app/core/user_purge.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import logging
+import threading
+from typing import Callable, ContextManager, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.refresh_token import prune_refresh_token_families
+from app.crud.user import purge_deleted_users
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Expurgo de Usuários Removidos ---                                                             #####
+# =======================================================================================================
+# delete_user só marca deleted_at (soft delete). Esta thread remove as linhas fisicamente, em
+# lotes de USER_PURGE_BATCH_SIZE (um DELETE curto por transação) com USER_PURGE_PAUSE_SECONDS
+# entre lotes: um acúmulo grande de remoções é drenado aos poucos, sem rajadas de locks.
+# Sem lotes pendentes, verifica de novo a cada USER_PURGE_POLL_INTERVAL_SECONDS.
+# Cada ciclo também remove um lote de famílias de refresh token que não aceitam mais rotação
+# (expiradas ou revogadas há mais de REFRESH_TOKEN_REVOKED_RETENTION_SECONDS): cada login cria
+# uma família, e sem isso a tabela só cresceria.
+
+SessionFactory = Callable[[], ContextManager[Session]]
+
+
+class UserPurger:
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        batch_size: int,
+        pause_seconds: float,
+        poll_interval: float,
+        grace_seconds: float,
+        revoked_grace_seconds: float = 86400.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.poll_interval = poll_interval
+        self.grace_seconds = grace_seconds
+        self.revoked_grace_seconds = revoked_grace_seconds
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"batches": 0, "purged": 0, "families_pruned": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def run_once(self) -> int:
+        """Expurga um lote de usuários e um de famílias; retorna o maior dos dois (cheio: há mais)."""
+        with self.session_factory() as db:
+            purged = purge_deleted_users(db, limit=self.batch_size, grace_seconds=self.grace_seconds)
+            pruned = prune_refresh_token_families(
+                db, limit=self.batch_size, revoked_grace_seconds=self.revoked_grace_seconds
+            )
+        with self._lock:
+            if purged:
+                self._counters["batches"] += 1
+                self._counters["purged"] += purged
+            self._counters["families_pruned"] += pruned
+        return max(purged, pruned)
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                purged = self.run_once()
+            except Exception:
+                logger.exception("Erro no expurgo de usuários removidos.")
+                purged = 0
+            # Lote cheio: há mais pendências, o próximo lote vem após a pausa.
+            self._stopping.wait(self.pause_seconds if purged >= self.batch_size else self.poll_interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="user-purger", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Encerra a thread após o lote em andamento."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"running": self.running, **counters}
+
+
+def build_user_purger() -> UserPurger:
+    return UserPurger(
+        session_factory=SessionLocal,
+        batch_size=settings.USER_PURGE_BATCH_SIZE,
+        pause_seconds=settings.USER_PURGE_PAUSE_SECONDS,
+        poll_interval=settings.USER_PURGE_POLL_INTERVAL_SECONDS,
+        grace_seconds=settings.USER_PURGE_GRACE_SECONDS,
+        revoked_grace_seconds=settings.REFRESH_TOKEN_REVOKED_RETENTION_SECONDS,
+    )
+
+
+user_purger = build_user_purger()
@@ -0,0 +1,84 @@
+# app/core/user_response_cache.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Sequence
+
+from app.core.cache import cache, run_sync
+from app.core.config import settings
+from app.db.models.user import User as UserModel
+from app.schemas.user import UserRead
+
+# =======================================================================================================
+# --- Cache de Respostas de Usuário (GET /users/{id}) ---                                           #####
+# =======================================================================================================
+# Guarda, por usuário, o JSON já serializado da resposta e o ETag, na camada de cache
+# (app/core/cache.py). Leituras repetidas não hidratam a linha nem codificam JSON. As escritas
+# do CRUD (update_user/delete_user) removem a entrada trocando a geração da chave, então uma
+# carga iniciada antes da escrita não regrava a versão antiga; a carga lê do primário. Com o
+# backend em memória a remoção vale só para o processo atual e os demais workers convergem
+# pelo TTL.
+
+USER_RESPONSE_NAMESPACE = "user_responses"
+
+
+class CachedUserResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class _UserNotFound(Exception):
+    """Interrompe o carregamento sem armazenar nada (ausências não são cacheadas)."""
+
+
+def user_etag(user: UserModel) -> str:
+    """ETag forte da representação do usuário, derivado da versão da linha."""
+    return f'"{user.id}.{user.version}"'
+
+
+def versions_from_etags(user_id: int, etags: Sequence[str]) -> List[int]:
+    """
+    Versões da linha citadas nos ETags (formato de user_etag) que pertencem ao usuário.
+    ETags de outro usuário ou malformados são ignorados (e por isso nunca casam).
+    """
+    versions = []
+    for etag in etags:
+        tag_user_id, _, version = etag.strip('"').partition(".")
+        if tag_user_id == str(user_id) and version.isdigit():
+            versions.append(int(version))
+    return versions
+
+
+def render_user_response(user: UserModel) -> CachedUserResponse:
+    return CachedUserResponse(user_etag(user), UserRead.model_validate(user).model_dump_json().encode())
+
+
+async def get_user_response(
+    user_id: int, load_user: Callable[[], Awaitable[Optional[UserModel]]]
+) -> Optional[CachedUserResponse]:
+    """Resposta em cache do usuário, ou carregada com `load_user` (None se o usuário não existir)."""
+
+    async def loader() -> list:
+        user = await load_user()
+        if user is None:
+            raise _UserNotFound()
+        return list(render_user_response(user))
+
+    try:
+        etag, body = await cache.get_or_load(
+            USER_RESPONSE_NAMESPACE, str(user_id), loader, ttl=settings.USER_RESPONSE_CACHE_TTL_SECONDS
+        )
+    except _UserNotFound:
+        return None
+    return CachedUserResponse(etag, body)
+
+
+async def invalidate_user_response_async(user_id: int) -> None:
+    await cache.delete(USER_RESPONSE_NAMESPACE, str(user_id))
+
+
+def invalidate_user_response(user_id: int) -> None:
+    """Versão para o CRUD síncrono (executado no threadpool)."""
+    run_sync(invalidate_user_response_async, user_id)
@@ -1,5 +1,16 @@
 # app/crud/__init__.py
-from .user import get_user, get_user_by_email, create_user, update_user, delete_user
+from .user import (
+    get_user,
+    get_user_by_email,
+    create_user,
+    update_user,
+    delete_user,
+    get_user_async,
+    get_user_by_email_async,
+    create_user_async,
+    update_user_async,
+    delete_user_async,
+)
 
 __all__ = [
     "get_user",
@@ -7,4 +18,9 @@ __all__ = [
     "create_user",
     "update_user", 
     "delete_user",
+    "get_user_async",
+    "get_user_by_email_async",
+    "create_user_async",
+    "update_user_async",
+    "delete_user_async",
 ]
\ No newline at end of file
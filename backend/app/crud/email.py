@@ -0,0 +1,140 @@
+# app/crud/email.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Insert, Update, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.email_message import EMAIL_FAILED, EMAIL_PENDING, EMAIL_SENT, EmailMessage
+
+# =======================================================================================================
+# --- Consultas e Helpers Compartilhados (Sync / Async) ---                                          #####
+# =======================================================================================================
+
+class ClaimedEmail(NamedTuple):
+    """Mensagem reivindicada por um worker (valores simples, sem vínculo com a sessão)."""
+    id: int
+    recipient: str
+    subject: str
+    body: str
+    attempts: int
+
+
+def _insert_email_returning_id(recipient: str, subject: str, body: str) -> Insert:
+    return (
+        insert(EmailMessage)
+        .values(
+            recipient=recipient,
+            subject=subject,
+            body=body,
+            status=EMAIL_PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now(timezone.utc),
+        )
+        .returning(EmailMessage.id)
+    )
+
+def _claim_due_emails(limit: int, lease_seconds: float) -> Update:
+    """
+    Reivindica até `limit` mensagens vencidas em um único UPDATE ... RETURNING: o prazo é
+    adiado pelo lease (se o worker morrer, a mensagem volta a vencer) e a tentativa é contada.
+    No PostgreSQL, FOR UPDATE SKIP LOCKED deixa workers concorrentes com lotes disjuntos.
+    """
+    now = datetime.now(timezone.utc)
+    due_ids = (
+        select(EmailMessage.id)
+        .where(EmailMessage.status == EMAIL_PENDING, EmailMessage.next_attempt_at <= now)
+        .order_by(EmailMessage.next_attempt_at, EmailMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(EmailMessage)
+        .where(EmailMessage.id.in_(due_ids))
+        .values(attempts=EmailMessage.attempts + 1, next_attempt_at=now + timedelta(seconds=lease_seconds))
+        .returning(
+            EmailMessage.id, EmailMessage.recipient, EmailMessage.subject, EmailMessage.body, EmailMessage.attempts
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+# =======================================================================================================
+# --- CRUD ---                                                                                      #####
+# =======================================================================================================
+
+def enqueue_email(db: Session, recipient: str, subject: str, body: str) -> int:
+    """
+    Insere uma mensagem (já renderizada) na fila de envio e retorna o id; o envio fica com
+    os workers (app/core/email_queue.py).
+    """
+    email_id = db.scalars(_insert_email_returning_id(recipient, subject, body)).one()
+    db.commit()
+    return email_id
+
+def claim_email_batch(db: Session, limit: int, lease_seconds: float) -> List[ClaimedEmail]:
+    """Reivindica um lote de mensagens vencidas para envio (ver _claim_due_emails)."""
+    rows = db.execute(_claim_due_emails(limit, lease_seconds)).all()
+    db.commit()
+    return sorted((ClaimedEmail(*row) for row in rows), key=lambda claimed: claimed.id)
+
+# O corpo renderizado pode conter segredos (ex.: o token de redefinição de senha): ele é apagado
+# assim que a mensagem sai da fila (enviada ou falha definitiva), e as linhas encerradas são
+# removidas após EMAIL_RETENTION_SECONDS (prune_email_messages).
+
+def mark_emails_sent(db: Session, email_ids: Sequence[int]) -> None:
+    if not email_ids:
+        return
+    db.execute(
+        update(EmailMessage)
+        .where(EmailMessage.id.in_(email_ids))
+        .values(status=EMAIL_SENT, sent_at=datetime.now(timezone.utc), last_error=None, body="")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def reschedule_email(db: Session, email_id: int, error: str, retry_at: Optional[datetime]) -> None:
+    """
+    Registra a falha de envio: reagenda para `retry_at` ou, sem nova tentativa (None),
+    marca a mensagem como falha definitiva.
+    """
+    values: Dict[str, Any] = {"last_error": error[:1000]}
+    if retry_at is None:
+        values.update(status=EMAIL_FAILED, body="")
+    else:
+        values["next_attempt_at"] = retry_at
+    db.execute(
+        update(EmailMessage)
+        .where(EmailMessage.id == email_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def prune_email_messages(db: Session, retention_seconds: float) -> int:
+    """Remove as mensagens encerradas (enviadas ou com falha) criadas antes da retenção; retorna quantas."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)
+    result = db.execute(
+        delete(EmailMessage)
+        .where(EmailMessage.status.in_((EMAIL_SENT, EMAIL_FAILED)), EmailMessage.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+# =======================================================================================================
+# --- CRUD Assíncrono (AsyncSession) ---                                                            #####
+# =======================================================================================================
+# Apenas o enfileiramento é usado pelos handlers; os workers usam sessões síncronas.
+
+async def enqueue_email_async(db: AsyncSession, recipient: str, subject: str, body: str) -> int:
+    """Versão assíncrona de enqueue_email."""
+    email_id = (await db.scalars(_insert_email_returning_id(recipient, subject, body))).one()
+    await db.commit()
+    return email_id
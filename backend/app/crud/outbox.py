@@ -0,0 +1,144 @@
+# app/crud/outbox.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Insert, Select, delete, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.outbox import OutboxCursor, OutboxEvent
+
+# =======================================================================================================
+# --- Eventos (escrita na mesma transação) ---                                                      #####
+# =======================================================================================================
+# As funções de escrita do CRUD acrescentam o INSERT do evento antes do próprio commit: o evento
+# existe se e somente se a mudança foi confirmada. A publicação fica com o relay.
+
+USER_TOPIC = "user"
+USER_CREATED = "user.created"
+USER_UPDATED = "user.updated"
+USER_DELETED = "user.deleted"
+
+
+def outbox_event_values(topic: str, key: Any, event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "topic": topic,
+        "key": str(key),
+        "event_type": event_type,
+        "payload": payload,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+def _insert_outbox_events() -> Insert:
+    # Executado com a lista de valores (executemany / insertmanyvalues): um statement por lote.
+    return insert(OutboxEvent)
+
+def write_outbox_events(db: Session, events: Sequence[Dict[str, Any]]) -> None:
+    """Acrescenta os eventos à transação corrente (sem commit). Nada é gravado com OUTBOX_ENABLED=False."""
+    if events and settings.OUTBOX_ENABLED:
+        db.execute(_insert_outbox_events(), list(events))
+
+async def write_outbox_events_async(db: AsyncSession, events: Sequence[Dict[str, Any]]) -> None:
+    """Versão assíncrona de write_outbox_events."""
+    if events and settings.OUTBOX_ENABLED:
+        await db.execute(_insert_outbox_events(), list(events))
+
+# =======================================================================================================
+# --- Consumo (relay) ---                                                                           #####
+# =======================================================================================================
+
+class OutboxRecord(NamedTuple):
+    offset: int
+    topic: str
+    key: str
+    event_type: str
+    payload: Dict[str, Any]
+    created_at: datetime
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "offset": self.offset,
+            "topic": self.topic,
+            "key": self.key,
+            "type": self.event_type,
+            "payload": self.payload,
+            "created_at": self.created_at.replace(tzinfo=self.created_at.tzinfo or timezone.utc).isoformat(),
+        }
+
+
+def _select_events_after(offset: int, limit: int) -> Select[Any]:
+    return (
+        select(
+            OutboxEvent.id, OutboxEvent.topic, OutboxEvent.key, OutboxEvent.event_type,
+            OutboxEvent.payload, OutboxEvent.created_at,
+        )
+        .where(OutboxEvent.id > offset)
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    )
+
+def lock_cursor(db: Session, sink: str) -> int:
+    """
+    Último offset entregue ao sink, com a linha do cursor bloqueada (FOR UPDATE) até o commit:
+    relays concorrentes do mesmo sink se revezam em vez de entregar o mesmo lote.
+    """
+    offset = db.scalars(
+        select(OutboxCursor.last_offset).where(OutboxCursor.sink == sink).with_for_update()
+    ).first()
+    if offset is None:
+        db.execute(insert(OutboxCursor).values(sink=sink, last_offset=0))
+        return 0
+    return offset
+
+def fetch_events_after(db: Session, offset: int, limit: int) -> List[OutboxRecord]:
+    return [OutboxRecord(*row) for row in db.execute(_select_events_after(offset, limit)).all()]
+
+def advance_cursor(db: Session, sink: str, offset: int) -> None:
+    db.execute(
+        update(OutboxCursor)
+        .where(OutboxCursor.sink == sink)
+        .values(last_offset=offset)
+        .execution_options(synchronize_session=False)
+    )
+
+def transaction_horizon(db: Session) -> Optional[Tuple[int, int]]:
+    """
+    (xmin, xmax) do snapshot corrente no PostgreSQL: toda transação com id < xmin já terminou
+    e toda transação já iniciada tem id < xmax. None em bancos sem essa informação.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    row = db.execute(
+        text(
+            "SELECT pg_snapshot_xmin(snapshot)::text::bigint, pg_snapshot_xmax(snapshot)::text::bigint "
+            "FROM pg_current_snapshot() AS snapshot"
+        )
+    ).one()
+    return int(row[0]), int(row[1])
+
+def prune_outbox_events(db: Session, sinks: Sequence[str], retention_seconds: float) -> int:
+    """
+    Remove eventos já entregues a todos os `sinks` (offset <= menor cursor entre eles) e mais
+    antigos que a retenção. Sink sem cursor ainda não recebeu nada: nada é removido.
+    O evento de offset `delivered` é mantido: no SQLite, sem linhas o id voltaria a começar em 1.
+    """
+    if not sinks:
+        return 0
+    offsets = db.scalars(select(OutboxCursor.last_offset).where(OutboxCursor.sink.in_(sinks))).all()
+    if len(offsets) < len(set(sinks)):
+        return 0
+    delivered = min(offsets)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)
+    result = db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.id < delivered, OutboxEvent.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
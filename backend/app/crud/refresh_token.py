@@ -0,0 +1,184 @@
+# app/crud/refresh_token.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import ColumnElement, Delete, Select, Update, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.refresh_token import RefreshTokenFamily
+from app.db.models.user import User as UserModel
+
+# =======================================================================================================
+# --- Consultas e Helpers Compartilhados (Sync / Async) ---                                          #####
+# =======================================================================================================
+
+class RefreshTokenRotation(NamedTuple):
+    """Resultado de uma rotação bem-sucedida: dados para emitir o novo par de tokens."""
+    email: str
+    family_id: str
+    generation: int
+    expires_at: datetime
+
+
+def _build_family(user_id: int, expires_at: datetime) -> RefreshTokenFamily:
+    return RefreshTokenFamily(
+        id=secrets.token_hex(16), user_id=user_id, generation=0, revoked=False, expires_at=expires_at
+    )
+
+def _select_family_for_rotation(family_id: str) -> Select[Tuple[RefreshTokenFamily, str, bool]]:
+    # Busca pela PK com o e-mail/estado atuais do usuário (removido: sem linha). FOR UPDATE serializa rotações
+    # concorrentes da mesma família e mantém a leitura no primário (ver app/db/routing.py).
+    return (
+        select(RefreshTokenFamily, UserModel.email, UserModel.is_active)
+        .join(UserModel, UserModel.id == RefreshTokenFamily.user_id)
+        .where(RefreshTokenFamily.id == family_id, UserModel.deleted_at.is_(None))
+        .with_for_update(of=RefreshTokenFamily)
+        .execution_options(populate_existing=True)
+    )
+
+def _revoke_families(*criteria: ColumnElement[bool]) -> Update:
+    # Só famílias ainda ativas: revoked_at guarda a primeira revogação (base da carência do expurgo).
+    return (
+        update(RefreshTokenFamily)
+        .where(*criteria, RefreshTokenFamily.revoked.is_(False))
+        .values(revoked=True, revoked_at=datetime.now(timezone.utc))
+    )
+
+def _prune_families(limit: int, revoked_grace_seconds: float) -> Delete:
+    """
+    Remove até `limit` famílias expiradas ou revogadas há mais de `revoked_grace_seconds`
+    (índices em expires_at e revoked_at). SKIP LOCKED: expurgos concorrentes pegam lotes disjuntos.
+    """
+    now = datetime.now(timezone.utc)
+    due_ids = (
+        select(RefreshTokenFamily.id)
+        .where(
+            or_(
+                RefreshTokenFamily.expires_at <= now,
+                RefreshTokenFamily.revoked_at <= now - timedelta(seconds=revoked_grace_seconds),
+            )
+        )
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        delete(RefreshTokenFamily)
+        .where(RefreshTokenFamily.id.in_(due_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+def _as_utc(value: datetime) -> datetime:
+    # O SQLite devolve datetimes sem fuso; os valores são sempre gravados em UTC.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def _check_rotation(
+    row: Optional[Tuple[RefreshTokenFamily, str, bool]], generation: int
+) -> Tuple[Optional[RefreshTokenFamily], bool]:
+    """
+    Valida a rotação. Retorna (família a rotacionar ou None, se a família deve ser revogada).
+    """
+    if row is None:
+        return None, False
+    family, _, is_active = row
+    if family.revoked or _as_utc(family.expires_at) <= datetime.now(timezone.utc) or not is_active:
+        return None, False
+    if family.generation != generation:
+        # Token de uma geração já rotacionada: reutilização (possível roubo), revoga a família.
+        return None, True
+    return family, False
+
+# =======================================================================================================
+# --- CRUD ---                                                                                      #####
+# =======================================================================================================
+
+def create_refresh_token_family(db: Session, user_id: int, expires_at: datetime) -> RefreshTokenFamily:
+    """
+    Abre uma nova família de refresh tokens (um login) para o usuário, na geração 0.
+    """
+    family = _build_family(user_id, expires_at)
+    db.add(family)
+    db.commit()
+    return family
+
+def rotate_refresh_token_family(db: Session, family_id: str, generation: int) -> Optional[RefreshTokenRotation]:
+    """
+    Rotaciona a família se `generation` for a geração atual: avança para a próxima e retorna
+    os dados do novo token. Família inexistente, revogada, expirada ou de usuário inativo
+    retorna None; uma geração antiga (reutilização) também revoga a família.
+    """
+    row = db.execute(_select_family_for_rotation(family_id)).first()
+    family, revoke = _check_rotation(row, generation)  # type: ignore[arg-type]
+    if family is None:
+        if revoke:
+            revoke_refresh_token_family(db, family_id)
+        return None
+    family.generation = generation + 1
+    db.commit()
+    return RefreshTokenRotation(row[1], family.id, family.generation, _as_utc(family.expires_at))  # type: ignore[index]
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> None:
+    """
+    Revoga uma família de refresh tokens.
+    """
+    db.execute(_revoke_families(RefreshTokenFamily.id == family_id))
+    db.commit()
+
+def revoke_user_refresh_token_families(db: Session, user_id: int) -> None:
+    """
+    Revoga todas as famílias de refresh tokens do usuário (ex.: após troca de senha).
+    """
+    db.execute(_revoke_families(RefreshTokenFamily.user_id == user_id))
+    db.commit()
+
+def prune_refresh_token_families(db: Session, limit: int, revoked_grace_seconds: float) -> int:
+    """
+    Remove um lote de famílias que não aceitam mais rotação (expiradas, ou revogadas há mais
+    de `revoked_grace_seconds`) e retorna quantas. Um token de uma família removida é recusado
+    como o de uma família inexistente. Usado pelo expurgo em segundo plano (app/core/user_purge.py).
+    """
+    pruned = db.execute(_prune_families(limit, revoked_grace_seconds)).rowcount or 0
+    db.commit()
+    return pruned
+
+# =======================================================================================================
+# --- CRUD Assíncrono (AsyncSession) ---                                                            #####
+# =======================================================================================================
+
+async def create_refresh_token_family_async(db: AsyncSession, user_id: int, expires_at: datetime) -> RefreshTokenFamily:
+    """Versão assíncrona de create_refresh_token_family."""
+    family = _build_family(user_id, expires_at)
+    db.add(family)
+    await db.commit()
+    return family
+
+async def rotate_refresh_token_family_async(
+    db: AsyncSession, family_id: str, generation: int
+) -> Optional[RefreshTokenRotation]:
+    """Versão assíncrona de rotate_refresh_token_family."""
+    row = (await db.execute(_select_family_for_rotation(family_id))).first()
+    family, revoke = _check_rotation(row, generation)  # type: ignore[arg-type]
+    if family is None:
+        if revoke:
+            await revoke_refresh_token_family_async(db, family_id)
+        return None
+    family.generation = generation + 1
+    await db.commit()
+    return RefreshTokenRotation(row[1], family.id, family.generation, _as_utc(family.expires_at))  # type: ignore[index]
+
+async def revoke_refresh_token_family_async(db: AsyncSession, family_id: str) -> None:
+    """Versão assíncrona de revoke_refresh_token_family."""
+    await db.execute(_revoke_families(RefreshTokenFamily.id == family_id))
+    await db.commit()
+
+async def revoke_user_refresh_token_families_async(db: AsyncSession, user_id: int) -> None:
+    """Versão assíncrona de revoke_user_refresh_token_families."""
+    await db.execute(_revoke_families(RefreshTokenFamily.user_id == user_id))
+    await db.commit()
@@ -4,114 +4,916 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
-from typing import Any, Dict, List, Optional, Union
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+from sqlalchemy import (
+    ColumnElement, Delete, Insert, Row, Select, Update, and_, delete, func, insert, inspect, or_, select, text, tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.db.models.user import User as UserModel
-from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.db.models.user_tombstone import UserTombstone
+from app.schemas.user import UserCreate, UserSearchFilters, UserUpdate
+from app.core.config import settings
+from app.core.count_cache import get_user_count, invalidate_user_counts, store_user_count
+from app.core.principal_cache import invalidate_principal, invalidate_principal_by_id
+from app.core.user_response_cache import invalidate_user_response, invalidate_user_response_async
+from app.core.security import get_password_hash, get_password_hash_async
+from app.crud.outbox import (
+    USER_CREATED, USER_DELETED, USER_TOPIC, USER_UPDATED, outbox_event_values, transaction_horizon,
+    write_outbox_events, write_outbox_events_async,
+)
+from app.db.routing import read_from_primary
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Exceções ---                                                                                  #####
+# =======================================================================================================
+
+class EmailAlreadyRegistered(Exception):
+    """
+    Levantada quando a escrita viola a unicidade do email (mapeada para 400 pela API).
+    A violação vem do próprio INSERT/UPDATE, sem SELECT prévio; a transação da sessão fica
+    inutilizável e deve ser descartada pelo chamador (a sessão do request é fechada).
+    """
+
+# =======================================================================================================
+# --- Consultas e Helpers Compartilhados (Sync / Async) ---                                          #####
+# =======================================================================================================
+
+def _is_live() -> ColumnElement[bool]:
+    # Usuários removidos (soft delete) ficam fora de todas as leituras e escritas; a condição
+    # também é a dos índices parciais do modelo (ix_user_email, ix_user_inactive_id...).
+    return UserModel.deleted_at.is_(None)
+
+def _select_user_by_email(email: str) -> Select[tuple[UserModel]]:
+    return select(UserModel).where(UserModel.email == email, _is_live()).limit(1)
+
+def _select_user(user_id: int) -> Select[tuple[UserModel]]:
+    return select(UserModel).where(UserModel.id == user_id, _is_live()).limit(1)
+
+def _select_user_password_hash(user_id: int) -> Select[tuple[str]]:
+    return select(UserModel.hashed_password).where(UserModel.id == user_id, _is_live()).limit(1)
+
+# Chaves de ordenação aceitas pela listagem; colunas únicas dispensam o desempate por id no seek.
+USER_SORT_KEYS = ("id", "email", "full_name")
+_UNIQUE_SORT_KEYS = {"id", "email"}
+
+# Caractere de escape dos padrões LIKE (evita a barra invertida, cuja interpretação em literais
+# depende de standard_conforming_strings no PostgreSQL).
+_LIKE_ESCAPE = "/"
+
+def _escape_like(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+def _user_filter_conditions(filters: Optional[UserSearchFilters]) -> List[ColumnElement[bool]]:
+    """
+    Condições WHERE dos filtros, escritas para casar com os índices de busca do modelo:
+    lower(email) LIKE 'prefixo%' (ix_user_email_lower), full_name ILIKE '%termo%'
+    (ix_user_full_name_trgm no PostgreSQL; no SQLite vira lower() LIKE lower()) e
+    comparações simples nas flags (índices parciais). Sempre exclui os usuários removidos.
+    """
+    conditions: List[ColumnElement[bool]] = [_is_live()]
+    if filters is None:
+        return conditions
+    if filters.is_active is not None:
+        conditions.append(UserModel.is_active == filters.is_active)
+    if filters.is_superuser is not None:
+        conditions.append(UserModel.is_superuser == filters.is_superuser)
+    if filters.email_prefix:
+        conditions.append(
+            func.lower(UserModel.email).like(_escape_like(filters.email_prefix.lower()) + "%", escape=_LIKE_ESCAPE)
+        )
+    if filters.full_name:
+        conditions.append(UserModel.full_name.ilike(f"%{_escape_like(filters.full_name)}%", escape=_LIKE_ESCAPE))
+    return conditions
+
+def _keyset_condition(order_by: str, descending: bool, after: Sequence[Any]) -> ColumnElement[bool]:
+    """
+    Condição de seek a partir da última linha entregue. Em colunas anuláveis os NULLs ficam
+    no fim na ordem ascendente e no início na descendente (ver _user_ordering).
+    """
+    sort_column = getattr(UserModel, order_by)
+    if order_by in _UNIQUE_SORT_KEYS:
+        return sort_column < after[0] if descending else sort_column > after[0]
+
+    value, last_id = after
+    if value is None:
+        same_null_group = and_(sort_column.is_(None), UserModel.id < last_id if descending else UserModel.id > last_id)
+        return or_(same_null_group, sort_column.is_not(None)) if descending else same_null_group
+    if descending:
+        return tuple_(sort_column, UserModel.id) < tuple_(value, last_id)
+    return or_(tuple_(sort_column, UserModel.id) > tuple_(value, last_id), sort_column.is_(None))
+
+def _user_ordering(order_by: str, descending: bool) -> List[ColumnElement[Any]]:
+    sort_column = getattr(UserModel, order_by)
+    ordering = sort_column.desc() if descending else sort_column.asc()
+    if UserModel.__table__.c[order_by].nullable:
+        ordering = ordering.nulls_first() if descending else ordering.nulls_last()
+    if order_by == "id":
+        return [ordering]
+    return [ordering, UserModel.id.desc() if descending else UserModel.id.asc()]
+
+def _select_users(
+    skip: int,
+    limit: int,
+    order_by: str = "id",
+    after: Optional[Sequence[Any]] = None,
+    descending: bool = False,
+    filters: Optional[UserSearchFilters] = None,
+) -> Select[tuple[UserModel]]:
+    stmt = select(UserModel).where(*_user_filter_conditions(filters))
+    if after is not None:
+        stmt = stmt.where(_keyset_condition(order_by, descending, after))
+    return stmt.order_by(*_user_ordering(order_by, descending)).offset(skip).limit(limit)
+
+def _select_user_count(filters: Optional[UserSearchFilters]) -> Select[tuple[int]]:
+    return select(func.count()).select_from(UserModel).where(*_user_filter_conditions(filters))
+
+def _user_count_cache_key(filters: Optional[UserSearchFilters]) -> str:
+    return filters.model_dump_json() if filters is not None else "{}"
+
+# Estimativa do total da tabela mantida pelo ANALYZE/autovacuum (-1 se nunca analisada).
+_RELTUPLES_SQL = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)")
+
+def _explain_rows_sql(db: Union[Session, AsyncSession], filters: UserSearchFilters) -> Tuple[str, Any]:
+    """
+    SQL (no paramstyle do driver) de um EXPLAIN da consulta filtrada: o planejador estima
+    as linhas a partir das estatísticas, sem executar a consulta.
+    """
+    compiled = select(UserModel.id).where(*_user_filter_conditions(filters)).compile(dialect=db.get_bind().dialect)
+    if compiled.positional:
+        params: Any = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    else:
+        params = compiled.params
+    return f"EXPLAIN (FORMAT JSON) {compiled}", params
+
+def _plan_rows(plan: Any) -> int:
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def _has_filters(filters: Optional[UserSearchFilters]) -> bool:
+    return filters is not None and bool(filters.model_dump(exclude_none=True))
+
+def _quoted_user_table(db: Union[Session, AsyncSession]) -> str:
+    return db.get_bind().dialect.identifier_preparer.format_table(UserModel.__table__)
+
+def keyset_values(user: UserModel, order_by: str = "id") -> List[Any]:
+    """
+    Valores da linha usados como posição do cursor (keyset) para a ordenação informada.
+    """
+    if order_by in _UNIQUE_SORT_KEYS:
+        return [getattr(user, order_by)]
+    return [getattr(user, order_by), user.id]
+
+def is_valid_keyset(order_by: str, values: Sequence[Any]) -> bool:
+    """
+    Verifica se `values` tem o formato produzido por keyset_values para a ordenação informada.
+    """
+    column = UserModel.__table__.c[order_by]
+    expected_types = [column.type.python_type]
+    if order_by not in _UNIQUE_SORT_KEYS:
+        expected_types.append(int)
+    if len(values) != len(expected_types):
+        return False
+    if values[0] is None and column.nullable:
+        values, expected_types = values[1:], expected_types[1:]
+    return all(
+        isinstance(value, expected) and not isinstance(value, bool)
+        for value, expected in zip(values, expected_types)
+    )
+
+def _select_existing_emails(emails: Sequence[str]) -> Select[tuple[str]]:
+    return select(UserModel.email).where(UserModel.email.in_(emails), _is_live())
+
+def _insert_users_returning_id() -> Insert:
+    # Multi-row INSERT ... RETURNING id, com as linhas retornadas na ordem dos parâmetros.
+    return insert(UserModel).returning(UserModel.id, sort_by_parameter_order=True)
+
+# Colunas exportadas (sem hashed_password), na ordem usada pelo NDJSON/CSV de exportação.
+USER_EXPORT_COLUMNS = ("id", "email", "full_name", "is_active", "is_superuser")
+
+def _select_user_export_rows(batch_size: int) -> Select[Any]:
+    # Seleciona apenas colunas (sem identity map/ORM) e usa cursor do lado do servidor:
+    # `yield_per` implica `stream_results`, buscando `batch_size` linhas por vez.
+    columns = [getattr(UserModel, name) for name in USER_EXPORT_COLUMNS]
+    return select(*columns).where(_is_live()).order_by(UserModel.id).execution_options(yield_per=batch_size)
+
+def user_insert_values(user: UserCreate, hashed_password: str) -> Dict[str, Any]:
+    """
+    Valores de coluna para inserir `user` (create_user, create_user_by_admin e create_users_bulk).
+    """
+    return {
+        "email": user.email,
+        "hashed_password": hashed_password,
+        "full_name": user.full_name,
+        "is_active": user.is_active if user.is_active is not None else True,
+        "is_superuser": user.is_superuser if user.is_superuser is not None else False,
+    }
+
+def _insert_user_returning(values: Dict[str, Any]) -> Insert:
+    # INSERT ... RETURNING de todas as colunas (id, version, updated_at e defaults do servidor).
+    return insert(UserModel).values(**values).returning(UserModel)
+
+def _get_update_data(user_in: Union[UserUpdate, Dict[str, Any]]) -> Dict[str, Any]:
+    if isinstance(user_in, dict):
+        return dict(user_in)
+    return user_in.model_dump(exclude_unset=True)
+
+_UPDATABLE_USER_FIELDS = ("email", "full_name", "is_active", "is_superuser")
+
+def _user_update_values(
+    user_in: Union[UserUpdate, Dict[str, Any]],
+    update_data: Dict[str, Any],
+    hashed_password: Optional[str]
+) -> Dict[str, Any]:
+    # None significa "não alterar", exceto full_name vindo de um UserUpdate (permite limpar o nome).
+    values = {
+        field: update_data[field]
+        for field in _UPDATABLE_USER_FIELDS
+        if field in update_data
+        and (update_data[field] is not None or (field == "full_name" and isinstance(user_in, UserUpdate)))
+    }
+    if hashed_password is not None:
+        values["hashed_password"] = hashed_password
+    return values
+
+def _update_user_returning(
+    user_id: int, values: Dict[str, Any], expected_versions: Optional[Sequence[int]]
+) -> Update:
+    """
+    UPDATE ... WHERE id = :id [AND version IN (:esperadas)] ... RETURNING: um único round-trip,
+    sem SELECT prévio. A versão é incrementada no próprio UPDATE (updated_at via onupdate).
+    """
+    statement = update(UserModel).where(UserModel.id == user_id, _is_live())
+    if expected_versions is not None:
+        statement = statement.where(UserModel.version.in_(expected_versions))
+    return (
+        statement.values(**values, version=UserModel.version + 1)
+        .returning(UserModel)
+        .execution_options(populate_existing=True, synchronize_session=False)
+    )
+
+def _update_password_hash(user_id: int, hashed_password: str) -> Update:
+    """
+    Troca só o hash (rehash no login): version, updated_at e change_seq são mantidos (sem os
+    onupdate), porque a representação do usuário não muda.
+    """
+    return (
+        update(UserModel)
+        .where(UserModel.id == user_id, _is_live())
+        .values(
+            hashed_password=hashed_password,
+            updated_at=UserModel.updated_at,
+            change_seq=UserModel.change_seq,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def _delete_user(user_id: int) -> Union[Update, Delete]:
+    """
+    Soft delete (USER_SOFT_DELETE_ENABLED): um UPDATE de deleted_at, O(1) e sem cascatas no
+    request; a linha é expurgada depois pelo app/core/user_purge.py. Sem soft delete, DELETE.
+    """
+    if settings.USER_SOFT_DELETE_ENABLED:
+        statement: Union[Update, Delete] = (
+            update(UserModel)
+            .where(UserModel.id == user_id, _is_live())
+            .values(deleted_at=datetime.now(timezone.utc), version=UserModel.version + 1)
+        )
+    else:
+        statement = delete(UserModel).where(UserModel.id == user_id)
+    return statement.execution_options(synchronize_session=False)
+
+def _purge_deleted_users(limit: int, grace_seconds: float) -> Delete:
+    """
+    Expurga até `limit` usuários removidos há mais de `grace_seconds`, pelo índice parcial
+    ix_user_deleted_at. No PostgreSQL, SKIP LOCKED deixa expurgos concorrentes com lotes disjuntos.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    due_ids = (
+        select(UserModel.id)
+        .where(UserModel.deleted_at.is_not(None), UserModel.deleted_at <= cutoff)
+        .order_by(UserModel.deleted_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return delete(UserModel).where(UserModel.id.in_(due_ids)).execution_options(synchronize_session=False)
+
+def _column_values(user: UserModel) -> Dict[str, Any]:
+    # Só as colunas carregadas: um principal do cache não traz o hash da senha (e ler uma
+    # coluna não carregada emitiria um SELECT, ou falharia na AsyncSession).
+    loaded = inspect(user).dict
+    return {attr.key: loaded[attr.key] for attr in UserModel.__mapper__.column_attrs if attr.key in loaded}
+
+def _restore_column_values(user: UserModel, values: Dict[str, Any]) -> None:
+    # Repõe os valores lidos antes do commit (expire_on_commit), evitando o SELECT implícito
+    # ao serializar a resposta (ou o ObjectDeletedError, no caso da deleção).
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+
+# Campos publicados nos eventos do outbox (sem hashed_password).
+_USER_EVENT_FIELDS = ("id", "email", "full_name", "is_active", "is_superuser", "version")
+
+def _user_event(event_type: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Evento de outbox a partir dos valores de coluna (RETURNING, ou do lote para create_users_bulk)."""
+    payload = {field: values.get(field) for field in _USER_EVENT_FIELDS}
+    if values.get("updated_at") is not None:
+        payload["updated_at"] = values["updated_at"].isoformat()
+    return outbox_event_values(USER_TOPIC, values["id"], event_type, payload)
+
+def _bulk_user_events(users: Sequence[Dict[str, Any]], ids: Sequence[Optional[int]]) -> List[Dict[str, Any]]:
+    return [
+        _user_event(USER_CREATED, {**values, "id": user_id, "version": 1})
+        for values, user_id in zip(users, ids)
+        if user_id is not None
+    ]
+
+def _deleted_user_event(values: Dict[str, Any]) -> Dict[str, Any]:
+    return outbox_event_values(USER_TOPIC, values["id"], USER_DELETED, {"id": values["id"], "email": values["email"]})
+
+def _invalidate_user_caches(user: UserModel, previous_email: Optional[str], email_changed: bool) -> None:
+    if email_changed and previous_email is None:
+        invalidate_principal_by_id(user.id)
+    invalidate_principal(previous_email, user.email)
+    invalidate_user_counts()
+
+def _insert_user_tombstone(user_id: int) -> Insert:
+    return insert(UserTombstone).values(user_id=user_id)
+
+# Delta sync (GET /users/changes): usuários e lápides com (change_seq, id) acima do watermark.
+# Como o change_seq é atribuído na escrita e não no commit, uma escrita com change_seq menor pode
+# ser confirmada depois de outra com change_seq maior, e o watermark não pode passar dela.
+#
+# No PostgreSQL isso é provado pelo snapshot: toda escrita recebe o id de transação antes do
+# change_seq (next_user_change_seq), então, lido o último valor N da sequência e depois o
+# snapshot, toda escrita com change_seq <= N é de uma transação com id < xmax. Quando o xmin de
+# um snapshot posterior chega a esse xmax, todas terminaram e N está assentado: só mudanças com
+# change_seq <= N são entregues. O par (N, xmax) pendente viaja no próprio watermark, e as
+# leituras vão ao primário (uma réplica atrasada não enxerga o que o snapshot do primário prova).
+# Sem snapshot (SQLite, em que as escritas são serializadas) o último recurso é o atraso
+# `lag_seconds`: mudanças mais recentes não são entregues e a página termina na primeira delas.
+
+class ChangesPosition(NamedTuple):
+    """Watermark do delta sync (ver comentário da seção)."""
+    after: Tuple[int, int] = (0, 0)  # (change_seq, id) da última mudança entregue
+    settled: int = 0  # maior change_seq sem escritas em andamento abaixo dele
+    pending: Optional[Tuple[int, int]] = None  # (N, xmax) à espera de xmin >= xmax
+
+
+class UserChanges(NamedTuple):
+    users: List[UserModel]
+    deleted: List[int]
+    position: ChangesPosition
+    has_more: bool
+
+
+_LAST_CHANGE_SEQ_SQL = text(
+    "SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM user_change_seq"
+)
+
+_time_cutoff_logged = False
+
+
+def _change_horizon(db: Session) -> Optional[Tuple[int, int, int]]:
+    """(N, xmin, xmax): último change_seq atribuído e, lido depois dele, o snapshot. None fora do PostgreSQL."""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    last_seq = int(db.execute(_LAST_CHANGE_SEQ_SQL).scalar_one())
+    horizon = transaction_horizon(db)
+    return None if horizon is None else (last_seq, *horizon)
+
+def _settle_position(position: ChangesPosition, horizon: Tuple[int, int, int]) -> ChangesPosition:
+    last_seq, xmin, xmax = horizon
+    settled, pending = position.settled, position.pending
+    if pending is not None and xmin >= pending[1]:
+        settled, pending = max(settled, pending[0]), None
+    if last_seq > settled:
+        if xmin >= xmax:  # nenhuma transação em andamento no snapshot
+            settled, pending = last_seq, None
+        elif pending is None:
+            pending = (last_seq, xmax)
+    return position._replace(settled=settled, pending=pending)
+
+def _lag_seconds_fallback(lag_seconds: float) -> float:
+    global _time_cutoff_logged
+    if not _time_cutoff_logged:
+        _time_cutoff_logged = True
+        logger.warning(
+            "Delta sync sem snapshot de transações: o watermark usa o atraso de %.1fs, e escritas "
+            "confirmadas depois disso com change_seq menor não serão entregues.",
+            lag_seconds,
+        )
+    return lag_seconds
+
+def _select_changed_users(after: Tuple[int, int], upto: Optional[int], limit: int) -> Select[tuple[UserModel]]:
+    query = select(UserModel).where(tuple_(UserModel.change_seq, UserModel.id) > tuple_(*after), _is_live())
+    if upto is not None:
+        query = query.where(UserModel.change_seq <= upto)
+    return query.order_by(UserModel.change_seq, UserModel.id).limit(limit)
+
+def _select_tombstones(after: Tuple[int, int], upto: Optional[int], limit: int) -> Select[Any]:
+    query = select(UserTombstone.change_seq, UserTombstone.user_id, UserTombstone.deleted_at).where(
+        tuple_(UserTombstone.change_seq, UserTombstone.user_id) > tuple_(*after)
+    )
+    if upto is not None:
+        query = query.where(UserTombstone.change_seq <= upto)
+    return query.order_by(UserTombstone.change_seq, UserTombstone.user_id).limit(limit)
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def _merge_changes(
+    users: Sequence[UserModel],
+    tombstones: Sequence[Row[Any]],
+    position: ChangesPosition,
+    limit: int,
+    lag_seconds: Optional[float],
+) -> UserChanges:
+    """Intercala usuários e lápides por (change_seq, id) e aplica o limite e, sem snapshot, o atraso."""
+    entries: List[Tuple[int, int, datetime, Optional[UserModel]]] = sorted(
+        [(user.change_seq, user.id, user.updated_at, user) for user in users]
+        + [(seq, user_id, deleted_at, None) for seq, user_id, deleted_at in tombstones],
+        key=lambda entry: (entry[0], entry[1]),
+    )
+    cutoff = None if lag_seconds is None else datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+    changes = UserChanges(users=[], deleted=[], position=position, has_more=False)
+    after = position.after
+    for seq, entry_id, changed_at, user in entries[:limit]:
+        if cutoff is not None and _as_utc(changed_at) > cutoff:
+            break
+        if user is None:
+            changes.deleted.append(entry_id)
+        else:
+            changes.users.append(user)
+        after = (seq, entry_id)
+    delivered = len(changes.users) + len(changes.deleted)
+    return changes._replace(position=position._replace(after=after), has_more=delivered == limit)
 
 # =======================================================================================================
 # --- CRUD ---                                                                                      #####
 # =======================================================================================================
 
-def get_user_by_email(db: Session, email: str) -> Optional[UserModel]: 
+def get_user_by_email(db: Session, email: str) -> Optional[UserModel]:
     """
     Busca um usuário pelo seu endereço de e-mail.
     """
-    return db.query(UserModel).filter(UserModel.email == email).first()
+    return db.scalars(_select_user_by_email(email)).first()
 
-def get_user(db: Session, user_id: int) -> Optional[UserModel]: 
+def get_user(db: Session, user_id: int) -> Optional[UserModel]:
     """
     Busca um usuário pelo seu ID.
     """
-    return db.query(UserModel).filter(UserModel.id == user_id).first()
+    return db.scalars(_select_user(user_id)).first()
+
+def get_user_password_hash(db: Session, user_id: int) -> Optional[str]:
+    """
+    Hash da senha do usuário, lido sob demanda (o principal em cache não o carrega).
+    """
+    return db.scalars(_select_user_password_hash(user_id)).first()
 
 # =======================================================================================================
 # --- CRUD (Superuser) ---                                                                          #####
 # =======================================================================================================
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[UserModel]:
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    order_by: str = "id",
+    after: Optional[Sequence[Any]] = None,
+    descending: bool = False,
+    filters: Optional[UserSearchFilters] = None
+) -> List[UserModel]:
     """
     Busca todos os usuários com paginação.
     Acessível apenas por superusuários.
+    Com `after` (ver keyset_values) a página é buscada por seek a partir da última linha
+    entregue, com custo constante independentemente da profundidade; `skip` (OFFSET) é
+    mantido apenas por compatibilidade. `filters` restringe o resultado e `descending`
+    inverte a ordenação (incluindo o desempate por id).
     """
-    return db.query(UserModel).offset(skip).limit(limit).all()
+    return list(db.scalars(_select_users(skip, limit, order_by, after, descending, filters)).all())
 
-def create_user_by_admin(db: Session, user: UserCreate) -> UserModel: 
+def count_users(db: Session, filters: Optional[UserSearchFilters] = None) -> int:
     """
-    Cria um novo usuário no banco de dados (ação de administrador).
-    Permite definir is_active e is_superuser.
+    Total exato de usuários que atendem aos filtros. O COUNT(*) é guardado no cache de
+    contagem (app.core.count_cache), invalidado pelas escritas deste módulo.
+    """
+    key = _user_count_cache_key(filters)
+    total = get_user_count(key)
+    if total is None:
+        total = db.scalar(_select_user_count(filters)) or 0
+        store_user_count(key, total)
+    return total
+
+def estimate_user_count(db: Session, filters: Optional[UserSearchFilters] = None) -> int:
     """
-    hashed_password = get_password_hash(user.password)
-    db_user = UserModel(
-        email=user.email,
-        hashed_password=hashed_password,
-        full_name=user.full_name,
-        is_active=user.is_active,
-        is_superuser=user.is_superuser 
+    Total aproximado de usuários, sem varrer a tabela (PostgreSQL): sem filtros usa
+    pg_class.reltuples; com filtros, as linhas estimadas pelo EXPLAIN da consulta.
+    Em outros bancos (ou tabela nunca analisada) recorre a count_users.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return count_users(db, filters)
+    if _has_filters(filters):
+        sql, params = _explain_rows_sql(db, filters)  # type: ignore[arg-type]
+        return _plan_rows(db.connection().exec_driver_sql(sql, params).scalar())
+    estimate = db.scalar(_RELTUPLES_SQL, {"table_name": _quoted_user_table(db)})
+    if estimate is None or estimate < 0:
+        return count_users(db, filters)
+    return int(estimate)
+
+def get_user_changes(
+    db: Session, position: ChangesPosition = ChangesPosition(), limit: int = 100, lag_seconds: float = 0.0
+) -> UserChanges:
+    """
+    Usuários criados/alterados e ids removidos depois do watermark `position`, em ordem de
+    mudança, e o novo watermark (ver comentário de "Delta sync"). Duas consultas pelos índices
+    de change_seq: o custo depende do número de mudanças, não do tamanho da tabela.
+    """
+    with read_from_primary(db):
+        horizon = _change_horizon(db)
+        if horizon is not None:
+            position = _settle_position(position, horizon)
+        upto = position.settled if horizon is not None else None
+        users = db.scalars(_select_changed_users(position.after, upto, limit)).all()
+        tombstones = db.execute(_select_tombstones(position.after, upto, limit)).all()
+    return _merge_changes(
+        users, tombstones, position, limit, None if horizon is not None else _lag_seconds_fallback(lag_seconds)
     )
-    db.add(db_user)
+
+def _create_user(db: Session, values: Dict[str, Any]) -> UserModel:
+    try:
+        db_user = db.scalars(_insert_user_returning(values)).one()
+    except IntegrityError as exc:
+        raise EmailAlreadyRegistered() from exc
+    inserted = _column_values(db_user)
+    write_outbox_events(db, [_user_event(USER_CREATED, inserted)])
     db.commit()
-    db.refresh(db_user)
+    _restore_column_values(db_user, inserted)
+    invalidate_user_counts()
     return db_user
 
+def create_user_by_admin(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> UserModel:
+    """
+    Cria um novo usuário no banco de dados (ação de administrador).
+    Permite definir is_active e is_superuser.
+    Se `hashed_password` for informado (ex.: calculado no pool de hashing), o hash não é recalculado.
+    INSERT ... RETURNING (mais o evento user.created do outbox, no mesmo commit); email
+    duplicado levanta EmailAlreadyRegistered.
+    """
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    return _create_user(db, user_insert_values(user, hashed_password))
+
+def get_existing_emails(db: Session, emails: Sequence[str]) -> Set[str]:
+    """
+    Retorna quais dos e-mails informados já estão cadastrados (uma única consulta).
+    """
+    if not emails:
+        return set()
+    return set(db.scalars(_select_existing_emails(emails)).all())
+
+def create_users_bulk(db: Session, users: Sequence[Dict[str, Any]]) -> List[Optional[int]]:
+    """
+    Insere um lote de usuários (valores de user_insert_values) com um INSERT multi-linha
+    ... RETURNING id e um único commit. Se o lote violar a unicidade de e-mail (corrida com
+    outra escrita), refaz linha a linha com SAVEPOINT: as linhas rejeitadas recebem id None
+    e as demais são inseridas normalmente. Os eventos user.created das linhas inseridas vão
+    para o outbox no mesmo commit.
+    """
+    if not users:
+        return []
+    try:
+        with db.begin_nested():
+            ids: List[Optional[int]] = list(db.scalars(_insert_users_returning_id(), list(users)).all())
+    except IntegrityError:
+        ids = []
+        for values in users:
+            try:
+                with db.begin_nested():
+                    ids.append(db.scalars(_insert_users_returning_id(), [values]).one())
+            except IntegrityError:
+                ids.append(None)
+    write_outbox_events(db, _bulk_user_events(users, ids))
+    db.commit()
+    invalidate_user_counts()
+    return ids
+
 # =======================================================================================================
 # --- CRUD (Usuário Comum / Superuser) ---                                                          #####
 # =======================================================================================================
 
-def create_user(db: Session, user: UserCreate) -> UserModel:
+def iter_user_export_batches(db: Session, batch_size: int = 1000) -> Iterator[Sequence[Row[Any]]]:
+    """
+    Percorre todos os usuários (ordenados por id) em lotes de até `batch_size` linhas de colunas,
+    com cursor do lado do servidor: a memória usada não depende do tamanho da tabela.
+    """
+    result = db.execute(_select_user_export_rows(batch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> UserModel:
     """
     Cria um novo usuário no banco de dados.
+    Se `hashed_password` for informado, o hash não é recalculado.
+    INSERT ... RETURNING (mais o evento user.created do outbox, no mesmo commit); email
+    duplicado levanta EmailAlreadyRegistered.
     """
-    hashed_password = get_password_hash(user.password)
-    db_user = UserModel(
-        email=user.email,
-        hashed_password=hashed_password,
-        full_name=user.full_name,
-        is_active=user.is_active if user.is_active is not None else True,
-        is_superuser=user.is_superuser if user.is_superuser is not None else False
-    )
-    db.add(db_user)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    return _create_user(db, user_insert_values(user, hashed_password))
+
+def update_user_by_id(
+    db: Session,
+    user_id: int,
+    user_in: Union[UserUpdate, Dict[str, Any]],
+    hashed_password: Optional[str] = None,
+    expected_versions: Optional[Sequence[int]] = None,
+    previous_email: Optional[str] = None,
+) -> Optional[UserModel]:
+    """
+    Atualiza o usuário com um único UPDATE ... RETURNING, sem ler a linha antes.
+    Com `expected_versions` (If-Match), só atualiza se a versão atual for uma delas.
+    Retorna None se nenhuma linha casou (usuário inexistente ou versão diferente) e levanta
+    EmailAlreadyRegistered se o novo email já pertencer a outro usuário.
+    Se `hashed_password` for informado, ele substitui o hash de `password` (que não é recalculado).
+    O evento user.updated vai para o outbox no mesmo commit.
+    """
+    update_data = _get_update_data(user_in)
+    if hashed_password is None and update_data.get("password"):
+        hashed_password = get_password_hash(update_data["password"])
+    values = _user_update_values(user_in, update_data, hashed_password)
+
+    try:
+        user = db.scalars(_update_user_returning(user_id, values, expected_versions)).first()
+    except IntegrityError as exc:
+        raise EmailAlreadyRegistered() from exc
+    if user is None:
+        return None
+    returned = _column_values(user)
+    write_outbox_events(db, [_user_event(USER_UPDATED, returned)])
     db.commit()
-    db.refresh(db_user)
-    return db_user
+    _restore_column_values(user, returned)
+    _invalidate_user_caches(user, previous_email, "email" in values)
+    invalidate_user_response(user.id)
+    return user
 
 def update_user(
     db: Session,
-    db_user: UserModel, 
-    user_in: Union[UserUpdate, Dict[str, Any]]
-) -> UserModel:
+    db_user: UserModel,
+    user_in: Union[UserUpdate, Dict[str, Any]],
+    hashed_password: Optional[str] = None,
+    expected_versions: Optional[Sequence[int]] = None,
+) -> Optional[UserModel]:
     """
-    Atualiza um usuário no banco de dados.
+    Atualiza um usuário já carregado (ver update_user_by_id); o objeto é atualizado com os
+    valores devolvidos pelo RETURNING.
     Se user_in for UserUpdate, pode ser um usuário atualizando o próprio perfil.
     Se user_in for Dict (usado por admin), pode atualizar is_active, is_superuser.
     """
-    if isinstance(user_in, dict):
-        update_data = user_in
-    else:
-        update_data = user_in.model_dump(exclude_unset=True)
-
-    if update_data.get("password"): 
-        hashed_password = get_password_hash(update_data["password"])
-        db_user.hashed_password = hashed_password
-        if "password" in update_data : del update_data["password"] 
-
-    for field, value in update_data.items():
-        if hasattr(db_user, field): 
-            if value is not None or (field in ["full_name"] and isinstance(user_in, UserUpdate)):
-                 setattr(db_user, field, value)
+    return update_user_by_id(
+        db, db_user.id, user_in, hashed_password, expected_versions, previous_email=db_user.email
+    )
 
+def update_user_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    """
+    Regrava o hash da senha sem alterar o usuário do ponto de vista dos clientes: a versão
+    (ETag/If-Match), o change_seq (delta sync) e o outbox ficam intactos. Usado pelo rehash
+    transparente no login; trocas de senha pelo usuário passam por update_user.
+    """
+    db.execute(_update_password_hash(user_id, hashed_password))
+    db.commit()
 
-    db.add(db_user)
+def delete_user(db: Session, db_user: UserModel) -> UserModel:
+    """
+    Deleta um usuário do banco de dados: soft delete (deleted_at) ou DELETE, conforme
+    USER_SOFT_DELETE_ENABLED (ver _delete_user).
+    Statement direto por id: um objeto vindo do cache de principal pode ter `version` defasada,
+    o que faria o flush do ORM (version_id_col) falhar com StaleDataError.
+    A lápide (delta sync) e o evento user.deleted do outbox vão no mesmo commit (se a linha
+    ainda existia).
+    """
+    email, user_id = db_user.email, db_user.id
+    deleted = _column_values(db_user)
+    if db.execute(_delete_user(user_id)).rowcount:
+        db.execute(_insert_user_tombstone(user_id))
+        write_outbox_events(db, [_deleted_user_event(deleted)])
     db.commit()
-    db.refresh(db_user)
+    _restore_column_values(db_user, deleted)
+    invalidate_principal(email)
+    invalidate_user_counts()
+    invalidate_user_response(user_id)
     return db_user
 
-def delete_user(db: Session, db_user: UserModel) -> UserModel:
+def purge_deleted_users(db: Session, limit: int, grace_seconds: float) -> int:
     """
-    Deleta um usuário do banco de dados.
+    Remove fisicamente um lote de usuários já removidos (soft delete) e retorna quantos.
+    As famílias de refresh token saem junto (ON DELETE CASCADE). Usado pelo expurgo em
+    segundo plano (app/core/user_purge.py), em lotes pequenos para não segurar locks.
     """
-    db.delete(db_user)
+    purged = db.execute(_purge_deleted_users(limit, grace_seconds)).rowcount or 0
     db.commit()
-    return db_user 
\ No newline at end of file
+    return purged
+
+# =======================================================================================================
+# --- CRUD Assíncrono (AsyncSession) ---                                                            #####
+# =======================================================================================================
+# Variantes das funções acima para o stack assíncrono (AsyncEngine + AsyncSession).
+# O hash de senha, quando necessário, é calculado no pool de hashing (nunca no event loop).
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[UserModel]:
+    """Versão assíncrona de get_user_by_email."""
+    return (await db.scalars(_select_user_by_email(email))).first()
+
+async def get_user_async(db: AsyncSession, user_id: int) -> Optional[UserModel]:
+    """Versão assíncrona de get_user."""
+    return (await db.scalars(_select_user(user_id))).first()
+
+async def get_user_password_hash_async(db: AsyncSession, user_id: int) -> Optional[str]:
+    """Versão assíncrona de get_user_password_hash."""
+    return (await db.scalars(_select_user_password_hash(user_id))).first()
+
+async def get_users_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    order_by: str = "id",
+    after: Optional[Sequence[Any]] = None,
+    descending: bool = False,
+    filters: Optional[UserSearchFilters] = None
+) -> List[UserModel]:
+    """Versão assíncrona de get_users."""
+    return list((await db.scalars(_select_users(skip, limit, order_by, after, descending, filters))).all())
+
+async def count_users_async(db: AsyncSession, filters: Optional[UserSearchFilters] = None) -> int:
+    """Versão assíncrona de count_users."""
+    key = _user_count_cache_key(filters)
+    total = get_user_count(key)
+    if total is None:
+        total = (await db.scalar(_select_user_count(filters))) or 0
+        store_user_count(key, total)
+    return total
+
+async def estimate_user_count_async(db: AsyncSession, filters: Optional[UserSearchFilters] = None) -> int:
+    """Versão assíncrona de estimate_user_count."""
+    if db.get_bind().dialect.name != "postgresql":
+        return await count_users_async(db, filters)
+    if _has_filters(filters):
+        sql, params = _explain_rows_sql(db, filters)  # type: ignore[arg-type]
+        connection = await db.connection()
+        return _plan_rows((await connection.exec_driver_sql(sql, params)).scalar())
+    estimate = await db.scalar(_RELTUPLES_SQL, {"table_name": _quoted_user_table(db)})
+    if estimate is None or estimate < 0:
+        return await count_users_async(db, filters)
+    return int(estimate)
+
+async def get_existing_emails_async(db: AsyncSession, emails: Sequence[str]) -> Set[str]:
+    """Versão assíncrona de get_existing_emails."""
+    if not emails:
+        return set()
+    return set((await db.scalars(_select_existing_emails(emails))).all())
+
+async def iter_user_export_batches_async(
+    db: AsyncSession, batch_size: int = 1000
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """Versão assíncrona de iter_user_export_batches (AsyncSession.stream)."""
+    result = await db.stream(_select_user_export_rows(batch_size))
+    try:
+        async for partition in result.partitions():
+            yield partition
+    finally:
+        await result.close()
+
+async def create_users_bulk_async(db: AsyncSession, users: Sequence[Dict[str, Any]]) -> List[Optional[int]]:
+    """Versão assíncrona de create_users_bulk."""
+    if not users:
+        return []
+    try:
+        async with db.begin_nested():
+            ids: List[Optional[int]] = list((await db.scalars(_insert_users_returning_id(), list(users))).all())
+    except IntegrityError:
+        ids = []
+        for values in users:
+            try:
+                async with db.begin_nested():
+                    ids.append((await db.scalars(_insert_users_returning_id(), [values])).one())
+            except IntegrityError:
+                ids.append(None)
+    await write_outbox_events_async(db, _bulk_user_events(users, ids))
+    await db.commit()
+    invalidate_user_counts()
+    return ids
+
+async def get_user_changes_async(
+    db: AsyncSession, position: ChangesPosition = ChangesPosition(), limit: int = 100, lag_seconds: float = 0.0
+) -> UserChanges:
+    """Versão assíncrona de get_user_changes."""
+    with read_from_primary(db):
+        horizon = await db.run_sync(_change_horizon)
+        if horizon is not None:
+            position = _settle_position(position, horizon)
+        upto = position.settled if horizon is not None else None
+        users = (await db.scalars(_select_changed_users(position.after, upto, limit))).all()
+        tombstones = (await db.execute(_select_tombstones(position.after, upto, limit))).all()
+    return _merge_changes(
+        users, tombstones, position, limit, None if horizon is not None else _lag_seconds_fallback(lag_seconds)
+    )
+
+async def _create_user_async(db: AsyncSession, values: Dict[str, Any]) -> UserModel:
+    try:
+        db_user = (await db.scalars(_insert_user_returning(values))).one()
+    except IntegrityError as exc:
+        raise EmailAlreadyRegistered() from exc
+    inserted = _column_values(db_user)
+    await write_outbox_events_async(db, [_user_event(USER_CREATED, inserted)])
+    await db.commit()
+    _restore_column_values(db_user, inserted)
+    invalidate_user_counts()
+    return db_user
+
+async def create_user_by_admin_async(
+    db: AsyncSession, user: UserCreate, hashed_password: Optional[str] = None
+) -> UserModel:
+    """Versão assíncrona de create_user_by_admin."""
+    if hashed_password is None:
+        hashed_password = await get_password_hash_async(user.password)
+    return await _create_user_async(db, user_insert_values(user, hashed_password))
+
+async def create_user_async(
+    db: AsyncSession, user: UserCreate, hashed_password: Optional[str] = None
+) -> UserModel:
+    """Versão assíncrona de create_user."""
+    if hashed_password is None:
+        hashed_password = await get_password_hash_async(user.password)
+    return await _create_user_async(db, user_insert_values(user, hashed_password))
+
+async def update_user_by_id_async(
+    db: AsyncSession,
+    user_id: int,
+    user_in: Union[UserUpdate, Dict[str, Any]],
+    hashed_password: Optional[str] = None,
+    expected_versions: Optional[Sequence[int]] = None,
+    previous_email: Optional[str] = None,
+) -> Optional[UserModel]:
+    """Versão assíncrona de update_user_by_id."""
+    update_data = _get_update_data(user_in)
+    if hashed_password is None and update_data.get("password"):
+        hashed_password = await get_password_hash_async(update_data["password"])
+    values = _user_update_values(user_in, update_data, hashed_password)
+
+    try:
+        user = (await db.scalars(_update_user_returning(user_id, values, expected_versions))).first()
+    except IntegrityError as exc:
+        raise EmailAlreadyRegistered() from exc
+    if user is None:
+        return None
+    returned = _column_values(user)
+    await write_outbox_events_async(db, [_user_event(USER_UPDATED, returned)])
+    await db.commit()
+    _restore_column_values(user, returned)
+    _invalidate_user_caches(user, previous_email, "email" in values)
+    await invalidate_user_response_async(user.id)
+    return user
+
+async def update_user_async(
+    db: AsyncSession,
+    db_user: UserModel,
+    user_in: Union[UserUpdate, Dict[str, Any]],
+    hashed_password: Optional[str] = None,
+    expected_versions: Optional[Sequence[int]] = None,
+) -> Optional[UserModel]:
+    """Versão assíncrona de update_user."""
+    return await update_user_by_id_async(
+        db, db_user.id, user_in, hashed_password, expected_versions, previous_email=db_user.email
+    )
+
+async def update_user_password_hash_async(db: AsyncSession, user_id: int, hashed_password: str) -> None:
+    """Versão assíncrona de update_user_password_hash."""
+    await db.execute(_update_password_hash(user_id, hashed_password))
+    await db.commit()
+
+async def delete_user_async(db: AsyncSession, db_user: UserModel) -> UserModel:
+    """Versão assíncrona de delete_user."""
+    email, user_id = db_user.email, db_user.id
+    deleted = _column_values(db_user)
+    if (await db.execute(_delete_user(user_id))).rowcount:
+        await db.execute(_insert_user_tombstone(user_id))
+        await write_outbox_events_async(db, [_deleted_user_event(deleted)])
+    await db.commit()
+    _restore_column_values(db_user, deleted)
+    invalidate_principal(email)
+    invalidate_user_counts()
+    await invalidate_user_response_async(user_id)
+    return db_user
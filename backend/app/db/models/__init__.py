@@ -1,6 +1,15 @@
 # app/db/models/__init__.py
 
 from .user import User
+from .user_tombstone import UserTombstone
+from .refresh_token import RefreshTokenFamily
+from .email_message import EmailMessage
+from .outbox import OutboxCursor, OutboxEvent
 
-__all__ = ["User"]
+__all__ = ["User", "UserTombstone", "RefreshTokenFamily", "EmailMessage", "OutboxEvent", "OutboxCursor"]
 _ = User
+_ = UserTombstone
+_ = RefreshTokenFamily
+_ = EmailMessage
+_ = OutboxEvent
+_ = OutboxCursor
@@ -0,0 +1,54 @@
+# app/db/models/email_message.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+# =======================================================================================================
+# --- Classe de Mensagem de Email (Fila de Envio) ---                                               #####
+# =======================================================================================================
+
+EMAIL_PENDING = "pending"
+EMAIL_SENT = "sent"
+EMAIL_FAILED = "failed"
+
+
+class EmailMessage(Base):
+    """
+    Fila durável de emails de saída (app/core/email_queue.py). Os handlers apenas inserem a
+    mensagem já renderizada; os workers a reivindicam quando `next_attempt_at` vence, adiando
+    o prazo (lease) enquanto enviam. Falhas reagendam com backoff até EMAIL_MAX_ATTEMPTS.
+    """
+
+    __tablename__ = "email_message"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=EMAIL_PENDING, server_default=EMAIL_PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), default=lambda: datetime.now(timezone.utc)
+    )
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Parcial: só as mensagens pendentes, na ordem em que vencem (consulta de reivindicação).
+        Index(
+            "ix_email_message_due",
+            next_attempt_at,
+            id,
+            postgresql_where=status == EMAIL_PENDING,
+            sqlite_where=status == EMAIL_PENDING,
+        ),
+    )
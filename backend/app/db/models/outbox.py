@@ -0,0 +1,48 @@
+# app/db/models/outbox.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import JSON, BigInteger, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+# =======================================================================================================
+# --- Outbox Transacional ---                                                                       #####
+# =======================================================================================================
+
+class OutboxEvent(Base):
+    """
+    Evento de mudança gravado na mesma transação da escrita que o originou (app/crud/outbox.py).
+    O id é o offset do evento: crescente, na ordem de inserção. O relay (app/core/outbox.py)
+    publica os eventos nos sinks em ordem de offset.
+    """
+
+    __tablename__ = "outbox_event"
+
+    # BIGINT no PostgreSQL; INTEGER no SQLite (só INTEGER PRIMARY KEY é autoincremento).
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    topic: Mapped[str] = mapped_column(String(64), nullable=False)
+    key: Mapped[str] = mapped_column(String(64), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class OutboxCursor(Base):
+    """Último offset entregue a cada sink (entrega ao menos uma vez, em ordem, por sink)."""
+
+    __tablename__ = "outbox_cursor"
+
+    sink: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_offset: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(),
+        default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc),
+    )
@@ -0,0 +1,33 @@
+# app/db/models/refresh_token.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+# =======================================================================================================
+# --- Classe de Família de Refresh Tokens ---                                                       #####
+# =======================================================================================================
+class RefreshTokenFamily(Base):
+    """
+    Família de refresh tokens: uma linha por login (não por token emitido).
+    Cada rotação incrementa `generation`; apenas o token da geração atual é aceito.
+    Apresentar um token de geração antiga indica reutilização e revoga a família inteira.
+    Famílias expiradas, ou revogadas há mais de REFRESH_TOKEN_REVOKED_RETENTION_SECONDS, são
+    removidas pelo expurgo em segundo plano (app/core/user_purge.py).
+    """
+
+    __tablename__ = "refresh_token_family"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), index=True, nullable=False)
+    generation: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), index=True, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True, nullable=False)
@@ -3,11 +3,51 @@
 # =======================================================================================================
 # --- Importações ---                                                                               #####
 # =======================================================================================================
-from sqlalchemy import Integer, String, Boolean
-from sqlalchemy.orm import Mapped, mapped_column 
+from datetime import datetime, timezone
+
+from typing import Any
+
+from sqlalchemy import BigInteger, Integer, String, Boolean, DateTime, Index, Sequence, and_, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.expression import FunctionElement
 
 from app.db.base_class import Base 
 
+# =======================================================================================================
+# --- Sequência de Mudanças (Delta Sync) ---                                                        #####
+# =======================================================================================================
+# Toda escrita em "user" (e cada lápide em user_tombstone) recebe o próximo valor de uma
+# sequência global, base do watermark de GET /users/changes.
+
+user_change_seq = Sequence("user_change_seq", metadata=Base.metadata)
+
+
+class next_user_change_seq(FunctionElement[int]):
+    """Próximo valor da sequência de mudanças, como default/onupdate de coluna."""
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(next_user_change_seq, "postgresql")
+def _next_user_change_seq_postgresql(element: next_user_change_seq, compiler: Any, **kw: Any) -> str:
+    # O CASE avalia pg_current_xact_id() antes do nextval: a transação já tem id quando recebe o
+    # change_seq, o que o delta sync usa para provar, pelo snapshot, que ela terminou.
+    next_value = compiler.process(user_change_seq.next_value(), **kw)
+    return f"CASE WHEN pg_current_xact_id() IS NOT NULL THEN {next_value} END"
+
+
+@compiles(next_user_change_seq)
+def _next_user_change_seq_default(element: next_user_change_seq, compiler: Any, **kw: Any) -> str:
+    # Sem sequences (SQLite, usado nos testes): maior valor já atribuído + 1. Os escritores do
+    # SQLite são serializados; linhas de um mesmo INSERT multi-linha podem repetir o valor
+    # (o watermark desempata por id).
+    quote = compiler.preparer.quote
+    return (
+        f"(SELECT max(coalesce((SELECT max(change_seq) FROM {quote('user')}), 0), "
+        f"coalesce((SELECT max(change_seq) FROM {quote('user_tombstone')}), 0)) + 1)"
+    )
+
 # =======================================================================================================
 # --- Classe Base de Usuário ---                                                                    #####
 # =======================================================================================================
@@ -17,8 +57,77 @@ class User(Base):
     """
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
+    # Único entre os usuários não removidos (ix_user_email, parcial): o email de um usuário
+    # removido (soft delete) pode ser cadastrado de novo antes do expurgo.
+    email: Mapped[str] = mapped_column(String(255), nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     full_name: Mapped[str | None] = mapped_column(String(255), index=True, nullable=True) 
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Versão da linha (concorrência otimista via version_id_col), base do ETag.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(),
+        default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    # Posição da última escrita na sequência de mudanças (delta sync); atualizada a cada UPDATE.
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, index=True, default=next_user_change_seq(), onupdate=next_user_change_seq()
+    )
+
+    # Soft delete (USER_SOFT_DELETE_ENABLED): a linha some das consultas e é expurgada depois,
+    # em lotes, pelo app/core/user_purge.py.
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Flushes do ORM fazem UPDATE/DELETE ... WHERE version = :lida e incrementam a versão
+    # (StaleDataError se outra escrita chegou antes); o CRUD faz o mesmo com UPDATE ... RETURNING.
+    __mapper_args__ = {"version_id_col": version}
+
+    # Índices de busca (GET /users): ver as migrações a3c9e1f27b54_add_user_search_indexes e
+    # f3a8c1d5b742_add_user_soft_delete. Os índices de consulta excluem as linhas removidas
+    # (deleted_at IS NULL, condição presente em todas as leituras do CRUD).
+    __table_args__ = (
+        Index(
+            "ix_user_email",
+            email,
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        # Prefixo de e-mail sem diferenciar maiúsculas: lower(email) LIKE 'prefixo%'.
+        Index(
+            "ix_user_email_lower",
+            func.lower(email).label("email_lower"),
+            postgresql_ops={"email_lower": "varchar_pattern_ops"},
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        # Parciais: cobrem apenas as minorias (inativos / superusuários), ordenadas por id.
+        Index(
+            "ix_user_inactive_id",
+            id,
+            postgresql_where=and_(is_active == False, deleted_at.is_(None)),  # noqa: E712
+            sqlite_where=and_(is_active == False, deleted_at.is_(None)),  # noqa: E712
+        ),
+        Index(
+            "ix_user_superuser_id",
+            id,
+            postgresql_where=and_(is_superuser == True, deleted_at.is_(None)),  # noqa: E712
+            sqlite_where=and_(is_superuser == True, deleted_at.is_(None)),  # noqa: E712
+        ),
+        # Fila do expurgo: só as linhas removidas, na ordem da remoção.
+        Index(
+            "ix_user_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.is_not(None),
+            sqlite_where=deleted_at.is_not(None),
+        ),
+        # Busca por substring em full_name (ILIKE '%termo%') via trigramas; só existe no PostgreSQL.
+        Index(
+            "ix_user_full_name_trgm",
+            full_name,
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -0,0 +1,31 @@
+# app/db/models/user_tombstone.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+from app.db.models.user import next_user_change_seq
+
+# =======================================================================================================
+# --- Lápides de Usuários Removidos ---                                                             #####
+# =======================================================================================================
+
+class UserTombstone(Base):
+    """
+    Registro da remoção de um usuário (gravado por delete_user na mesma transação do DELETE),
+    para que GET /users/changes informe as remoções posteriores ao watermark do cliente.
+    """
+
+    __tablename__ = "user_tombstone"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True, default=next_user_change_seq())
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
@@ -0,0 +1,151 @@
+# app/db/pool.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Pools Instrumentados ---                                                                      #####
+# =======================================================================================================
+# Os eventos de pool do SQLAlchemy não informam quanto tempo o checkout esperou por uma conexão
+# livre. Estas subclasses apenas cronometram a obtenção da conexão e anotam o tempo em
+# `connection_record.info`; a coleta em si é feita pelo listener de "checkout" (instrument_engine).
+
+CHECKOUT_WAIT_KEY = "checkout_wait_seconds"
+
+
+class _TimedCheckoutMixin:
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        record = super()._do_get()  # type: ignore[misc]
+        record.info[CHECKOUT_WAIT_KEY] = time.perf_counter() - started
+        return record
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool que registra o tempo de espera de cada checkout."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que registra o tempo de espera de cada checkout."""
+
+# =======================================================================================================
+# --- Métricas ---                                                                                  #####
+# =======================================================================================================
+
+# Limites superiores (em segundos) dos buckets do histograma de espera no checkout.
+CHECKOUT_WAIT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    """
+    Contadores de um pool de conexões, alimentados pelos listeners de evento do pool.
+    Thread-safe: os eventos disparam nas threads dos requests.
+    """
+
+    def __init__(self, name: str, slow_checkout_seconds: float) -> None:
+        self.name = name
+        self.slow_checkout_seconds = slow_checkout_seconds
+        self._lock = threading.Lock()
+        self._wait_buckets: List[int] = [0] * (len(CHECKOUT_WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self._counters: Dict[str, int] = {
+            "checkouts": 0, "checkins": 0, "connects": 0, "invalidations": 0, "slow_checkouts": 0
+        }
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def observe_checkout(self, wait_seconds: float) -> None:
+        slow = wait_seconds >= self.slow_checkout_seconds
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._wait_buckets[bisect.bisect_left(CHECKOUT_WAIT_BUCKETS, wait_seconds)] += 1
+            self._wait_sum += wait_seconds
+            self._wait_max = max(self._wait_max, wait_seconds)
+            if slow:
+                self._counters["slow_checkouts"] += 1
+        if slow:
+            logger.warning("Checkout lento no pool %r: %.3fs aguardando conexão livre.", self.name, wait_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(CHECKOUT_WAIT_BUCKETS + (float("inf"),), self._wait_buckets):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                **self._counters,
+                "checkout_wait_seconds": {
+                    "buckets": buckets,
+                    "count": cumulative,
+                    "sum": round(self._wait_sum, 6),
+                    "max": round(self._wait_max, 6),
+                },
+            }
+
+
+def _pool_gauges(pool: Any) -> Dict[str, Optional[int]]:
+    # Apenas pools com fila (QueuePool e derivados) expõem esses valores.
+    if not isinstance(pool, QueuePool):
+        return {"size": None, "checked_out": None, "checked_in": None, "overflow": None}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+_registry: Dict[str, Tuple[Engine, PoolMetrics]] = {}
+
+
+def instrument_engine(name: str, engine: Engine) -> PoolMetrics:
+    """
+    Registra os listeners de pool do `engine` (checkout, checkin, connect, invalidate) e
+    expõe suas métricas em pool_stats() sob `name`. Os listeners sobrevivem a engine.dispose().
+    """
+    metrics = PoolMetrics(name, settings.DB_POOL_SLOW_CHECKOUT_SECONDS)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        metrics.observe_checkout(connection_record.info.pop(CHECKOUT_WAIT_KEY, 0.0))
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        metrics.increment("checkins")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        metrics.increment("connects")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Optional[BaseException]) -> None:
+        metrics.increment("invalidations")
+
+    _registry[name] = (engine, metrics)
+    return metrics
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Métricas e medidores atuais de cada pool instrumentado (para o endpoint de métricas)."""
+    return {
+        name: {**_pool_gauges(engine.pool), **metrics.snapshot()}
+        for name, (engine, metrics) in _registry.items()
+    }
@@ -0,0 +1,140 @@
+# app/db/query_stats.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Estatísticas de Consultas por Request ---                                                     #####
+# =======================================================================================================
+# Os listeners before/after_cursor_execute cronometram cada statement enviado ao banco. O tempo
+# é somado às estatísticas do request corrente, guardadas em uma ContextVar: o contexto é
+# copiado para o threadpool (CRUD síncrono) e para o greenlet do SQLAlchemy (AsyncSession),
+# então o mesmo objeto recebe as consultas dos dois stacks. Fora de um request (scripts,
+# workers) só o log de consultas lentas e os totais do processo são alimentados.
+
+_STARTED_KEY = "query_started_at"
+
+# Tamanho máximo do statement guardado/logado como "mais lento".
+MAX_STATEMENT_LENGTH = 500
+
+
+class QueryStats:
+    """Contagem, tempo total e statement mais lento de um request (ou do processo)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.count = 0
+        self.slow_count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float, slow: bool) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            if slow:
+                self.slow_count += 1
+            if seconds >= self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_statement = statement[:MAX_STATEMENT_LENGTH]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queries": self.count,
+                "slow_queries": self.slow_count,
+                "total_ms": round(self.total_seconds * 1000, 3),
+                "slowest_ms": round(self.slowest_seconds * 1000, 3),
+                "slowest_statement": self.slowest_statement,
+            }
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+process_query_stats = QueryStats()
+
+
+def begin_request_stats() -> QueryStats:
+    """Inicia a coleta para o contexto atual (um request); retorna o objeto que será preenchido."""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def current_request_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+# =======================================================================================================
+# --- Listeners ---                                                                                 #####
+# =======================================================================================================
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    # Pilha em conn.info: um statement pode disparar outro na mesma conexão (ex.: pre-ping).
+    conn.info.setdefault(_STARTED_KEY, []).append((statement, time.perf_counter()))
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    started = conn.info.get(_STARTED_KEY)
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()[1]
+    slow = elapsed >= settings.DB_SLOW_QUERY_SECONDS
+    process_query_stats.record(statement, elapsed, slow)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed, slow)
+    if slow:
+        logger.warning(
+            "Consulta lenta (%.1fms): %s",
+            elapsed * 1000,
+            statement[:MAX_STATEMENT_LENGTH],
+            extra={"db_statement": statement[:MAX_STATEMENT_LENGTH], "db_duration_ms": round(elapsed * 1000, 3)},
+        )
+
+
+def _handle_error(context: Any) -> None:
+    # Um statement que falha não dispara after_cursor_execute: o início empilhado é descartado
+    # aqui, senão ficaria na conexão (devolvida ao pool) para sempre. Só desempilha se o erro
+    # for do statement do topo (e não de uma falha antes de ele chegar ao cursor).
+    connection = context.connection
+    if connection is None:
+        return
+    started = connection.info.get(_STARTED_KEY)
+    if started and started[-1][0] == context.statement:
+        started.pop()
+
+
+def install_query_listeners() -> None:
+    """
+    Registra os listeners na classe Engine: valem para todos os motores (primário, réplicas,
+    o sync_engine dos motores assíncronos e motores criados depois, como os dos testes).
+    Idempotente.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def query_stats() -> Dict[str, Any]:
+    """Totais do processo (para o endpoint de métricas)."""
+    return {"slow_query_seconds": settings.DB_SLOW_QUERY_SECONDS, **process_query_stats.snapshot()}
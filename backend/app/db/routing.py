@@ -0,0 +1,163 @@
+# app/db/routing.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Union
+
+from sqlalchemy import Select, event
+from sqlalchemy.engine import Engine, ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.core.lru import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+# =======================================================================================================
+# --- Roteador de Réplicas ---                                                                      #####
+# =======================================================================================================
+# Leituras vão para as réplicas (round-robin), escritas e commits para o primário. Uma réplica
+# que falha (erro de conexão/desconexão) sai do rodízio por `retry_seconds` e volta a ser tentada
+# depois disso. Clientes que acabaram de escrever ficam fixados no primário por `pin_seconds`,
+# para que leiam as próprias escritas apesar do atraso de replicação.
+
+# Chaves em Session.info.
+CLIENT_KEY = "routing_client_key"
+USE_PRIMARY = "routing_use_primary"
+PRIMARY_READS = "routing_primary_reads"
+
+
+@contextmanager
+def read_from_primary(session: Union[Session, AsyncSession]) -> Iterator[None]:
+    """
+    Leva ao primário as leituras da sessão feitas dentro do bloco, sem fixar o cliente: para
+    leituras que não podem ver um estado anterior ao do primário (ex.: as que alimentam caches).
+    """
+    previous = session.info.get(PRIMARY_READS)
+    session.info[PRIMARY_READS] = True
+    try:
+        yield
+    finally:
+        session.info[PRIMARY_READS] = previous
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine] = (),
+        retry_seconds: float = 5.0,
+        pin_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._down_until: Dict[int, float] = {}
+        self._pins: TTLLRUCache[str, bool] = TTLLRUCache(maxsize=100_000, ttl=pin_seconds, clock=clock)
+        for index, replica in enumerate(self.replicas):
+            event.listen(replica, "handle_error", self._make_error_handler(index))
+
+    def _make_error_handler(self, index: int) -> Callable[[ExceptionContext], None]:
+        def on_error(context: ExceptionContext) -> None:
+            # Falha ao conectar (sem conexão) ou conexão perdida: tira a réplica do rodízio.
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(index)
+        return on_error
+
+    def mark_down(self, index: int) -> None:
+        with self._lock:
+            self._down_until[index] = self._clock() + self.retry_seconds
+        logger.warning(
+            "Réplica %d indisponível; leituras vão para outras réplicas/primário por %.1fs.",
+            index,
+            self.retry_seconds,
+        )
+
+    def choose_replica(self) -> Optional[Engine]:
+        """Próxima réplica saudável no rodízio, ou None se nenhuma estiver disponível."""
+        if not self.replicas:
+            return None
+        now = self._clock()
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                index = next(self._turn) % len(self.replicas)
+                if self._down_until.get(index, 0.0) <= now:
+                    self._down_until.pop(index, None)
+                    return self.replicas[index]
+        return None
+
+    def pin(self, client_key: Optional[str]) -> None:
+        if client_key is not None and self.replicas:
+            self._pins.set(client_key, True)
+
+    def is_pinned(self, client_key: Optional[str]) -> bool:
+        return client_key is not None and self._pins.get(client_key) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            down = sorted(index for index, until in self._down_until.items() if until > now)
+        return {"replicas": len(self.replicas), "replicas_down": down, "pinned_clients": len(self._pins)}
+
+
+def client_key(authorization: Optional[str], host: Optional[str]) -> Optional[str]:
+    """
+    Identifica o cliente para a fixação no primário: o token (hash) quando presente,
+    senão o IP. Nunca guarda o token em claro.
+    """
+    if authorization:
+        return "token:" + hashlib.sha256(authorization.encode()).hexdigest()
+    return f"ip:{host}" if host else None
+
+# =======================================================================================================
+# --- Sessão com Roteamento ---                                                                     #####
+# =======================================================================================================
+
+class RoutingSession(Session):
+    """
+    Session que escolhe o engine por statement: SELECTs (sem FOR UPDATE) vão para uma réplica;
+    flush, INSERT/UPDATE/DELETE, SQL textual e Session.connection() vão para o primário.
+    Depois da primeira escrita (flush ou DML) a sessão inteira passa a usar o primário
+    (inclusive o refresh pós-commit) e, no commit, o cliente (Session.info[CLIENT_KEY])
+    é fixado no primário pela janela do roteador.
+    Sem réplicas configuradas comporta-se exatamente como uma Session comum.
+    """
+
+    def __init__(self, *args: Any, router: Optional[ReplicaRouter] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Any:
+        router = self.router
+        if router is None or not router.replicas:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info[USE_PRIMARY] = True
+            return router.primary
+        is_read = isinstance(clause, Select) and clause._for_update_arg is None
+        if not is_read or self.info.get(USE_PRIMARY) or self.info.get(PRIMARY_READS):
+            return router.primary
+        if router.is_pinned(self.info.get(CLIENT_KEY)):
+            return router.primary
+        return router.choose_replica() or router.primary
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_client_after_write(session: Session) -> None:
+    router = getattr(session, "router", None)
+    if router is not None and session.info.get(USE_PRIMARY):
+        router.pin(session.info.get(CLIENT_KEY))
+
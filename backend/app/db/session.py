@@ -5,19 +5,123 @@
 # =======================================================================================================
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Any, Dict, Generator
 
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
+from app.db.query_stats import install_query_listeners
+from app.db.routing import ReplicaRouter, RoutingSession
 
 
+# =======================================================================================================
+# --- Helpers ---                                                                                   #####
+# =======================================================================================================
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """
+    Converte uma URL de banco síncrona para o driver assíncrono equivalente
+    (postgresql -> asyncpg, sqlite -> aiosqlite). URLs já assíncronas são mantidas.
+    """
+    sa_url = make_url(url)
+    backend = sa_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS or sa_url.drivername in ASYNC_DRIVERS.values():
+        return url
+    return sa_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def pool_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """
+    Argumentos de pool para create_engine/create_async_engine a partir das settings DB_POOL_*.
+    O SQLite mantém o pool padrão do dialeto (sem fila), recebendo apenas o pre-ping.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
 # =======================================================================================================
 # --- Motor e Seção local ---                                                                       #####
 # =======================================================================================================
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+# Contagem e tempo de cada statement (todos os motores): ver app/db/query_stats.py.
+install_query_listeners()
+
+engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
+instrument_engine("sync", engine)
+
+replica_engines = [create_engine(url, **pool_options(url)) for url in settings.DATABASE_REPLICA_URLS]
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(f"sync_replica_{index}", replica_engine)
+
+# Leituras nas réplicas (quando configuradas), escritas no primário: ver app/db/routing.py.
+replica_router = ReplicaRouter(
+    engine,
+    replica_engines,
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+    pin_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, router=replica_router
+)
+
+# =======================================================================================================
+# --- Motor e Seção local (Assíncronos) ---                                                         #####
+# =======================================================================================================
+
+ASYNC_DATABASE_URL = settings.DATABASE_ASYNC_URL or to_async_url(settings.DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, is_async=True))
+instrument_engine("async", async_engine.sync_engine)
+
+async_replica_engines = [
+    create_async_engine(to_async_url(url), **pool_options(to_async_url(url), is_async=True))
+    for url in settings.DATABASE_REPLICA_URLS
+]
+for index, async_replica_engine in enumerate(async_replica_engines):
+    instrument_engine(f"async_replica_{index}", async_replica_engine.sync_engine)
+
+# O roteamento opera sobre os engines síncronos subjacentes (a AsyncSession delega à RoutingSession).
+async_replica_router = ReplicaRouter(
+    async_engine.sync_engine,
+    [replica.sync_engine for replica in async_replica_engines],
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+    pin_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+# expire_on_commit=False: atributos continuam acessíveis após o commit sem IO implícito.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    router=async_replica_router,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+def dispose_engines_after_fork() -> None:
+    """
+    Chamada no processo filho logo após um fork (app/serve.py): descarta os pools herdados sem
+    fechar as conexões, que continuam pertencendo ao processo pai. Cada worker abre as suas.
+    """
+    sync_engines = [engine, *replica_engines, async_engine.sync_engine]
+    sync_engines += [replica.sync_engine for replica in async_replica_engines]
+    for sync_engine in sync_engines:
+        sync_engine.dispose(close=False)
 
 # =======================================================================================================
 # --- Dependência ---                                                                               #####
@@ -32,4 +136,4 @@ def get_db() -> Generator[Session, None, None]: # pragma: no cover
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -4,14 +4,51 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
-from fastapi import FastAPI
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware 
+from fastapi.responses import JSONResponse
 
+from app.core import security
+from app.core.cache import cache
 from app.core.config import settings
+from app.core.email_queue import email_worker
+from app.core.keys import key_ring
+from app.core.outbox import outbox_relay
+from app.core.rate_limit import LoginRateLimited
+from app.core.user_purge import user_purger
+from app.api.server_timing import ServerTimingMiddleware
 from app.api.v1.endpoints import auth as auth_router
 from app.api.v1.endpoints import users_admin as users_admin_router
+from app.api.v1.endpoints import users_bulk as users_bulk_router
+from app.api.v1.endpoints import users_changes as users_changes_router
+from app.api.v1.endpoints import metrics as metrics_router
+
+
+# =======================================================================================================
+# --- Ciclo de Vida ---                                                                             #####
+# =======================================================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Inicializa e finaliza recursos compartilhados da aplicação.
+    """
+    background = settings.BACKGROUND_TASKS_ENABLED
+    if background and settings.EMAIL_WORKER_ENABLED:
+        email_worker.start()
+    if background and settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.start()
+    if background and settings.USER_PURGE_ENABLED:
+        user_purger.start()
+    yield
+    user_purger.stop()
+    outbox_relay.stop()
+    email_worker.stop()
+    await cache.close()
+    security.password_hashing_pool.shutdown()
 
 # =======================================================================================================
 # --- Instância ---                                                                                 #####
@@ -21,7 +58,8 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     version="0.1.0",
     description="FastAPI Template para CRUD",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # =======================================================================================================
@@ -41,14 +79,50 @@ app.add_middleware(
     allow_credentials=True, 
     allow_methods=["*"],    
     allow_headers=["*"],    
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
+# Server-Timing e log estruturado com as consultas de cada request (app/api/server_timing.py).
+if settings.DB_QUERY_STATS_ENABLED:
+    app.add_middleware(ServerTimingMiddleware, sample_rate=settings.DB_QUERY_LOG_SAMPLE_RATE)
+
+# =======================================================================================================
+# --- Tratamento de Erros ---                                                                       #####
+# =======================================================================================================
+
+@app.exception_handler(security.PasswordHashingPoolSaturated)
+async def password_hashing_pool_saturated_handler(
+    request: Request, exc: security.PasswordHashingPoolSaturated
+) -> JSONResponse:
+    """
+    Converte a saturação do pool de hashing em 503, sinalizando ao cliente que tente novamente.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servidor sobrecarregado. Tente novamente em instantes."},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(LoginRateLimited)
+async def login_rate_limited_handler(request: Request, exc: LoginRateLimited) -> JSONResponse:
+    """
+    Converte a rejeição do limitador de login em 429, informando quando tentar novamente.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many login attempts. Try again later."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # =======================================================================================================
 # --- Rotas ---                                                                                     #####
 # =======================================================================================================
 
 app.include_router(auth_router.router, prefix=settings.API_V1_STR + "/auth", tags=["Authentication & Users"])
+app.include_router(users_bulk_router.router, prefix=settings.API_V1_STR + "/users", tags=["Admin - Users Bulk Operations"])
+app.include_router(users_changes_router.router, prefix=settings.API_V1_STR + "/users", tags=["Admin - Users Delta Sync"])
 app.include_router(users_admin_router.router, prefix=settings.API_V1_STR + "/users", tags=["Admin - Users Management"]) 
+app.include_router(metrics_router.router, prefix=settings.API_V1_STR + "/metrics", tags=["Admin - Metrics"])
 
 # =======================================================================================================
 # --- Endpoints ---                                                                                 #####
@@ -69,3 +143,14 @@ async def health_check() -> Dict[str, str]:
     Útil para K8s, Docker Swarm, etc.
     """
     return {"status": "ok"}
+
+@app.get("/.well-known/jwks.json", tags=["Authentication & Users"])
+async def read_jwks(response: Response) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    JSON Web Key Set com as chaves públicas de assinatura dos tokens (RS256/ES256), para que
+    outros serviços validem os tokens localmente. Vazio quando a assinatura é HS256.
+    Refresh tokens e tokens de recuperação de senha usam as mesmas chaves: o consumidor deve
+    aceitar apenas tokens com `aud` igual a JWT_AUDIENCE (header `typ: at+jwt`).
+    """
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return key_ring.jwks()
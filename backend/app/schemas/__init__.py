@@ -9,8 +9,12 @@ from .user import (
     UserPasswordChange,
     PasswordRecoveryRequest,
     PasswordResetForm,
+    UserBulkImportCreated,
+    UserBulkImportError,
+    UserBulkImportResult,
+    UserSearchFilters,
 )
-from .token import Token, TokenData
+from .token import RefreshTokenRequest, Token, TokenData
 
 __all__ = [
     "UserBase",
@@ -21,6 +25,11 @@ __all__ = [
     "UserPasswordChange",
     "PasswordRecoveryRequest",
     "PasswordResetForm",
+    "UserBulkImportCreated",
+    "UserBulkImportError",
+    "UserBulkImportResult",
+    "UserSearchFilters",
     "Token",
     "TokenData",
+    "RefreshTokenRequest",
 ]
\ No newline at end of file
@@ -18,3 +18,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[EmailStr] = None
+
+class RefreshTokenRequest(BaseModel):
+    """Schema para trocar um refresh token por um novo par de tokens."""
+    refresh_token: str
@@ -5,12 +5,23 @@
 # =======================================================================================================
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator, ValidationInfo
-from typing import Optional
+from typing import List, Literal, Optional
 
 # =======================================================================================================
 # --- Schemas de Usuário ---                                                                        #####
 # =======================================================================================================
 
+UserSortKey = Literal["id", "email", "full_name"]
+SortOrder = Literal["asc", "desc"]
+UserCountMode = Literal["exact", "estimated"]
+
+class UserSearchFilters(BaseModel):
+    """Filtros da listagem de usuários (todos opcionais e combinados com AND)."""
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+    email_prefix: Optional[str] = None
+    full_name: Optional[str] = None
+
 class UserBase(BaseModel):
     full_name: Optional[str] = None
     is_active: Optional[bool] = Field(default=True)
@@ -74,4 +85,34 @@ class PasswordResetForm(BaseModel):
         """Verifica se a nova senha e a confirmação correspondem."""
         if info.data and 'new_password' in info.data and v != info.data['new_password']:
             raise ValueError('As senhas não correspondem')
-        return v
\ No newline at end of file
+        return v
+
+class UserBulkImportCreated(BaseModel):
+    """Usuário criado por uma importação em massa (index = posição da linha na entrada)."""
+    index: int
+    id: int
+    email: EmailStr
+
+class UserBulkImportError(BaseModel):
+    """Linha rejeitada por uma importação em massa, sem abortar as demais."""
+    index: int
+    email: Optional[str] = None
+    detail: str
+
+class UserBulkImportResult(BaseModel):
+    """Resultado de uma importação em massa de usuários."""
+    created: int = 0
+    failed: int = 0
+    users: List[UserBulkImportCreated] = Field(default_factory=list)
+    errors: List[UserBulkImportError] = Field(default_factory=list)
+
+class UserChangesRead(BaseModel):
+    """
+    Página do delta sync (GET /users/changes): usuários criados/alterados e ids removidos após
+    o watermark. `since` é o watermark a enviar na próxima chamada; com `has_more`, há mais
+    mudanças disponíveis imediatamente.
+    """
+    users: List[UserRead] = Field(default_factory=list)
+    deleted: List[int] = Field(default_factory=list)
+    since: str
+    has_more: bool = False
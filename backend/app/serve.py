@@ -0,0 +1,267 @@
+# app/serve.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import importlib.util
+import logging
+import logging.config
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# =======================================================================================================
+# --- Runner de Produção (python -m app.serve) ---                                                  #####
+# =======================================================================================================
+# O processo mestre abre o socket de escuta, importa a aplicação (SERVER_PRELOAD: o código e os
+# dados de módulo ficam compartilhados por copy-on-write) e faz fork de SERVER_WORKERS processos,
+# cada um com seu servidor uvicorn (uvloop/httptools quando disponíveis) aceitando no mesmo
+# socket. Recursos com estado de processo (pools do banco, pool de hashing) são criados no
+# worker: os pools herdados são descartados após o fork. As threads de segundo plano (email,
+# outbox, purga) iniciam só no lifespan do worker 0 (BACKGROUND_TASKS_ENABLED), inclusive
+# quando ele é reciclado.
+#
+# O padrão é um worker. Com mais de um, o estado mantido em memória deixa de valer para a
+# aplicação inteira, então o runner recusa a configuração quando ela quebraria garantias:
+# - limite de tentativas de login: exige CACHE_BACKEND=resp (contadores no servidor do cache);
+# - leitura das próprias escritas com réplicas: o cliente é fixado no primário só no worker que
+#   atendeu a escrita, então exige DB_READ_YOUR_WRITES_SECONDS=0;
+# - cache de principal: a desativação ou o rebaixamento de um usuário precisa valer na hora, e
+#   a invalidação só alcança o processo da escrita, então exige PRINCIPAL_CACHE_ENABLED=false.
+# O cache de contagem continua por processo: escritas feitas em outro worker ficam visíveis
+# após USER_COUNT_CACHE_TTL_SECONDS.
+#
+# Sinais do mestre:
+# - SIGTERM/SIGINT: repassa SIGTERM aos workers, que param de aceitar conexões e drenam os
+#   requests em andamento por até SERVER_GRACEFUL_TIMEOUT_SECONDS; depois disso, SIGKILL.
+# - SIGHUP: recicla todos os workers (cada um drena e é substituído).
+# Um worker que sai (ex.: reciclado após SERVER_MAX_REQUESTS) é substituído. Se um worker
+# falhar na inicialização (lifespan), o mestre encerra tudo: reiniciar não resolveria.
+
+# Código de saída de um worker cujo servidor não chegou a iniciar.
+WORKER_BOOT_ERROR = 3
+
+APP_TARGET = "app.main:app"
+
+
+def worker_count() -> int:
+    """SERVER_WORKERS ou, com 0, as CPUs disponíveis ao processo (respeita cpusets/cgroups)."""
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # pragma: no cover - plataformas sem sched_getaffinity
+        return os.cpu_count() or 1
+
+
+def multi_worker_conflicts() -> List[str]:
+    """Configurações com estado por processo que impedem mais de um worker (ver comentário da seção)."""
+    conflicts = []
+    if settings.LOGIN_RATE_LIMIT_ENABLED and settings.CACHE_BACKEND != "resp":
+        conflicts.append("o limite de login em memória exige CACHE_BACKEND=resp")
+    if settings.DATABASE_REPLICA_URLS and settings.DB_READ_YOUR_WRITES_SECONDS > 0:
+        conflicts.append("a leitura das próprias escritas é por processo; use DB_READ_YOUR_WRITES_SECONDS=0")
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        conflicts.append("o cache de principal é invalidado só no processo da escrita; use PRINCIPAL_CACHE_ENABLED=false")
+    return conflicts
+
+
+def max_requests_for_worker() -> Optional[int]:
+    """Limite de requests deste worker (com jitter) ou None, sem reciclagem."""
+    if settings.SERVER_MAX_REQUESTS <= 0:
+        return None
+    return settings.SERVER_MAX_REQUESTS + random.randint(0, max(0, settings.SERVER_MAX_REQUESTS_JITTER))
+
+
+def resolved_loop() -> str:
+    if settings.SERVER_LOOP != "auto":
+        return settings.SERVER_LOOP
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def resolved_http() -> str:
+    if settings.SERVER_HTTP != "auto":
+        return settings.SERVER_HTTP
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def build_config(app: Any) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=settings.SERVER_BIND_HOST,
+        port=settings.SERVER_BIND_PORT,
+        loop=resolved_loop(),
+        http=resolved_http(),
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        limit_max_requests=max_requests_for_worker(),
+        proxy_headers=settings.SERVER_PROXY_HEADERS,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        log_config=None,
+    )
+
+# =======================================================================================================
+# --- Processo Mestre ---                                                                           #####
+# =======================================================================================================
+
+class Arbiter:
+    # Intervalo em que o mestre verifica workers encerrados.
+    reap_interval = 0.2
+
+    def __init__(self, app: Any, sock: socket.socket, workers: int) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}
+        # Posição (0..workers-1) de cada worker; o 0 roda as threads de segundo plano.
+        self.slots: Dict[int, int] = {}
+        self.exit_code = 0
+        self._stopping = threading.Event()
+
+    def spawn(self, slot: int = 0) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = WORKER_BOOT_ERROR
+            try:
+                settings.BACKGROUND_TASKS_ENABLED = settings.BACKGROUND_TASKS_ENABLED and slot == 0
+                code = self._run_worker()
+            except BaseException:
+                logger.exception("Erro no worker %d.", os.getpid())
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        self.slots[pid] = slot
+        return pid
+
+    def free_slots(self) -> List[int]:
+        return sorted(set(range(self.workers)) - set(self.slots.values()))
+
+    def _run_worker(self) -> int:
+        # O uvicorn instala os próprios handlers e, ao terminar, repete o sinal recebido: com
+        # SIG_IGN herdado como handler anterior, o worker sai normalmente (código 0).
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        from app.db.session import dispose_engines_after_fork
+
+        dispose_engines_after_fork()
+        server = uvicorn.Server(build_config(self.app))
+        server.run(sockets=[self.sock])
+        return 0 if server.started else WORKER_BOOT_ERROR
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started_at = self.children.pop(pid, None)
+            self.slots.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if self._stopping.is_set():
+                continue
+            if code == WORKER_BOOT_ERROR:
+                logger.error("Worker %d falhou ao iniciar; encerrando o servidor.", pid)
+                self.exit_code = 1
+                self._stopping.set()
+            elif code != 0:
+                logger.warning("Worker %d terminou com código %d; substituindo.", pid, code)
+            else:
+                uptime = time.monotonic() - started_at if started_at is not None else 0.0
+                logger.info("Worker %d encerrado após %.0fs (reciclagem); substituindo.", pid, uptime)
+
+    def _handle_stop(self, signum: int, frame: Optional[FrameType]) -> None:
+        self._stopping.set()
+
+    def _handle_recycle(self, signum: int, frame: Optional[FrameType]) -> None:
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+        logger.info(
+            "Mestre %d: %d workers em %s:%d (loop=%s, http=%s).",
+            os.getpid(), self.workers, settings.SERVER_BIND_HOST, settings.SERVER_BIND_PORT, resolved_loop(), resolved_http(),
+        )
+        while not self._stopping.is_set():
+            self.reap()
+            for slot in self.free_slots():
+                if self._stopping.is_set():
+                    break
+                self.spawn(slot)
+            self._stopping.wait(self.reap_interval)
+        self.shutdown()
+        return self.exit_code
+
+    def shutdown(self) -> None:
+        """Drena os workers (SIGTERM) e força o encerramento dos que passarem do prazo."""
+        logger.info("Encerrando %d workers.", len(self.children))
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + 5
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            logger.warning("Worker %d não encerrou no prazo; enviando SIGKILL.", pid)
+            self._signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.children.pop(pid, None)
+            self.slots.pop(pid, None)
+        self.sock.close()
+
+
+def main() -> int:
+    logging.config.dictConfig(LOGGING_CONFIG)
+    if settings.SERVER_RELOAD:
+        uvicorn.run(APP_TARGET, host=settings.SERVER_BIND_HOST, port=settings.SERVER_BIND_PORT, reload=True)
+        return 0
+    workers = worker_count()
+    conflicts = multi_worker_conflicts() if workers > 1 else []
+    if conflicts:
+        logger.error("SERVER_WORKERS=%d recusado: %s.", workers, "; ".join(conflicts))
+        return 2
+    sock = bind_socket(settings.SERVER_BIND_HOST, settings.SERVER_BIND_PORT, settings.SERVER_BACKLOG)
+    application: Any = APP_TARGET
+    if settings.SERVER_PRELOAD:
+        from app.main import app as application
+    return Arbiter(application, sock, workers).run()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
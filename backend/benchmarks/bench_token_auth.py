@@ -0,0 +1,65 @@
+# benchmarks/bench_token_auth.py
+
+"""
+Benchmark: custo por request da autenticação por token (decodificação do access token).
+
+Compara o caminho antigo (verificação JOSE completa + TokenData do Pydantic a cada request)
+com o caminho atual de security.decode_token (cache de tokens verificados + checagem simples
+do 'sub'), reutilizando o mesmo token várias vezes, como faz um cliente real.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_token_auth --iterations 20000
+    ALGORITHM=RS256 JWT_KEYS_DIR=/caminho/das/chaves python -m benchmarks.bench_token_auth
+"""
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import argparse
+import time
+from typing import Callable
+
+from app.core.keys import key_ring
+from app.core.security import create_access_token, decode_token
+from app.core.token_cache import token_cache
+from app.schemas.token import TokenData
+
+# =======================================================================================================
+# --- Funções ---                                                                                   #####
+# =======================================================================================================
+
+def per_call_us(fn: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "bench@example.com"})
+
+    def before() -> object:
+        payload = key_ring.decode(token)
+        return TokenData(email=payload.get("sub"))
+
+    def after() -> object:
+        payload = decode_token(token)
+        assert payload is not None
+        return payload["sub"] if isinstance(payload.get("sub"), str) else None
+
+    token_cache.clear()
+    before_us = per_call_us(before, args.iterations)
+    after_us = per_call_us(after, args.iterations)
+    print(f"algoritmo: {key_ring.algorithm}, {args.iterations} iterações")
+    print(f"{'antes (µs/request)':>22} {'depois (µs/request)':>22} {'ganho':>8}")
+    print(f"{before_us:>22.2f} {after_us:>22.2f} {before_us / after_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
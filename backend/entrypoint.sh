@@ -16,5 +16,8 @@ alembic upgrade head
 # =======================================================================================================
 # --- Iniciar Servidor da Aplicação ---                                                             #####
 # =======================================================================================================
+# Processo mestre + SERVER_WORKERS workers (padrão: 1; 0 = CPUs disponíveis). Mais de um worker
+# só sobe sem estado por processo (multi_worker_conflicts em app/serve.py).
+# Para desenvolvimento com recarga de código, use SERVER_RELOAD=true.
 echo "Starting server..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+exec python -m app.serve
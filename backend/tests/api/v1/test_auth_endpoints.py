@@ -5,17 +5,20 @@
 # =======================================================================================================
 
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from fastapi.testclient import TestClient
 from jose import jwt
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
-from _pytest.capture import CaptureFixture
 
 from app.core.config import settings
 from app.schemas.user import UserCreate
 from app.crud import user as crud_user
-from app.core import security
+from app.core import principal_cache, rate_limit, security
+from app.core.hashing import PasswordHashPolicy, build_password_context
+from app.db.models.email_message import EmailMessage
+from app.db.models.outbox import OutboxEvent
 
 # =======================================================================================================
 # --- Testes para Endpoints de Autenticação ---                                                      #####
@@ -36,6 +39,14 @@ def test_health_check(client: TestClient) -> None:
     assert response.json() == {"status": "ok"}
 
 
+def test_read_jwks(client: TestClient) -> None:
+    """Testa o JWKS público: vazio com HS256 (a chave simétrica nunca é publicada) e cacheável."""
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+    assert "max-age" in response.headers["cache-control"]
+
+
 def test_register_new_user(client: TestClient, db_session: Session) -> None:
     """
     Testa o endpoint de registro de novo usuário (/api/v1/auth/register).
@@ -76,6 +87,35 @@ def test_register_new_user(client: TestClient, db_session: Session) -> None:
     assert "already exists" in error_data["detail"].lower()
 
 
+def test_register_is_a_single_insert_returning(client: TestClient, db_session: Session) -> None:
+    """
+    Testa que o registro não faz SELECT (INSERT ... RETURNING e o INSERT do evento no outbox,
+    sem consulta prévia do email nem refresh após o commit) e que um email já existente (400)
+    custa um único statement, sem evento.
+    """
+    user_data = {"email": "single_round_trip@example.com", "password": "aSecurePassword123"}
+    statements: list = []
+
+    def record_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement.lower())
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.post(f"{settings.API_V1_STR}/auth/register", json=user_data)
+        created_statements, statements[:] = list(statements), []
+        duplicate = client.post(f"{settings.API_V1_STR}/auth/register", json=user_data)
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    assert response.status_code == 201, response.text
+    assert response.json()["email"] == user_data["email"]
+    assert len(created_statements) == 2
+    assert created_statements[0].startswith("insert into") and "returning" in created_statements[0]
+    assert created_statements[1].startswith("insert into outbox_event")
+    assert duplicate.status_code == 400
+    assert len(statements) == 1
+
+
 def test_login_for_access_token(client: TestClient, db_session: Session) -> None:
     """
     Testa o endpoint de login (/api/v1/auth/login).
@@ -127,6 +167,131 @@ def test_login_for_access_token(client: TestClient, db_session: Session) -> None
         f"Status code for inactive user login should be 400. Response: {response_inactive.text}"
 
 
+def test_refresh_token_rotation_and_reuse_detection(client: TestClient, db_session: Session) -> None:
+    """
+    Testa o endpoint /auth/refresh:
+    - O login emite um refresh token, que não vale como access token.
+    - Cada refresh emite um novo par e invalida o refresh token anterior.
+    - Reapresentar um refresh token já rotacionado revoga a família (inclusive o token atual).
+    - Tokens malformados ou de outro tipo são rejeitados com 401.
+    """
+    user_email = "refresh_flow@example.com"
+    password = "refreshPassword123"
+    crud_user.create_user(db_session, UserCreate(email=user_email, password=password))
+    response = client.post(f"{settings.API_V1_STR}/auth/login", data={"username": user_email, "password": password})
+    assert response.status_code == 200, response.text
+    first_refresh = response.json()["refresh_token"]
+    assert first_refresh
+
+    response = client.get(f"{settings.API_V1_STR}/auth/me", headers={"Authorization": f"Bearer {first_refresh}"})
+    assert response.status_code == 401
+
+    response = client.post(f"{settings.API_V1_STR}/auth/refresh", json={"refresh_token": first_refresh})
+    assert response.status_code == 200, response.text
+    second_pair = response.json()
+    assert second_pair["refresh_token"] != first_refresh
+    response = client.get(
+        f"{settings.API_V1_STR}/auth/me", headers={"Authorization": f"Bearer {second_pair['access_token']}"}
+    )
+    assert response.status_code == 200 and response.json()["email"] == user_email
+
+    # Reutilização do token antigo: rejeitado e família revogada.
+    response = client.post(f"{settings.API_V1_STR}/auth/refresh", json={"refresh_token": first_refresh})
+    assert response.status_code == 401
+    response = client.post(f"{settings.API_V1_STR}/auth/refresh", json={"refresh_token": second_pair["refresh_token"]})
+    assert response.status_code == 401
+
+    reset_token = security.create_password_reset_token(user_email)
+    for bad_token in ("not-a-jwt", reset_token, second_pair["access_token"]):
+        response = client.post(f"{settings.API_V1_STR}/auth/refresh", json={"refresh_token": bad_token})
+        assert response.status_code == 401
+
+
+def test_password_change_revokes_refresh_tokens(client: TestClient, db_session: Session) -> None:
+    """
+    Testa que a troca de senha revoga os refresh tokens emitidos anteriormente.
+    """
+    user_email = "refresh_revoke@example.com"
+    old_password = "oldPassword123"
+    new_password = "newPassword456"
+    crud_user.create_user(db_session, UserCreate(email=user_email, password=old_password))
+    tokens = client.post(
+        f"{settings.API_V1_STR}/auth/login", data={"username": user_email, "password": old_password}
+    ).json()
+
+    response = client.put(
+        f"{settings.API_V1_STR}/auth/me/password",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        json={"current_password": old_password, "new_password": new_password, "new_password_confirm": new_password},
+    )
+    assert response.status_code == 204, response.text
+    response = client.post(f"{settings.API_V1_STR}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_login_rehashes_outdated_password_hash(client: TestClient, db_session: Session) -> None:
+    """
+    Testa o rehash transparente no login: um hash de outro esquema (scrypt) é aceito e,
+    após a verificação, regravado com a política configurada; o login seguinte não regrava.
+    O rehash não conta como alteração do usuário (versão, change_seq e outbox intactos).
+    """
+    user_email = "rehash_login@example.com"
+    password = "rehashPassword123"
+    old_hash = build_password_context(PasswordHashPolicy(scheme="scrypt", scrypt_rounds=10)).hash(password)
+    created = crud_user.create_user(
+        db_session, UserCreate(email=user_email, password=password), hashed_password=old_hash
+    )
+    version, change_seq = created.version, created.change_seq
+    events = len(db_session.scalars(select(OutboxEvent)).all())
+
+    login_data = {"username": user_email, "password": password}
+    response = client.post(f"{settings.API_V1_STR}/auth/login", data=login_data)
+    assert response.status_code == 200, response.text
+    db_user = crud_user.get_user_by_email(db_session, email=user_email)
+    assert db_user is not None
+    db_session.refresh(db_user)
+    new_hash = db_user.hashed_password
+    assert new_hash != old_hash
+    assert not security.pwd_context.needs_update(new_hash)
+    assert (db_user.version, db_user.change_seq) == (version, change_seq)
+    assert len(db_session.scalars(select(OutboxEvent)).all()) == events
+
+    assert client.post(f"{settings.API_V1_STR}/auth/login", data=login_data).status_code == 200
+    db_session.refresh(db_user)
+    assert db_user.hashed_password == new_hash
+
+
+def test_login_rate_limit_rejects_before_hashing(
+    client: TestClient, db_session: Session, monkeypatch: Any
+) -> None:
+    """
+    Testa o limitador de login: após o limite de falhas por email, o login responde 429
+    (com Retry-After) sem verificar a senha, inclusive para emails desconhecidos (que passam
+    por uma verificação contra um hash descartável); as rejeições são contabilizadas.
+    """
+    user_email = "rate_limited@example.com"
+    crud_user.create_user(db_session, UserCreate(email=user_email, password="password123"))
+    verifications = []
+    original_verify = security.pwd_context.verify
+    monkeypatch.setattr(
+        security.pwd_context, "verify", lambda *args: verifications.append(args) or original_verify(*args)
+    )
+    rejected_before = rate_limit.login_rate_limiter.stats()["rejected_email"]
+
+    for email in (user_email, "unknown_rate_limited@example.com"):
+        for _ in range(settings.LOGIN_RATE_LIMIT_EMAIL_FAILURES):
+            response = client.post(f"{settings.API_V1_STR}/auth/login", data={"username": email, "password": "wrong"})
+            assert response.status_code == 401
+        verified_so_far = len(verifications)
+        response = client.post(f"{settings.API_V1_STR}/auth/login", data={"username": email, "password": "password123"})
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert len(verifications) == verified_so_far
+
+    assert len(verifications) == 2 * settings.LOGIN_RATE_LIMIT_EMAIL_FAILURES
+    assert rate_limit.login_rate_limiter.stats()["rejected_email"] == rejected_before + 2
+
+
 def get_valid_token_headers(client: TestClient, db: Session, email: str, password: str) -> Dict[str, str]:
     """Gera e retorna cabeçalhos de autorização com um token válido."""
     login_data = {"username": email, "password": password}
@@ -137,6 +302,73 @@ def get_valid_token_headers(client: TestClient, db: Session, email: str, passwor
     return {"Authorization": f"Bearer {access_token}"}
 
 
+def test_login_returns_503_when_hashing_pool_saturated(
+    client: TestClient, db_session: Session, monkeypatch: Any
+) -> None:
+    """Testa que o login responde 503 (com Retry-After) quando o pool de hashing está saturado."""
+    user_email = "saturated_pool@example.com"
+    user_password = "password123"
+    crud_user.create_user(db_session, UserCreate(email=user_email, password=user_password))
+
+    monkeypatch.setattr(security.password_hashing_pool, "max_queue", -security.password_hashing_pool.max_workers)
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/login", data={"username": user_email, "password": user_password}
+    )
+    assert response.status_code == 503, response.text
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_auth_flow_with_async_session(async_mode_client: TestClient) -> None:
+    """
+    Testa o fluxo registro -> login -> /me -> troca de senha -> deleção servido pelo
+    stack assíncrono (AsyncSession), garantindo paridade com o caminho síncrono.
+    """
+    user_email = "async_flow@example.com"
+    password = "asyncPassword123"
+    response = async_mode_client.post(
+        f"{settings.API_V1_STR}/auth/register", json={"email": user_email, "password": password}
+    )
+    assert response.status_code == 201, response.text
+
+    response = async_mode_client.post(
+        f"{settings.API_V1_STR}/auth/login", data={"username": user_email, "password": password}
+    )
+    assert response.status_code == 200, response.text
+    # As consultas da AsyncSession (greenlet) também entram no Server-Timing do request.
+    assert 'desc="0 queries"' not in response.headers["Server-Timing"]
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = async_mode_client.post(
+        f"{settings.API_V1_STR}/auth/refresh", json={"refresh_token": response.json()["refresh_token"]}
+    )
+    assert response.status_code == 200, response.text
+
+    response = async_mode_client.patch(f"{settings.API_V1_STR}/auth/me", headers=headers, json={"full_name": "Async"})
+    assert response.status_code == 200, response.text
+    assert response.json()["full_name"] == "Async"
+    response = async_mode_client.patch(
+        f"{settings.API_V1_STR}/auth/me", headers={**headers, "If-Match": '"0.1"'}, json={"full_name": "Stale"}
+    )
+    assert response.status_code == 412
+
+    new_password = "asyncPassword456"
+    response = async_mode_client.put(
+        f"{settings.API_V1_STR}/auth/me/password",
+        headers=headers,
+        json={"current_password": password, "new_password": new_password, "new_password_confirm": new_password},
+    )
+    assert response.status_code == 204, response.text
+    response = async_mode_client.post(
+        f"{settings.API_V1_STR}/auth/login", data={"username": user_email, "password": new_password}
+    )
+    assert response.status_code == 200, response.text
+
+    response = async_mode_client.delete(f"{settings.API_V1_STR}/auth/me", headers=headers)
+    assert response.status_code == 204, response.text
+    response = async_mode_client.get(f"{settings.API_V1_STR}/auth/me", headers=headers)
+    assert response.status_code == 401
+
+
 def test_read_users_me(client: TestClient, db_session: Session) -> None:
     """
     Testa o endpoint /me para obter o usuário atual.
@@ -175,16 +407,58 @@ def test_read_users_me(client: TestClient, db_session: Session) -> None:
         f"Status code with invalid token should be 401. Response: {response_invalid_token.text}"
 
     # Cenário 4: Falha de acesso com token de usuário inativo
+    # (a desativação via CRUD invalida o principal em cache imediatamente)
     created_user_model = crud_user.get_user_by_email(db_session, email=user_email)
     assert created_user_model is not None
-    created_user_model.is_active = False
-    db_session.add(created_user_model)
-    db_session.commit()
+    crud_user.update_user(db_session, db_user=created_user_model, user_in={"is_active": False})
     response_inactive_user = client.get(f"{settings.API_V1_STR}/auth/me", headers=headers)
     assert response_inactive_user.status_code == 400, \
         f"Status code with token of inactive user should be 400. Response: {response_inactive_user.text}"
     
 
+def test_get_current_user_uses_principal_cache(client: TestClient, db_session: Session) -> None:
+    """
+    Testa que requests autenticados subsequentes não consultam o banco para obter o principal
+    e que a promoção a superusuário via CRUD invalida o cache imediatamente.
+    """
+    user_email = "principal_cache@example.com"
+    user_password = "cachePassword123"
+    crud_user.create_user(db_session, UserCreate(email=user_email, password=user_password))
+    headers = get_valid_token_headers(client, db_session, user_email, user_password)
+
+    assert client.get(f"{settings.API_V1_STR}/auth/me", headers=headers).status_code == 200
+
+    statements: list[str] = []
+    def count_statements(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", count_statements)
+    try:
+        response = client.get(f"{settings.API_V1_STR}/auth/me", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statements)
+    assert response.status_code == 200
+    assert statements == [], "Um principal em cache não deve gerar consultas"
+    cached = principal_cache.get_principal(user_email)
+    assert cached is not None and "hashed_password" not in cached
+
+    # Com o principal vindo do cache, o hash é lido sob demanda na troca de senha.
+    password_change = {
+        "current_password": user_password,
+        "new_password": "cachePassword456",
+        "new_password_confirm": "cachePassword456",
+    }
+    response = client.put(f"{settings.API_V1_STR}/auth/me/password", headers=headers, json=password_change)
+    assert response.status_code == 204, response.text
+
+    assert client.get(f"{settings.API_V1_STR}/auth/me/superuser", headers=headers).status_code == 403
+    db_user = crud_user.get_user_by_email(db_session, email=user_email)
+    assert db_user is not None
+    crud_user.update_user(db_session, db_user=db_user, user_in={"is_superuser": True})
+    assert client.get(f"{settings.API_V1_STR}/auth/me/superuser", headers=headers).status_code == 200
+
+
 def test_read_current_superuser_as_superuser(client: TestClient, db_session: Session) -> None:
     """
     Testa o acesso ao endpoint de superusuário por um superusuário ativo.
@@ -285,6 +559,7 @@ def test_token_data_validation_error_in_get_current_user(client: TestClient):
     """
     payload_invalid_email_format: Dict[str, Any] = {
         "sub": "plainstringnotaschemaemail",
+        "aud": settings.JWT_AUDIENCE,
         "exp": datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     }
     token = jwt.encode(payload_invalid_email_format, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -298,6 +573,7 @@ def test_get_current_user_with_invalid_sub_format(client: TestClient, db_session
     """Testa get_current_user com um 'sub' no token que não é um e-mail válido."""
     invalid_sub_payload: Dict[str, Any] = {
         "sub": "not-an-email",
+        "aud": settings.JWT_AUDIENCE,
         "exp": datetime.now(timezone.utc) + timedelta(minutes=15)
     }
     invalid_sub_token = jwt.encode(invalid_sub_payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -315,6 +591,7 @@ def test_get_current_user_with_token_missing_sub_claim(client: TestClient) -> No
     exp_time_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
     payload_missing_sub: Dict[str, Any] = {
         "user_id": 123, # Alguma outra claim
+        "aud": settings.JWT_AUDIENCE,
         "exp": datetime.now(timezone.utc) + timedelta(minutes=exp_time_minutes)
     }
     token_missing_sub = jwt.encode(payload_missing_sub, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -336,6 +613,7 @@ def test_get_current_user_with_valid_token_for_nonexistent_user(client: TestClie
     
     payload: Dict[str, Any] = {
         "sub": non_existent_email,
+        "aud": settings.JWT_AUDIENCE,
         "exp": datetime.now(timezone.utc) + timedelta(minutes=exp_time_minutes)
     }
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -367,6 +645,29 @@ def test_update_user_me_full_name(client: TestClient, db_session: Session) -> No
     assert updated_user_data["is_active"] is True 
 
 
+def test_update_user_me_if_match(client: TestClient, db_session: Session) -> None:
+    """Testa o PATCH /me com If-Match: o ETag do GET /me é aceito uma vez; reenviá-lo (defasado) dá 412."""
+    user_email = "ifmatchprofile@example.com"
+    user_password = "profilePassword123"
+    crud_user.create_user(db_session, UserCreate(email=user_email, password=user_password, full_name="Initial"))
+    headers = get_valid_token_headers(client, db_session, user_email, user_password)
+
+    etag = client.get(f"{settings.API_V1_STR}/auth/me", headers=headers).headers["ETag"]
+    response = client.patch(
+        f"{settings.API_V1_STR}/auth/me", headers={**headers, "If-Match": etag}, json={"full_name": "Changed"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != etag
+
+    stale = client.patch(
+        f"{settings.API_V1_STR}/auth/me", headers={**headers, "If-Match": etag}, json={"full_name": "Lost Update"}
+    )
+    assert stale.status_code == 412
+    me = client.get(f"{settings.API_V1_STR}/auth/me", headers=headers)
+    assert me.json()["full_name"] == "Changed"
+    assert me.headers["ETag"] == response.headers["ETag"]
+
+
 def test_update_user_me_email(client: TestClient, db_session: Session) -> None:
     """Testa a atualização do email do usuário autenticado."""
     user_email_initial = "updateemail_initial@example.com"
@@ -568,10 +869,13 @@ def test_delete_user_me_invalid_token(client: TestClient) -> None:
         "Attempting to delete /me with an invalid token should result in 401."
     
 
+def _queued_emails(db_session: Session, recipient: str) -> List[EmailMessage]:
+    return list(db_session.scalars(select(EmailMessage).where(EmailMessage.recipient == recipient)).all())
+
+
 def test_request_password_recovery_user_exists(
     client: TestClient,
     db_session: Session,
-    capsys: CaptureFixture[str] 
 ) -> None:
     """Testa a solicitação de recuperação de senha para um usuário existente."""
     user_email = "recovermyP4ssw0rd@example.com"
@@ -584,16 +888,17 @@ def test_request_password_recovery_user_exists(
     assert response.status_code == 200, response.text
     assert response.json() == {"message": "Se um usuário com este email existir, um link de recuperação foi enviado."}
     
-    captured = capsys.readouterr()
-    assert "SIMULAÇÃO DE ENVIO DE E-MAIL" in captured.out
-    assert f"Para: {user_email}" in captured.out
-    assert "Use o seguinte token para resetar sua senha" in captured.out
+    # O handler só enfileira: a mensagem renderizada fica pendente para o worker.
+    (queued,) = _queued_emails(db_session, user_email)
+    assert queued.status == "pending"
+    assert queued.subject == f"Recuperação de Senha - {settings.PROJECT_NAME}"
+    assert "Use o seguinte token para resetar sua senha" in queued.body
+    assert security.verify_password_reset_token(queued.body.split(": ", 1)[1].split()[0]) == user_email
 
 
 def test_request_password_recovery_user_does_not_exist(
     client: TestClient,
     db_session: Session,
-    capsys: CaptureFixture[str] 
 ) -> None:
     """
     Testa a solicitação de recuperação de senha para um e-mail não existente.
@@ -606,14 +911,12 @@ def test_request_password_recovery_user_does_not_exist(
     assert response.status_code == 200, response.text
     assert response.json() == {"message": "Se um usuário com este email existir, um link de recuperação foi enviado."}
     
-    captured = capsys.readouterr()
-    assert "SIMULAÇÃO DE ENVIO DE E-MAIL" not in captured.out 
+    assert _queued_emails(db_session, non_existent_email) == []
 
 
 def test_reset_user_password_success(
     client: TestClient,
     db_session: Session,
-    capsys: CaptureFixture[str] 
 ) -> None:
     """Testa o reset de senha bem-sucedido com um token válido."""
     user_email = "resetthispassword@example.com"
@@ -641,9 +944,8 @@ def test_reset_user_password_success(
     response_login_old = client.post(f"{settings.API_V1_STR}/auth/login", data=login_data_old_pass)
     assert response_login_old.status_code == 401, response_login_old.text
 
-    captured = capsys.readouterr()
-    assert "Sua senha foi alterada com sucesso." in captured.out
-    assert f"Para: {user_email}" in captured.out
+    (queued,) = _queued_emails(db_session, user_email)
+    assert "Sua senha foi alterada com sucesso." in queued.body
 
 
 def test_reset_user_password_invalid_token(client: TestClient, db_session: Session) -> None:
@@ -0,0 +1,35 @@
+# tests/api/v1/test_metrics_endpoints.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Dict
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+# =======================================================================================================
+# --- Testes para GET /api/v1/metrics/ ---                                                          #####
+# =======================================================================================================
+
+def test_read_metrics_as_superuser(
+    client: TestClient, superuser_token_headers: Dict[str, str], normal_user_token_headers: Dict[str, str]
+) -> None:
+    """
+    Testa que o endpoint de métricas expõe os contadores do cache de principal, dos pools
+    de conexão e das consultas (apenas superusuários).
+    """
+    response = client.get(f"{settings.API_V1_STR}/metrics/", headers=superuser_token_headers)
+    assert response.status_code == 200
+    cache_stats = response.json()["principal_cache"]
+    assert {"hits", "misses", "size", "maxsize", "evictions"} <= cache_stats.keys()
+    assert cache_stats["misses"] >= 1
+    pool_metrics = response.json()["db_pool"]
+    assert {"sync", "async"} <= pool_metrics.keys()
+    assert {"checked_out", "overflow", "checkouts", "checkout_wait_seconds"} <= pool_metrics["sync"].keys()
+    assert {"queries", "slow_queries", "total_ms", "slowest_ms"} <= response.json()["db_queries"].keys()
+    assert 'desc="' in response.headers["Server-Timing"]
+
+    response = client.get(f"{settings.API_V1_STR}/metrics/", headers=normal_user_token_headers)
+    assert response.status_code == 403
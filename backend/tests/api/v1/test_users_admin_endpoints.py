@@ -4,8 +4,9 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
-from typing import Dict
+from typing import Any, Dict, List
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -71,6 +72,158 @@ def test_read_users_pagination_as_superuser(
     assert len(response_skip_too_much.json()) == 0
 
 
+def test_read_users_cursor_pagination_as_superuser(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa a paginação por cursor (keyset): percorrer as páginas via X-Next-Cursor retorna
+    todos os usuários exatamente uma vez, na ordem pedida, e a última página não traz cursor.
+    """
+    for _ in range(7):
+        create_random_user(db_session)
+    expected_emails = sorted(u.email for u in crud_user.get_users(db_session, limit=1000))
+
+    seen_emails = []
+    params: Dict[str, str] = {"limit": "3", "order_by": "email"}
+    while True:
+        response = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers, params=params)
+        assert response.status_code == 200
+        seen_emails.extend(user["email"] for user in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params["cursor"] = next_cursor
+
+    assert seen_emails == expected_emails
+
+
+def test_read_users_invalid_cursor_as_superuser(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa a rejeição (400) de cursores inválidos, de cursores de outra ordenação
+    e do uso simultâneo de `skip` e `cursor`.
+    """
+    create_random_user(db_session)
+    url = f"{settings.API_V1_STR}/users/"
+
+    response = client.get(url, headers=superuser_token_headers, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    response = client.get(url, headers=superuser_token_headers, params={"limit": 1})
+    id_cursor = response.headers["X-Next-Cursor"]
+    response = client.get(url, headers=superuser_token_headers, params={"cursor": id_cursor, "order_by": "email"})
+    assert response.status_code == 400
+
+    response = client.get(url, headers=superuser_token_headers, params={"cursor": id_cursor, "skip": 1})
+    assert response.status_code == 400
+    assert "não ambos" in response.json()["detail"]
+
+
+def test_read_users_search_filters_and_sort_as_superuser(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa os filtros de busca (flags, prefixo de e-mail, trecho do nome) e a paginação por
+    cursor em ordem descendente de full_name, com nomes nulos no início.
+    """
+    url = f"{settings.API_V1_STR}/users/"
+    specs = [
+        ("search.ana@example.com", "Ana Maria", True, False),
+        ("search.bia@example.com", "Beatriz Mariano", False, False),
+        ("SEARCH.caio@example.com", None, True, True),
+        ("search.dan@example.com", None, True, False),
+        ("other.eva@example.com", "Eva Maria", True, False),
+    ]
+    for email, full_name, is_active, is_superuser in specs:
+        crud_user.create_user_by_admin(
+            db_session,
+            UserCreate(email=email, password="pw", full_name=full_name, is_active=is_active, is_superuser=is_superuser),
+            hashed_password="x",
+        )
+
+    def emails(params: Dict[str, str]) -> list:
+        response = client.get(url, headers=superuser_token_headers, params=params)
+        assert response.status_code == 200, response.text
+        return [user["email"] for user in response.json()]
+
+    assert emails({"email_prefix": "Search."}) == [
+        "search.ana@example.com", "search.bia@example.com", "SEARCH.caio@example.com", "search.dan@example.com"
+    ]
+    assert emails({"email_prefix": "search.", "is_active": "false"}) == ["search.bia@example.com"]
+    assert emails({"email_prefix": "search.", "is_superuser": "true"}) == ["SEARCH.caio@example.com"]
+    assert emails({"full_name": "mari", "order_by": "full_name"}) == [
+        "search.ana@example.com", "search.bia@example.com", "other.eva@example.com"
+    ]
+    assert emails({"email_prefix": "search_"}) == []
+
+    seen_emails = []
+    params: Dict[str, str] = {"email_prefix": "search.", "order_by": "full_name", "order": "desc", "limit": "1"}
+    while True:
+        response = client.get(url, headers=superuser_token_headers, params=params)
+        assert response.status_code == 200, response.text
+        seen_emails.extend(user["email"] for user in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params["cursor"] = next_cursor
+    assert seen_emails == [
+        "search.dan@example.com", "SEARCH.caio@example.com", "search.bia@example.com", "search.ana@example.com"
+    ]
+
+    response = client.get(
+        url, headers=superuser_token_headers, params={"order_by": "full_name", "cursor": params["cursor"]}
+    )
+    assert response.status_code == 400
+
+
+def test_read_users_total_count_as_superuser(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa o header X-Total-Count: ausente por padrão, respeita os filtros, é servido do cache
+    entre páginas e atualizado após uma criação. No SQLite o modo estimado recorre ao exato.
+    """
+    url = f"{settings.API_V1_STR}/users/"
+    for _ in range(3):
+        create_random_user(db_session, is_active=False)
+    expected_total = len(crud_user.get_users(db_session, limit=1000))
+
+    response = client.get(url, headers=superuser_token_headers, params={"limit": 1})
+    assert "X-Total-Count" not in response.headers
+
+    response = client.get(url, headers=superuser_token_headers, params={"limit": 1, "count": "exact"})
+    assert response.headers["X-Total-Count"] == str(expected_total)
+    response = client.get(
+        url, headers=superuser_token_headers, params={"limit": 1, "count": "estimated", "is_active": "false"}
+    )
+    assert response.headers["X-Total-Count"] == "3"
+
+    statements: List[str] = []
+
+    def record_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.get(
+            url,
+            headers=superuser_token_headers,
+            params={"limit": 1, "count": "estimated", "is_active": "false", "cursor": response.headers["X-Next-Cursor"]},
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    assert response.headers["X-Total-Count"] == "3"
+    assert not any("count(" in statement.lower() for statement in statements), "O total deve vir do cache"
+
+    create_random_user(db_session, is_active=False)
+    response = client.get(
+        url, headers=superuser_token_headers, params={"limit": 1, "count": "exact", "is_active": "false"}
+    )
+    assert response.headers["X-Total-Count"] == "4"
+
+
 def test_read_users_as_normal_user_forbidden(
     client: TestClient, normal_user_token_headers: Dict[str, str], db_session: Session
 ) -> None:
@@ -110,6 +263,52 @@ def test_read_user_by_id_as_superuser(
     assert "hashed_password" not in found_user_data
 
 
+def test_read_user_by_id_etag_and_response_cache(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa o GET por ID com ETag:
+    - A resposta traz um ETag forte derivado da versão da linha.
+    - If-None-Match com o ETag atual responde 304 sem corpo.
+    - Leituras repetidas vêm do cache (nenhum SELECT na tabela de usuários).
+    - Uma atualização pelo CRUD incrementa a versão e descarta a resposta em cache.
+    """
+    user: UserModel = create_random_user(db_session)
+    url = f"{settings.API_V1_STR}/users/{user.id}"
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag == f'"{user.id}.1"'
+
+    statements: List[str] = []
+
+    def record_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        cached_response = client.get(url, headers=superuser_token_headers)
+        not_modified = client.get(url, headers={**superuser_token_headers, "If-None-Match": f'"other", W/{etag}'})
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    assert cached_response.json() == response.json()
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert not any("from user" in statement.lower().replace('"', "") for statement in statements)
+
+    crud_user.update_user(db_session, db_user=user, user_in={"full_name": "Versioned Name"})
+    assert user.version == 2
+    response = client.get(url, headers={**superuser_token_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Versioned Name"
+    assert response.headers["ETag"] == f'"{user.id}.2"'
+
+    crud_user.delete_user(db_session, db_user=user)
+    assert client.get(url, headers=superuser_token_headers).status_code == 404
+
+
 def test_read_user_by_id_not_found_as_superuser(
     client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
 ) -> None:
@@ -196,6 +395,37 @@ def test_create_user_by_admin_existing_email_as_superuser(
     assert "já existe" in response.json()["detail"]
 
 
+def test_create_user_by_admin_is_a_single_insert_returning(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa que a criação por admin não faz SELECT: INSERT ... RETURNING do usuário e o INSERT
+    do evento no outbox, sem consulta prévia do email nem refresh após o commit (o admin
+    autenticado vem do cache de principal).
+    """
+    client.get(f"{settings.API_V1_STR}/auth/me", headers=superuser_token_headers)
+    statements: List[str] = []
+
+    def record_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement.lower())
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.post(
+            f"{settings.API_V1_STR}/users/",
+            headers=superuser_token_headers,
+            json={"email": random_email(), "password": random_lower_string(), "is_superuser": True},
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    assert response.status_code == 201, response.text
+    assert response.json()["is_superuser"] is True
+    assert len(statements) == 2
+    assert statements[0].startswith("insert into") and "returning" in statements[0]
+    assert statements[1].startswith("insert into outbox_event")
+
+
 def test_create_user_by_admin_as_normal_user_forbidden(
     client: TestClient, normal_user_token_headers: Dict[str, str], db_session: Session
 ) -> None:
@@ -286,6 +516,51 @@ def test_update_user_by_admin_not_found_as_superuser(
     assert response.status_code == 404
 
 
+def test_update_user_by_admin_if_match_optimistic_concurrency(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa a concorrência otimista do PUT com If-Match:
+    - Com o ETag atual, a atualização é um único UPDATE ... RETURNING (sem SELECT prévio) e
+      a resposta traz o novo ETag.
+    - Com um ETag defasado, responde 412 e a linha não é alterada.
+    """
+    user: UserModel = create_random_user(db_session)
+    url = f"{settings.API_V1_STR}/users/{user.id}"
+    etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+
+    statements: List[str] = []
+
+    def record_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement.lower().replace('"', ""))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.put(url, headers={**superuser_token_headers, "If-Match": etag}, json={"full_name": "First"})
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    assert response.status_code == 200, response.text
+    assert response.json()["full_name"] == "First"
+    assert response.headers["ETag"] == f'"{user.id}.2"'
+    user_statements = [statement for statement in statements if " user" in statement]
+    assert len(user_statements) == 1
+    assert user_statements[0].startswith("update user") and "returning" in user_statements[0]
+
+    stale = client.put(url, headers={**superuser_token_headers, "If-Match": etag}, json={"full_name": "Second"})
+    assert stale.status_code == 412
+    weak = client.put(url, headers={**superuser_token_headers, "If-Match": f"W/{response.headers['ETag']}"}, json={"full_name": "Second"})
+    assert weak.status_code == 412
+    current = client.get(url, headers=superuser_token_headers)
+    assert current.json()["full_name"] == "First"
+    assert current.headers["ETag"] == response.headers["ETag"]
+
+    missing = client.put(
+        f"{settings.API_V1_STR}/users/999999", headers={**superuser_token_headers, "If-Match": etag}, json={"full_name": "X"}
+    )
+    assert missing.status_code == 404
+
+
 def test_update_user_by_admin_as_normal_user_forbidden(
     client: TestClient, normal_user_token_headers: Dict[str, str], db_session: Session
 ) -> None:
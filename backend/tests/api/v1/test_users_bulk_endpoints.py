@@ -0,0 +1,148 @@
+# tests/api/v1/test_users_bulk_endpoints.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import json
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.config import settings
+from app.crud import user as crud_user
+from tests.utils.user import create_random_user, random_email, random_lower_string
+
+# =======================================================================================================
+# --- Testes para POST /api/v1/users/bulk ---                                                       #####
+# =======================================================================================================
+
+def test_bulk_create_users_json_reports_row_errors(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session, monkeypatch: Any
+) -> None:
+    """
+    Testa a importação via lista JSON em vários lotes: linhas válidas são criadas e as
+    inválidas (e-mail inválido, duplicado na entrada ou já cadastrado) são reportadas por índice.
+    """
+    monkeypatch.setattr(settings, "USER_BULK_IMPORT_BATCH_SIZE", 2)
+    existing_user = create_random_user(db_session)
+    new_email = random_email()
+    payload = [
+        {"email": new_email, "password": "password1", "full_name": "Bulk One"},
+        {"email": "not-an-email", "password": "password2"},
+        {"email": existing_user.email, "password": "password3"},
+        {"email": new_email, "password": "password4"},
+        {"email": random_email(), "password": "password5", "is_superuser": True},
+    ]
+
+    response = client.post(f"{settings.API_V1_STR}/users/bulk", headers=superuser_token_headers, json=payload)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 2
+    assert result["failed"] == 3
+    assert [user["index"] for user in result["users"]] == [0, 4]
+    assert [error["index"] for error in result["errors"]] == [1, 2, 3]
+    assert "já existe" in result["errors"][1]["detail"]
+    assert "duplicado" in result["errors"][2]["detail"]
+
+    created = crud_user.get_user(db_session, user_id=result["users"][0]["id"])
+    assert created is not None and created.email == new_email and created.full_name == "Bulk One"
+    assert security.verify_password("password1", created.hashed_password)
+    superuser = crud_user.get_user(db_session, user_id=result["users"][1]["id"])
+    assert superuser is not None and superuser.is_superuser is True
+
+
+def test_bulk_create_users_ndjson_and_csv(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session
+) -> None:
+    """
+    Testa a importação em streaming via NDJSON e CSV (com cabeçalho), incluindo linhas malformadas.
+    """
+    ndjson_email = random_email()
+    ndjson_body = "\n".join([
+        json.dumps({"email": ndjson_email, "password": random_lower_string(10)}),
+        "{not json",
+        "",
+    ])
+    response = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers={**superuser_token_headers, "Content-Type": "application/x-ndjson"},
+        content=ndjson_body,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 1
+    assert response.json()["errors"] == [{"index": 1, "email": None, "detail": "Linha NDJSON inválida."}]
+    assert crud_user.get_user_by_email(db_session, email=ndjson_email) is not None
+
+    csv_email = random_email()
+    csv_body = f"email,password,full_name,is_active\r\n{csv_email},secret123,CSV User,false\r\nonly-one-column\r\n"
+    response = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers={**superuser_token_headers, "Content-Type": "text/csv; charset=utf-8"},
+        content=csv_body,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 1
+    assert response.json()["errors"][0]["index"] == 1
+    csv_user = crud_user.get_user_by_email(db_session, email=csv_email)
+    assert csv_user is not None and csv_user.full_name == "CSV User" and csv_user.is_active is False
+
+
+def test_bulk_create_users_rejects_unsupported_content_type_and_normal_user(
+    client: TestClient, superuser_token_headers: Dict[str, str], normal_user_token_headers: Dict[str, str]
+) -> None:
+    """
+    Testa 415 para Content-Type não suportado e 403 para usuários não superusuários.
+    """
+    response = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers={**superuser_token_headers, "Content-Type": "application/xml"},
+        content="<users/>",
+    )
+    assert response.status_code == 415
+
+    response = client.post(f"{settings.API_V1_STR}/users/bulk", headers=normal_user_token_headers, json=[])
+    assert response.status_code == 403
+
+# =======================================================================================================
+# --- Testes para GET /api/v1/users/export ---                                                      #####
+# =======================================================================================================
+
+def test_export_users_ndjson_and_csv(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session, monkeypatch: Any
+) -> None:
+    """
+    Testa a exportação em streaming (lotes pequenos) nos formatos NDJSON e CSV: todos os
+    usuários, ordenados por id, sem o hash de senha.
+    """
+    monkeypatch.setattr(settings, "USER_EXPORT_BATCH_SIZE", 2)
+    for _ in range(3):
+        create_random_user(db_session)
+    expected_emails = [user.email for user in crud_user.get_users(db_session, limit=1000)]
+
+    response = client.get(f"{settings.API_V1_STR}/users/export", headers=superuser_token_headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="users.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["email"] for row in rows] == expected_emails
+    assert set(rows[0]) == {"id", "email", "full_name", "is_active", "is_superuser"}
+
+    response = client.get(
+        f"{settings.API_V1_STR}/users/export", headers=superuser_token_headers, params={"format": "csv"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,email,full_name,is_active,is_superuser"
+    assert [line.split(",")[1] for line in lines[1:]] == expected_emails
+
+
+def test_export_users_requires_superuser(client: TestClient, normal_user_token_headers: Dict[str, str]) -> None:
+    """
+    Testa que a exportação é negada (403) para usuários comuns.
+    """
+    response = client.get(f"{settings.API_V1_STR}/users/export", headers=normal_user_token_headers)
+    assert response.status_code == 403
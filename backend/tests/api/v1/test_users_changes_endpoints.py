@@ -0,0 +1,78 @@
+# tests/api/v1/test_users_changes_endpoints.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import user as crud_user
+from tests.utils.user import create_random_user
+
+# =======================================================================================================
+# --- Testes para GET /api/v1/users/changes ---                                                     #####
+# =======================================================================================================
+
+def test_user_changes_delta_sync(
+    client: TestClient, superuser_token_headers: Dict[str, str], db_session: Session, monkeypatch: Any
+) -> None:
+    """
+    Testa o delta sync: a primeira chamada traz todos os usuários (em páginas, com has_more);
+    a partir do watermark, só os usuários alterados depois dele e os ids removidos.
+    """
+    monkeypatch.setattr(settings, "USER_CHANGES_LAG_SECONDS", 0.0)
+    url = f"{settings.API_V1_STR}/users/changes"
+    users = [create_random_user(db_session) for _ in range(3)]
+    total = len(crud_user.get_users(db_session, limit=1000))
+
+    synced, since, has_more = [], None, True
+    while has_more:
+        params: Dict[str, Any] = {"limit": 2, **({"since": since} if since else {})}
+        response = client.get(url, headers=superuser_token_headers, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        synced.extend(user["id"] for user in page["users"])
+        since, has_more = page["since"], page["has_more"]
+    assert len(synced) == len(set(synced)) == total
+
+    crud_user.update_user(db_session, users[0], {"full_name": "Sincronizado"})
+    crud_user.delete_user(db_session, users[1])
+    response = client.get(url, headers=superuser_token_headers, params={"since": since})
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [(user["id"], user["full_name"]) for user in page["users"]] == [(users[0].id, "Sincronizado")]
+    assert page["deleted"] == [users[1].id]
+    assert page["has_more"] is False
+
+    response = client.get(url, headers=superuser_token_headers, params={"since": page["since"]})
+    assert response.json() == {"users": [], "deleted": [], "since": page["since"], "has_more": False}
+
+
+def test_user_changes_holds_back_recent_writes_and_rejects_bad_tokens(
+    client: TestClient, superuser_token_headers: Dict[str, str], normal_user_token_headers: Dict[str, str],
+    db_session: Session, monkeypatch: Any,
+) -> None:
+    """
+    Testa que mudanças mais recentes que USER_CHANGES_LAG_SECONDS não avançam o watermark,
+    que um token inválido resulta em 400 e que usuários comuns recebem 403.
+    """
+    url = f"{settings.API_V1_STR}/users/changes"
+    monkeypatch.setattr(settings, "USER_CHANGES_LAG_SECONDS", 0.0)
+    since = client.get(url, headers=superuser_token_headers, params={"limit": 1000}).json()["since"]
+    create_random_user(db_session)
+
+    monkeypatch.setattr(settings, "USER_CHANGES_LAG_SECONDS", 60.0)
+    page = client.get(url, headers=superuser_token_headers, params={"since": since}).json()
+    assert page["users"] == [] and page["since"] == since
+
+    monkeypatch.setattr(settings, "USER_CHANGES_LAG_SECONDS", 0.0)
+    assert len(client.get(url, headers=superuser_token_headers, params={"since": since}).json()["users"]) == 1
+
+    for token in ("not-a-token", "eyJzIjotMX0", "eyJpIjowLCJwIjpbMV0sInMiOjB9"):
+        response = client.get(url, headers=superuser_token_headers, params={"since": token})
+        assert response.status_code == 400
+    assert client.get(url, headers=normal_user_token_headers).status_code == 403
@@ -4,19 +4,31 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
+import os
 import pytest
-from typing import Generator, Dict
+from typing import AsyncGenerator, Generator, Dict
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
+# Os testes exercitam o worker de emails e o expurgo explicitamente (run_once); a aplicação
+# não os inicia.
+os.environ.setdefault("EMAIL_WORKER_ENABLED", "false")
+os.environ.setdefault("USER_PURGE_ENABLED", "false")
+
 from app.main import app
 from app.api.deps import get_db
 from app.db.base_class import Base
 from app.core.config import settings
 from app.schemas.user import UserCreate, EmailStr 
 from app.crud import user as crud_user
+from app.core.count_cache import user_count_cache
+from app.core.principal_cache import principal_cache
+from app.core import rate_limit
+from app.core.cache import cache
+from app.db.session import to_async_url
 
 from tests.utils.user import authentication_token_from_email, random_email, random_lower_string
 
@@ -50,11 +62,36 @@ def db_session() -> Generator[Session, None, None]:
     connection = engine_test.connect()
     transaction = connection.begin()
     session = TestingSessionLocal(bind=connection)
+    # O rollback do teste não passa pelo CRUD, então o cache de contagem é limpo aqui.
+    user_count_cache.clear()
     yield session
     session.close()
     transaction.rollback()
     connection.close()
 
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+@pytest.fixture(scope="function")
+async def async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Fixture de escopo de função que fornece uma AsyncSession (aiosqlite em memória),
+    com as tabelas criadas em um motor assíncrono dedicado ao teste.
+    """
+    async_engine_test = create_async_engine(
+        to_async_url("sqlite:///:memory:"),
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with async_engine_test.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=async_engine_test, autoflush=False, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+    await async_engine_test.dispose()
+    user_count_cache.clear()
+
 @pytest.fixture(scope="function")
 def client(db_session: Session) -> Generator[TestClient, None, None]:
     """
@@ -67,8 +104,46 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    principal_cache.clear()
+    rate_limit.login_rate_limiter.store.clear()  # type: ignore[attr-defined]
+    cache.backend.clear()  # type: ignore[attr-defined]
+    with TestClient(app) as c:
+        yield c
+    del app.dependency_overrides[get_db]
+
+
+@pytest.fixture(scope="function")
+def async_mode_client() -> Generator[TestClient, None, None]:
+    """
+    Fixture que fornece um TestClient servindo os endpoints pelo stack assíncrono:
+    a dependência de sessão é sobrescrita por uma AsyncSession (aiosqlite em memória).
+    As tabelas são criadas no primeiro request, já dentro do event loop do TestClient.
+    """
+    async_engine_test = create_async_engine(
+        to_async_url("sqlite:///:memory:"),
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    session_factory = async_sessionmaker(bind=async_engine_test, autoflush=False, expire_on_commit=False)
+    tables_created = False
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        nonlocal tables_created
+        if not tables_created:
+            async with async_engine_test.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            tables_created = True
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    principal_cache.clear()
+    user_count_cache.clear()
+    rate_limit.login_rate_limiter.store.clear()  # type: ignore[attr-defined]
+    cache.backend.clear()  # type: ignore[attr-defined]
     with TestClient(app) as c:
         yield c
+        c.portal.call(async_engine_test.dispose)
     del app.dependency_overrides[get_db]
 
 
@@ -0,0 +1,225 @@
+# tests/core/test_cache.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncGenerator, List, Optional
+
+import anyio.to_thread
+import pytest
+
+from app.core.cache import (
+    Cache,
+    CacheBackend,
+    CacheReplyError,
+    InProcessCacheBackend,
+    RespCacheBackend,
+    run_sync,
+)
+from tests.utils.resp_server import FakeRespServer
+
+pytestmark = pytest.mark.anyio
+
+# =======================================================================================================
+# --- Fixtures ---                                                                                  #####
+# =======================================================================================================
+
+@pytest.fixture
+async def resp_server() -> AsyncGenerator[FakeRespServer, None]:
+    server = await FakeRespServer(password="s3cret").start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(params=["memory", "resp"])
+async def backend(request: pytest.FixtureRequest, resp_server: FakeRespServer) -> AsyncGenerator[CacheBackend, None]:
+    if request.param == "memory":
+        yield InProcessCacheBackend(maxsize=100)
+    else:
+        resp_backend = RespCacheBackend(resp_server.url, pool_size=2)
+        yield resp_backend
+        await resp_backend.close()
+
+# =======================================================================================================
+# --- Testes ---                                                                                    #####
+# =======================================================================================================
+
+async def test_backend_get_set_delete_ttl_and_only_if_absent(backend: CacheBackend) -> None:
+    """Testa a interface comum dos backends (em memória e RESP): get/set/delete, TTL e NX."""
+    assert await backend.get("k") is None
+    assert await backend.set("k", b"v1")
+    assert await backend.get("k") == b"v1"
+    assert not await backend.set("k", b"v2", only_if_absent=True)
+    assert await backend.get("k") == b"v1"
+
+    await backend.set("short", b"x", ttl=0.05)
+    await asyncio.sleep(0.1)
+    assert await backend.get("short") is None
+
+    await backend.delete("k", "missing")
+    assert await backend.get("k") is None
+
+
+async def test_cache_serializes_and_invalidates_namespaces(backend: CacheBackend) -> None:
+    """
+    Testa a fachada: valores são serializados com msgpack (inclusive datetimes com fuso) e
+    invalidar um namespace descarta só as chaves dele.
+    """
+    cache = Cache(backend, prefix="test")
+    updated_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    await cache.set("users", "1", {"id": 1, "email": "a@example.com", "updated_at": updated_at})
+    await cache.set("counts", "all", 10)
+
+    assert await cache.get("users", "1") == {"id": 1, "email": "a@example.com", "updated_at": updated_at}
+    await cache.invalidate("users")
+    assert await cache.get("users", "1") is None
+    assert await cache.get("counts", "all") == 10
+
+    await cache.set("users", "1", None)
+    assert await cache.get("users", "1", default="missing") is None
+    await cache.delete("users", "1")
+    assert await cache.get("users", "1", default="missing") == "missing"
+
+
+async def test_get_or_load_does_not_store_over_a_newer_delete(backend: CacheBackend) -> None:
+    """
+    Testa as gerações por chave: um loader que leu o valor antigo e termina depois de delete()
+    não volta a servir esse valor; a próxima leitura carrega de novo.
+    """
+    cache = Cache(backend, prefix="test")
+    loaded = asyncio.Event()
+    release = asyncio.Event()
+
+    async def stale_loader() -> str:
+        loaded.set()
+        await release.wait()
+        return "old"
+
+    load = asyncio.create_task(cache.get_or_load("users", "1", stale_loader))
+    await loaded.wait()
+    await cache.delete("users", "1")  # escrita confirmada enquanto o loader estava em andamento
+    release.set()
+    assert await load == "old"
+
+    async def fresh_loader() -> str:
+        return "new"
+
+    assert await cache.get_or_load("users", "1", fresh_loader) == "new"
+    assert await cache.get("users", "1") == "new"
+
+
+async def test_get_or_load_single_flight() -> None:
+    """
+    Testa a proteção contra stampede: chamadas concorrentes para a mesma chave executam um
+    único loader; um loader que falha propaga o erro a todos e nada é armazenado.
+    """
+    cache = Cache(InProcessCacheBackend(maxsize=100))
+    calls: List[str] = []
+
+    async def loader() -> dict:
+        calls.append("load")
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(cache.get_or_load("ns", "key", loader) for _ in range(10)))
+    assert results == [{"value": 42}] * 10
+    assert calls == ["load"]
+    assert await cache.get_or_load("ns", "key", loader) == {"value": 42}
+    assert calls == ["load"]
+    assert cache.stats()["coalesced"] == 9
+
+    async def failing_loader() -> int:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    outcomes = await asyncio.gather(
+        *(cache.get_or_load("ns", "bad", failing_loader) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert await cache.get("ns", "bad") is None
+
+
+async def test_resp_backend_auth_errors_and_unavailable_server(resp_server: FakeRespServer) -> None:
+    """
+    Testa o backend RESP: autenticação, reuso de conexões do pool, erros do servidor e a
+    degradação da fachada (servidor fora do ar vira miss, sem exceção).
+    """
+    backend = RespCacheBackend(resp_server.url, pool_size=2)
+    for index in range(5):
+        await backend.set(f"k{index}", b"v")
+    assert resp_server.connections == 1
+    with pytest.raises(CacheReplyError):
+        await backend.execute("NOPE")
+    assert await backend.get("k0") == b"v"
+    await backend.close()
+
+    wrong_password = RespCacheBackend(resp_server.url.replace("s3cret", "wrong"))
+    with pytest.raises(CacheReplyError):
+        await wrong_password.get("k0")
+
+    url = resp_server.url
+    await resp_server.stop()
+    cache = Cache(RespCacheBackend(url, timeout=0.2))
+
+    async def loader() -> str:
+        return "fresh"
+
+    assert await cache.get("ns", "key") is None
+    assert await cache.get_or_load("ns", "key", loader) == "fresh"
+    await cache.set("ns", "key", "value")
+    await cache.invalidate("ns")
+    assert cache.stats()["errors"] >= 4
+
+
+async def test_run_sync_from_worker_thread_and_event_loop() -> None:
+    """
+    Testa a ponte para o CRUD síncrono: de uma thread de worker a operação roda no event loop
+    da aplicação; da própria thread do event loop, run_sync é recusada.
+    """
+    cache = Cache(InProcessCacheBackend(maxsize=10))
+    await anyio.to_thread.run_sync(lambda: run_sync(cache.set, "ns", "key", "from-thread"))
+    assert await cache.get("ns", "key") == "from-thread"
+    with pytest.raises(RuntimeError):
+        run_sync(cache.get, "ns", "key")
+
+
+def test_run_sync_without_event_loop() -> None:
+    """Testa run_sync fora de qualquer event loop (scripts, testes síncronos)."""
+    cache = Cache(InProcessCacheBackend(maxsize=10))
+    run_sync(cache.set, "ns", "key", 1)
+    assert run_sync(cache.get, "ns", "key") == 1
+
+
+async def test_resp_backend_closes_connections_when_the_loop_changes(resp_server: FakeRespServer) -> None:
+    """
+    Testa que trocar de event loop não vaza conexões: run_sync fora de um loop fecha as
+    conexões do seu loop próprio ao terminar, e as ociosas do loop da aplicação são fechadas
+    quando o backend passa a ser usado em outro loop.
+    """
+    cache = Cache(RespCacheBackend(resp_server.url, pool_size=2))
+    for _ in range(3):
+        # Thread fora do anyio: run_sync cai no loop próprio (asyncio.run).
+        await asyncio.to_thread(run_sync, cache.set, "ns", "key", 1)
+    assert resp_server.connections == 3
+    assert resp_server.open_connections == 0
+
+    assert await cache.get("ns", "key") == 1
+    assert resp_server.open_connections == 1
+    assert await asyncio.to_thread(run_sync, cache.get, "ns", "key") == 1
+    await asyncio.sleep(0.05)
+    assert resp_server.open_connections == 0
+    await cache.close()
+
+
+def test_cache_backend_interface_is_abstract() -> None:
+    """Testa que um backend sem todos os métodos da interface falha já na instanciação."""
+
+    class IncompleteBackend(CacheBackend):
+        async def get(self, key: str) -> Optional[bytes]:
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()  # type: ignore[abstract]
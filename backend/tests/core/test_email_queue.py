@@ -0,0 +1,195 @@
+# tests/core/test_email_queue.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import logging
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import Generator, Sequence
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.email_queue import EmailWorker
+from app.core.email_templates import compiled_template, render_email
+from app.core.mailer import DeliveryResults, EmailTransport, LoggingTransport, SMTPConnectionPool, SMTPTransport
+from app.crud.email import ClaimedEmail, enqueue_email, prune_email_messages
+from app.db.models.email_message import EMAIL_FAILED, EMAIL_PENDING, EMAIL_SENT, EmailMessage
+from tests.utils.smtp_server import FakeSMTPServer
+
+# =======================================================================================================
+# --- Fixtures ---                                                                                  #####
+# =======================================================================================================
+
+@pytest.fixture
+def smtp_server() -> Generator[FakeSMTPServer, None, None]:
+    server = FakeSMTPServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def worker(db_session: Session, smtp_server: FakeSMTPServer) -> Generator[EmailWorker, None, None]:
+    pool = SMTPConnectionPool(
+        host="127.0.0.1", port=smtp_server.port, use_tls=False, username=None, password=None, timeout=5.0, size=1
+    )
+    worker = EmailWorker(
+        session_factory=lambda: nullcontext(db_session),
+        transport=SMTPTransport(pool, "CRUD <no-reply@example.com>"),
+        threads=1,
+        batch_size=10,
+        poll_interval=0.05,
+        max_attempts=3,
+        backoff_seconds=30.0,
+        backoff_max_seconds=60.0,
+        lease_seconds=300.0,
+        retention_seconds=3600.0,
+    )
+    yield worker
+    worker.stop()
+
+# =======================================================================================================
+# --- Testes para Fila de Emails ---                                                                #####
+# =======================================================================================================
+
+def test_render_email_uses_compiled_template_cache() -> None:
+    """
+    Testa a renderização (com project_name sempre disponível) e que o template é compilado
+    uma única vez por nome.
+    """
+    compiled_template.cache_clear()
+    message = render_email("password_recovery", token="tok", reset_link="http://x/reset?token=tok")
+    assert "tok" in message.body and "http://x/reset?token=tok" in message.body
+    assert message.subject.startswith("Recuperação de Senha - ")
+    render_email("password_recovery", token="other", reset_link="http://x")
+    assert compiled_template.cache_info().misses == 1
+    with pytest.raises(KeyError):
+        render_email("password_recovery", token="missing link")
+
+
+def test_worker_sends_batch_over_one_pooled_connection(
+    db_session: Session, worker: EmailWorker, smtp_server: FakeSMTPServer
+) -> None:
+    """
+    Testa que o lote é enviado por uma única conexão SMTP, reaproveitada no lote seguinte,
+    e que as mensagens ficam marcadas como enviadas.
+    """
+    ids = [enqueue_email(db_session, f"user{i}@example.com", f"Assunto {i}", f"Corpo {i}") for i in range(3)]
+    assert worker.run_once() == 3
+    assert worker.run_once() == 0
+    enqueue_email(db_session, "late@example.com", "Depois", "Corpo")
+    assert worker.run_once() == 1
+
+    assert [message.recipients for message in smtp_server.messages] == [
+        ["user0@example.com"], ["user1@example.com"], ["user2@example.com"], ["late@example.com"]
+    ]
+    assert "Subject: Assunto 0" in smtp_server.messages[0].data
+    assert smtp_server.connections == 1
+    assert smtp_server.commands.count("EHLO") == 1
+    rows = db_session.scalars(select(EmailMessage).where(EmailMessage.id.in_(ids))).all()
+    assert {row.status for row in rows} == {EMAIL_SENT}
+    assert {row.body for row in rows} == {""}  # o corpo não fica guardado após o envio
+    assert worker.stats()["sent"] == 4
+    assert worker.stats()["transport"] == {"idle": 1, "connects": 1, "reuses": 1}
+
+
+def test_worker_retries_with_backoff_and_gives_up(
+    db_session: Session, worker: EmailWorker, smtp_server: FakeSMTPServer
+) -> None:
+    """
+    Testa o tratamento de falhas: 4xx reagenda com backoff exponencial (sem afetar as demais
+    mensagens do lote), 5xx falha de imediato e as tentativas esgotadas encerram a mensagem.
+    """
+    temporary = enqueue_email(db_session, "temporary@example.com", "A", "A")
+    permanent = enqueue_email(db_session, "permanent@example.com", "B", "B")
+    delivered = enqueue_email(db_session, "ok@example.com", "C", "C")
+    smtp_server.replies = ["451 try again later", "550 mailbox unavailable"]
+
+    before = datetime.now(timezone.utc)
+    assert worker.run_once() == 3
+    rows = {row.id: row for row in db_session.scalars(select(EmailMessage)).all()}
+    assert rows[delivered].status == EMAIL_SENT
+    assert rows[permanent].status == EMAIL_FAILED and "550" in (rows[permanent].last_error or "")
+    assert rows[permanent].body == ""
+    assert rows[temporary].status == EMAIL_PENDING and rows[temporary].attempts == 1
+    assert rows[temporary].body == "A"  # ainda pendente: o corpo é necessário para reenviar
+    retry_in = (rows[temporary].next_attempt_at.replace(tzinfo=timezone.utc) - before).total_seconds()
+    assert 29 <= retry_in <= 31
+    assert worker.run_once() == 0  # ainda não venceu
+    assert [worker.retry_delay(attempt) for attempt in (1, 2, 3)] == [30.0, 60.0, 60.0]
+
+    for attempt in (2, 3):
+        db_session.get(EmailMessage, temporary).next_attempt_at = before  # type: ignore[union-attr]
+        db_session.commit()
+        smtp_server.replies = ["421 service not available"]
+        assert worker.run_once() == 1
+    db_session.expire_all()
+    row = db_session.get(EmailMessage, temporary)
+    assert row is not None and row.status == EMAIL_FAILED and row.attempts == 3
+    assert worker.stats()["retried"] == 2 and worker.stats()["failed"] == 2
+
+
+def test_worker_threads_deliver_after_notify(
+    db_session: Session, worker: EmailWorker, smtp_server: FakeSMTPServer
+) -> None:
+    """Testa o ciclo das threads: notify() acorda o worker, que envia sem esperar o polling."""
+    worker.poll_interval = 30.0
+    worker.start()
+    enqueue_email(db_session, "threaded@example.com", "Assunto", "Corpo")
+    worker.notify()
+    for _ in range(200):
+        if smtp_server.messages:
+            break
+        time.sleep(0.01)
+    assert [message.recipients for message in smtp_server.messages] == [["threaded@example.com"]]
+
+
+def test_prune_removes_only_finished_messages_past_retention(db_session: Session, worker: EmailWorker) -> None:
+    """
+    Testa a retenção: mensagens enviadas ou com falha mais antigas que a retenção são removidas;
+    as recentes e as pendentes (mesmo antigas) ficam.
+    """
+    old, recent, pending = (
+        enqueue_email(db_session, f"{name}@example.com", name, name) for name in ("old", "recent", "pending")
+    )
+    assert worker.run_once() == 3
+    rows = {row.id: row for row in db_session.scalars(select(EmailMessage)).all()}
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=2)
+    rows[old].created_at = long_ago
+    rows[pending].created_at = long_ago
+    rows[pending].status = EMAIL_PENDING
+    db_session.commit()
+
+    assert worker.prune() == 1
+    assert {row.id for row in db_session.scalars(select(EmailMessage)).all()} == {recent, pending}
+    assert prune_email_messages(db_session, retention_seconds=0.0) == 1
+    assert worker.stats()["pruned"] == 1
+
+
+def test_logging_transport_keeps_body_out_of_info_logs(caplog: pytest.LogCaptureFixture) -> None:
+    """Testa que o transporte de desenvolvimento não registra o corpo (com tokens) no nível INFO."""
+    email = ClaimedEmail(1, "dev@example.com", "Recuperação", "token: segredo", 1)
+    with caplog.at_level(logging.INFO, logger="app.core.mailer"):
+        assert LoggingTransport().send_batch([email]) == [None]
+    assert "Recuperação" in caplog.text
+    assert "segredo" not in caplog.text
+
+
+def test_email_transport_interface_is_abstract() -> None:
+    """Testa que um transporte sem send_batch falha já na instanciação."""
+
+    class IncompleteTransport(EmailTransport):
+        def close(self) -> None:
+            pass
+
+    class BatchTransport(EmailTransport):
+        def send_batch(self, emails: Sequence[ClaimedEmail]) -> DeliveryResults:
+            return [None] * len(emails)
+
+    with pytest.raises(TypeError):
+        IncompleteTransport()  # type: ignore[abstract]
+    assert BatchTransport().send_batch([]) == []
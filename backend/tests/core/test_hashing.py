@@ -0,0 +1,70 @@
+# tests/core/test_hashing.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import pytest
+
+from app.core import hashing
+from app.core.hashing import (
+    PasswordHashPolicy,
+    build_password_context,
+    calibrate,
+    policy_env_lines,
+)
+from app.core.security import verify_password_and_update
+
+# =======================================================================================================
+# --- Testes ---                                                                                    #####
+# =======================================================================================================
+
+def test_password_context_flags_other_schemes_and_costs_for_update() -> None:
+    """
+    Testa a política: hashes de outro esquema ou com custo diferente do configurado são
+    verificados normalmente, mas marcados como desatualizados.
+    """
+    context = build_password_context(PasswordHashPolicy(scheme="scrypt", scrypt_rounds=10))
+    current = context.hash("secret")
+    assert current.startswith("$scrypt$ln=10,")
+    assert context.verify("secret", current) and not context.needs_update(current)
+
+    bcrypt_hash = build_password_context(PasswordHashPolicy(bcrypt_rounds=4)).hash("secret")
+    cheaper_scrypt = build_password_context(PasswordHashPolicy(scheme="scrypt", scrypt_rounds=9)).hash("secret")
+    for outdated in (bcrypt_hash, cheaper_scrypt):
+        assert context.verify("secret", outdated)
+        assert context.needs_update(outdated)
+
+
+def test_verify_password_and_update() -> None:
+    """Testa que só uma verificação bem-sucedida de um hash desatualizado gera o novo hash."""
+    outdated = build_password_context(PasswordHashPolicy(bcrypt_rounds=4)).hash("secret")
+    assert verify_password_and_update("wrong", outdated) == (False, None)
+    verified, new_hash = verify_password_and_update("secret", outdated)
+    assert verified and new_hash is not None and new_hash.startswith("$2b$12$")
+    assert verify_password_and_update("secret", new_hash) == (True, None)
+
+
+def test_calibrate_picks_most_expensive_cost_within_target_and_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Testa a calibração com um tempo de verificação simulado (dobra a cada nível de custo):
+    escolhe o maior custo dentro do alvo e, no scrypt, respeita o orçamento de memória.
+    """
+    def fake_measure(policy: PasswordHashPolicy, repeat: int = 3) -> float:
+        if policy.scheme == "bcrypt":
+            return 2.0 ** (policy.bcrypt_rounds - 4)
+        if policy.scheme == "scrypt":
+            return 2.0 ** (policy.scrypt_rounds - 10)
+        return policy.argon2_time_cost * policy.memory_kib / 1024
+
+    monkeypatch.setattr(hashing, "measure_verify_ms", fake_measure)
+
+    assert calibrate("bcrypt", target_ms=100, memory_kib=65536).bcrypt_rounds == 10
+    assert calibrate("bcrypt", target_ms=0.1, memory_kib=65536).bcrypt_rounds == 4
+    assert calibrate("scrypt", target_ms=1000, memory_kib=65536).scrypt_rounds == 16  # 128 * 8 * 2**16 = 64 MiB
+    assert calibrate("scrypt", target_ms=4, memory_kib=65536).scrypt_rounds == 12
+    argon2 = calibrate("argon2id", target_ms=200, memory_kib=65536)
+    assert (argon2.memory_kib, argon2.argon2_time_cost) == (65536, 3)
+    argon2 = calibrate("argon2id", target_ms=50, memory_kib=65536)  # time_cost=1 com 64 MiB já passa do alvo
+    assert (argon2.memory_kib, argon2.argon2_time_cost) == (32768, 1)
+    assert "PASSWORD_HASH_MEMORY_KIB=32768" in policy_env_lines(argon2)
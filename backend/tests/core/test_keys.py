@@ -0,0 +1,90 @@
+# tests/core/test_keys.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from pathlib import Path
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from jose import JWTError, jwt
+
+from app.core.keys import KeyRingError, build_key_ring, generate_private_key_pem
+
+# =======================================================================================================
+# --- Helpers ---                                                                                   #####
+# =======================================================================================================
+
+def write_key(directory: Path, kid: str, algorithm: str = "RS256") -> None:
+    (directory / f"{kid}.pem").write_bytes(generate_private_key_pem(algorithm))
+
+# =======================================================================================================
+# --- Testes para o Chaveiro de JWT ---                                                             #####
+# =======================================================================================================
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256"])
+def test_asymmetric_key_ring_signs_with_kid_and_publishes_jwks(tmp_path: Path, algorithm: str) -> None:
+    """
+    Testa assinatura/verificação assimétrica: o header traz o `kid` ativo, o JWKS publica
+    apenas a parte pública e um terceiro valida o token só com o JWKS.
+    """
+    write_key(tmp_path, "k1", algorithm)
+    ring = build_key_ring(algorithm, "unused", str(tmp_path))
+
+    token = ring.sign({"sub": "user@example.com"})
+    assert jwt.get_unverified_header(token)["kid"] == "k1"
+    assert ring.decode(token)["sub"] == "user@example.com"
+
+    jwks = ring.jwks()
+    assert [key["kid"] for key in jwks["keys"]] == ["k1"]
+    assert "d" not in jwks["keys"][0] and jwks["keys"][0]["alg"] == algorithm
+    assert jwt.decode(token, jwks["keys"][0], algorithms=[algorithm])["sub"] == "user@example.com"
+
+
+def test_key_rotation_keeps_old_tokens_valid_until_key_is_removed(tmp_path: Path) -> None:
+    """
+    Testa a rotação: com a nova chave ativa, tokens da chave antiga (agora só pública) continuam
+    válidos; removida a chave antiga, eles passam a ser rejeitados.
+    """
+    write_key(tmp_path, "old")
+    old_ring = build_key_ring("RS256", "unused", str(tmp_path))
+    old_token = old_ring.sign({"sub": "user@example.com"})
+
+    old_private = serialization.load_pem_private_key((tmp_path / "old.pem").read_bytes(), password=None)
+    (tmp_path / "old.pub.pem").write_bytes(
+        old_private.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    (tmp_path / "old.pem").unlink()
+    write_key(tmp_path, "new")
+    rotated_ring = build_key_ring("RS256", "unused", str(tmp_path), active_kid="new")
+    assert rotated_ring.kids == ["new", "old"]
+    assert rotated_ring.decode(old_token)["sub"] == "user@example.com"
+    assert jwt.get_unverified_header(rotated_ring.sign({"sub": "x"}))["kid"] == "new"
+
+    (tmp_path / "old.pub.pem").unlink()
+    with pytest.raises(JWTError):
+        build_key_ring("RS256", "unused", str(tmp_path)).decode(old_token)
+
+
+def test_key_ring_configuration_errors_and_hs256(tmp_path: Path) -> None:
+    """
+    Testa os erros de configuração e o modo HS256 (JWKS vazio, tokens legados sem `kid`).
+    """
+    with pytest.raises(KeyRingError):
+        build_key_ring("RS256", "unused", None)
+    write_key(tmp_path, "a")
+    write_key(tmp_path, "b")
+    with pytest.raises(KeyRingError):
+        build_key_ring("RS256", "unused", str(tmp_path))
+    with pytest.raises(KeyRingError):
+        build_key_ring("RS256", "unused", str(tmp_path), active_kid="missing")
+
+    ring = build_key_ring("HS256", "secret")
+    assert ring.jwks() == {"keys": []}
+    legacy_token = jwt.encode({"sub": "user@example.com"}, "secret", algorithm="HS256")
+    assert ring.decode(legacy_token)["sub"] == "user@example.com"
+    with pytest.raises(JWTError):
+        ring.decode(jwt.encode({"sub": "x"}, "other-secret", algorithm="HS256"))
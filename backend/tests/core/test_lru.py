@@ -0,0 +1,40 @@
+# tests/core/test_lru.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from app.core.lru import TTLLRUCache
+
+# =======================================================================================================
+# --- Testes ---                                                                                    #####
+# =======================================================================================================
+
+def test_ttl_lru_cache_expiration_and_eviction() -> None:
+    """
+    Testa o cache LRU com TTL:
+    - Entradas expiram após o TTL (padrão ou específico da entrada).
+    - A entrada menos recentemente usada é despejada ao exceder maxsize.
+    - Os contadores de hits/misses/evictions são atualizados.
+    """
+    now = [0.0]
+    cache: TTLLRUCache[str, int] = TTLLRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=1)
+    assert cache.get("a") == 1
+    now[0] = 1.0
+    assert cache.get("b") is None, "Entrada com TTL específico deve expirar"
+
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None, "Entrada menos recentemente usada deve ser despejada"
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+
+    cache.pop("c")
+    assert len(cache) == 0
+    assert cache.stats() == {"size": 0, "maxsize": 2, "hits": 4, "misses": 3, "evictions": 1}
@@ -0,0 +1,204 @@
+# tests/core/test_outbox.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import json
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Generator, List, Optional, Sequence, Tuple
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.outbox import FileSink, OutboxRelay, OutboxSink, QueueSink, WebhookSink
+from app.crud import user as crud_user
+from app.crud.outbox import OutboxRecord, prune_outbox_events
+from app.db.models.outbox import OutboxCursor, OutboxEvent
+from app.schemas.user import UserCreate, UserUpdate
+from tests.utils.webhook_server import FakeWebhookServer
+
+# =======================================================================================================
+# --- Fixtures e Helpers ---                                                                        #####
+# =======================================================================================================
+
+class FlakySink(OutboxSink):
+    """Sink que falha enquanto `failing` for verdadeiro e guarda os offsets entregues."""
+
+    def __init__(self, name: str = "flaky") -> None:
+        self.name = name
+        self.failing = True
+        self.offsets: List[int] = []
+
+    def publish(self, records: Sequence[OutboxRecord]) -> None:
+        if self.failing:
+            raise ConnectionError("sink indisponível")
+        self.offsets.extend(record.offset for record in records)
+
+
+@pytest.fixture
+def webhook_server() -> Generator[FakeWebhookServer, None, None]:
+    server = FakeWebhookServer().start()
+    yield server
+    server.stop()
+
+
+def _relay(db_session: Session, sinks: Sequence[OutboxSink], gap_timeout: float = 5.0) -> OutboxRelay:
+    return OutboxRelay(
+        session_factory=lambda: nullcontext(db_session),
+        sinks=sinks,
+        batch_size=100,
+        poll_interval=0.05,
+        gap_timeout=gap_timeout,
+        retention_seconds=0.0,
+    )
+
+
+def _events(db_session: Session) -> List[OutboxEvent]:
+    return list(db_session.scalars(select(OutboxEvent).order_by(OutboxEvent.id)).all())
+
+
+def _record(offset: int, age_seconds: float) -> OutboxRecord:
+    created_at = datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+    return OutboxRecord(offset, "user", str(offset), "user.updated", {}, created_at)
+
+# =======================================================================================================
+# --- Testes para Outbox Transacional ---                                                           #####
+# =======================================================================================================
+
+def test_user_writes_append_outbox_events(db_session: Session) -> None:
+    """
+    Testa que criação, atualização e deleção gravam o evento correspondente (na ordem das
+    escritas) e que uma escrita rejeitada (email duplicado) não deixa evento.
+    """
+    user_in = UserCreate(email="outbox_events@example.com", password="outboxPassword123", full_name="Outbox")
+    user = crud_user.create_user(db_session, user_in)
+    crud_user.update_user(db_session, user, UserUpdate(full_name="Outbox Atualizado"))
+    with pytest.raises(crud_user.EmailAlreadyRegistered):
+        crud_user.create_user(db_session, user_in)
+    crud_user.delete_user(db_session, user)
+
+    events = _events(db_session)
+    assert [event.event_type for event in events] == ["user.created", "user.updated", "user.deleted"]
+    assert {event.key for event in events} == {str(user.id)}
+    assert events[0].payload["email"] == "outbox_events@example.com"
+    assert "hashed_password" not in events[0].payload
+    assert events[1].payload["full_name"] == "Outbox Atualizado"
+    assert events[1].payload["version"] == events[0].payload["version"] + 1
+    assert events[2].payload == {"id": user.id, "email": "outbox_events@example.com"}
+
+
+def test_relay_keeps_per_sink_offsets_and_redelivers_after_failure(db_session: Session, tmp_path: Path) -> None:
+    """
+    Testa que cada sink tem seu cursor: o sink que falhou não avança e recebe o mesmo lote,
+    em ordem, no ciclo seguinte; os demais não recebem eventos repetidos. Eventos só são
+    removidos depois de entregues a todos os sinks.
+    """
+    for index in range(3):
+        crud_user.create_user(db_session, UserCreate(email=f"relay{index}@example.com", password="relayPassword123"))
+    offsets = [event.id for event in _events(db_session)]
+    queue_sink, file_sink, flaky_sink = QueueSink(), FileSink(str(tmp_path / "outbox.ndjson")), FlakySink()
+    relay = _relay(db_session, [queue_sink, file_sink, flaky_sink])
+
+    assert relay.run_once() == 3
+    assert relay.stats()["failures"] == 1
+    assert prune_outbox_events(db_session, ["queue", "file", "flaky"], retention_seconds=0.0) == 0
+    cursors = {cursor.sink: cursor.last_offset for cursor in db_session.scalars(select(OutboxCursor))}
+    assert cursors == {"queue": offsets[-1], "file": offsets[-1], "flaky": 0}
+
+    flaky_sink.failing = False
+    assert relay.run_once() == 3
+    assert flaky_sink.offsets == offsets
+    assert [queue_sink.events.get_nowait()["offset"] for _ in offsets] == offsets
+    assert queue_sink.events.empty()
+    lines = (tmp_path / "outbox.ndjson").read_text().splitlines()
+    assert [json.loads(line)["offset"] for line in lines] == offsets
+
+    # O último offset entregue é mantido (ver prune_outbox_events).
+    assert relay.prune() == 2
+    assert [event.id for event in _events(db_session)] == offsets[-1:]
+    assert relay.run_once() == 0
+
+
+def test_relay_waits_for_recent_gaps() -> None:
+    """
+    Testa que o relay publica só o prefixo contíguo quando falta um offset recente (transação
+    ainda aberta) e que, passado o gap_timeout, a lacuna é tratada como definitiva.
+    """
+    relay = OutboxRelay(nullcontext, [], batch_size=10, poll_interval=1.0, gap_timeout=5.0, retention_seconds=0.0)
+    recent = [_record(1, 0), _record(2, 0), _record(4, 0), _record(5, 0)]
+    assert [record.offset for record in relay.deliverable(recent, 0)] == [1, 2]
+    assert relay.deliverable(recent, 2) == []
+
+    old = [_record(1, 60), _record(2, 60), _record(4, 60), _record(5, 0)]
+    assert [record.offset for record in relay.deliverable(old, 0)] == [1, 2, 4, 5]
+    assert [record.offset for record in relay.deliverable([_record(40, 60)], 0)] == [40]
+
+
+def test_relay_logs_gaps_skipped_after_timeout(caplog: pytest.LogCaptureFixture) -> None:
+    """Testa que uma lacuna descartada por prazo é registrada em ERROR com os offsets e contabilizada."""
+    relay = OutboxRelay(nullcontext, [], batch_size=10, poll_interval=1.0, gap_timeout=5.0, retention_seconds=0.0)
+    with caplog.at_level(logging.ERROR, logger="app.core.outbox"):
+        relay.deliverable([_record(1, 60), _record(4, 60)], 0)
+    assert any("2-3" in record.getMessage() for record in caplog.records if record.levelno == logging.ERROR)
+    assert relay.stats()["gaps_timed_out"] == 1
+
+
+def test_relay_settles_gaps_by_transaction_horizon(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Testa o fechamento de lacunas pelo snapshot (PostgreSQL): o relay guarda o xmax um ciclo
+    depois de ver a lacuna e só a descarta quando o xmin passa dele, antes do gap_timeout.
+    """
+    horizon: List[Optional[Tuple[int, int]]] = [(100, 105)]
+    monkeypatch.setattr("app.core.outbox.transaction_horizon", lambda db: horizon[0])
+    relay = OutboxRelay(nullcontext, [], batch_size=10, poll_interval=1.0, gap_timeout=600.0, retention_seconds=0.0)
+    sink = QueueSink()
+    records = [_record(1, 0), _record(3, 0)]
+
+    assert relay.settled_gap(None, sink, records, 0) is None  # type: ignore[arg-type]  # primeira vez
+    horizon[0] = (101, 110)
+    assert relay.settled_gap(None, sink, records, 0) is None  # type: ignore[arg-type]  # guarda xmax=110
+    horizon[0] = (109, 112)
+    assert relay.settled_gap(None, sink, records, 0) is None  # type: ignore[arg-type]  # ainda aberta
+    horizon[0] = (110, 112)
+    settled = relay.settled_gap(None, sink, records, 0)  # type: ignore[arg-type]
+    assert settled == 2
+    assert [record.offset for record in relay.deliverable(records, 0, settled)] == [1, 3]
+    assert relay.stats()["gaps_settled"] == 1
+
+    horizon[0] = None  # sem snapshot (SQLite): só o prazo vale
+    assert relay.settled_gap(None, sink, records, 0) is None  # type: ignore[arg-type]
+
+
+def test_outbox_sink_interface_is_abstract() -> None:
+    """Testa que um sink sem publish falha já na instanciação."""
+
+    class IncompleteSink(OutboxSink):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        IncompleteSink()  # type: ignore[abstract]
+
+
+def test_webhook_sink_posts_batches_and_retries_on_error(
+    db_session: Session, webhook_server: FakeWebhookServer
+) -> None:
+    """
+    Testa que o webhook recebe o lote em um único POST e que uma resposta 5xx mantém o cursor
+    (o lote é reenviado no ciclo seguinte).
+    """
+    user = crud_user.create_user(db_session, UserCreate(email="webhook@example.com", password="webhookPassword123"))
+    crud_user.update_user(db_session, user, UserUpdate(is_active=False))
+    webhook_server.statuses.append(503)
+    relay = _relay(db_session, [WebhookSink(webhook_server.url, timeout=5.0)])
+
+    assert relay.run_once() == 0
+    assert webhook_server.received == []
+    assert relay.run_once() == 2
+    [batch] = webhook_server.received
+    assert [event["type"] for event in batch["events"]] == ["user.created", "user.updated"]
+    assert batch["events"][1]["payload"]["is_active"] is False
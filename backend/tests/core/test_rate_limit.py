@@ -0,0 +1,185 @@
+# tests/core/test_rate_limit.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import asyncio
+from typing import AsyncGenerator, List, Optional
+
+import pytest
+
+from app.core.cache import RespCacheBackend
+from app.core.rate_limit import (
+    InMemoryRateLimitStore,
+    LoginRateLimited,
+    LoginRateLimiter,
+    RateLimitStore,
+    RespRateLimitStore,
+    SlidingWindow,
+)
+from tests.utils.resp_server import FakeRespServer
+
+pytestmark = pytest.mark.anyio
+
+# =======================================================================================================
+# --- Fixtures ---                                                                                  #####
+# =======================================================================================================
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+async def resp_server() -> AsyncGenerator[FakeRespServer, None]:
+    server = await FakeRespServer().start()
+    yield server
+    await server.stop()
+
+# =======================================================================================================
+# --- Testes ---                                                                                    #####
+# =======================================================================================================
+
+async def test_in_memory_store_counts_expire_and_are_bounded() -> None:
+    """Testa incr/get_many/delete do store em memória, a expiração e o despejo LRU."""
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(maxsize=2, clock=clock)
+    assert await store.incr("a", ttl=10) == 1
+    assert await store.incr("a", ttl=10) == 2
+    assert await store.get_many(["a", "missing"]) == [2, 0]
+    assert await store.incr("a", ttl=10, amount=-1) == 1
+
+    clock.now += 10
+    assert await store.get_many(["a"]) == [0]
+    assert await store.incr("a", ttl=10) == 1
+
+    await store.incr("b", ttl=10)
+    await store.incr("c", ttl=10)
+    assert await store.get_many(["a", "b", "c"]) == [0, 1, 1]
+    await store.delete("b")
+    assert await store.get_many(["b"]) == [0]
+
+
+async def test_resp_store_shares_counters_through_the_cache_server(resp_server: FakeRespServer) -> None:
+    """
+    Testa o store no servidor RESP: contadores com expiração (INCRBY + PEXPIRE no mesmo
+    pipeline) vistos por dois stores distintos, como em dois workers.
+    """
+    first = RespRateLimitStore(RespCacheBackend(resp_server.url), prefix="test:ratelimit")
+    second = RespRateLimitStore(RespCacheBackend(resp_server.url), prefix="test:ratelimit")
+    try:
+        assert await first.incr("a", ttl=10) == 1
+        assert await second.incr("a", ttl=10) == 2
+        assert await second.incr("a", ttl=10, amount=-1) == 1
+        assert await first.get_many(["a", "missing"]) == [1, 0]
+
+        await first.incr("short", ttl=0.05)
+        await asyncio.sleep(0.1)
+        assert await second.get_many(["short"]) == [0]
+
+        await second.delete("a")
+        assert await first.get_many(["a"]) == [0]
+    finally:
+        await first.backend.close()
+        await second.backend.close()
+
+
+async def test_rate_limit_store_interface_is_abstract() -> None:
+    """Testa que um store sem todos os métodos da interface falha já na instanciação."""
+
+    class IncompleteStore(RateLimitStore):
+        async def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+            return 0
+
+    with pytest.raises(TypeError):
+        IncompleteStore()  # type: ignore[abstract]
+
+
+async def test_sliding_window_weights_previous_window() -> None:
+    """
+    Testa a janela deslizante: a janela anterior conta proporcionalmente ao quanto dela ainda
+    está na janela deslizante, e retry_after indica quando a chave volta a ficar abaixo do limite.
+    """
+    clock = FakeClock(now=1_000.0)  # início exato de uma janela de 10s
+    window = SlidingWindow(InMemoryRateLimitStore(clock=clock), "t", limit=4, window_seconds=10, clock=clock)
+    for _ in range(4):
+        assert await window.retry_after("k") is None
+        await window.hit("k")
+    # 4 na janela atual: o fim dela + (1 - 4/4) da próxima.
+    assert await window.retry_after("k") == pytest.approx(10)
+
+    clock.now += 12.5  # próxima janela, 25% decorrido: 4 * 0.75 = 3 < 4
+    assert await window.retry_after("k") is None
+    await window.hit("k")
+    await window.hit("k")  # 4 * 0.75 + 2 = 5; volta abaixo de 4 quando 4 * (1 - e) + 2 < 4, isto é, e > 0.5
+    assert await window.retry_after("k") == pytest.approx(2.5)
+    clock.now += 2.6
+    assert await window.retry_after("k") is None
+
+    await window.reset("k")
+    assert await window.retry_after("k") is None
+
+
+async def test_login_rate_limiter_per_ip_and_per_email() -> None:
+    """
+    Testa o limitador de login: todas as tentativas contam para o IP e para o email, um
+    sucesso zera o email e cada rejeição é contabilizada nas métricas (uma tentativa rejeitada
+    pelo email não consome o limite do IP).
+    """
+    clock = FakeClock()
+    limiter = LoginRateLimiter(
+        InMemoryRateLimitStore(clock=clock), ip_limit=3, ip_window_seconds=60,
+        email_limit=2, email_window_seconds=60, clock=clock,
+    )
+    await limiter.check("10.0.0.1", "Victim@example.com")
+    await limiter.check("10.0.0.2", "VICTIM@example.com")
+    with pytest.raises(LoginRateLimited) as exc_info:
+        await limiter.check("10.0.0.1", "victim@example.com")
+    assert exc_info.value.retry_after >= 1
+
+    await limiter.check("10.0.0.1", "other@example.com")
+    await limiter.record_success("victim@example.com")
+    await limiter.check("10.0.0.1", "victim@example.com")
+    with pytest.raises(LoginRateLimited):
+        await limiter.check("10.0.0.1", "third@example.com")
+    stats = limiter.stats()
+    assert (stats["rejected_ip"], stats["rejected_email"], stats["errors"]) == (1, 1, 0)
+
+    disabled = LoginRateLimiter(InMemoryRateLimitStore(), 0, 60, 0, 60, enabled=False)
+    await disabled.check("10.0.0.1", "victim@example.com")
+
+
+async def test_login_rate_limiter_reserves_concurrent_attempts() -> None:
+    """
+    Testa que check() reserva a tentativa antes do hashing: tentativas concorrentes contra o
+    mesmo email, de IPs distintos, não passam juntas do limite enquanto nenhuma terminou.
+    """
+    limiter = LoginRateLimiter(
+        InMemoryRateLimitStore(), ip_limit=100, ip_window_seconds=60, email_limit=3, email_window_seconds=60
+    )
+
+    async def attempt(index: int) -> Optional[int]:
+        try:
+            await limiter.check(f"10.0.1.{index}", "victim@example.com")
+        except LoginRateLimited:
+            return None
+        await asyncio.sleep(0.01)  # hashing em andamento
+        return index
+
+    results: List[Optional[int]] = await asyncio.gather(*(attempt(index) for index in range(20)))
+    assert sum(result is not None for result in results) == 3
+    assert limiter.stats()["rejected_email"] == 17
+
+
+async def test_login_rate_limiter_fails_open_when_store_is_down(resp_server: FakeRespServer) -> None:
+    """Testa que o login não é bloqueado quando o servidor do store está fora (erro contabilizado)."""
+    backend = RespCacheBackend(resp_server.url, timeout=0.2)
+    await resp_server.stop()
+    limiter = LoginRateLimiter(RespRateLimitStore(backend, "test"), 1, 60, 1, 60)
+    await limiter.check("10.0.0.1", "victim@example.com")
+    await limiter.record_success("victim@example.com")
+    assert limiter.stats()["errors"] == 2
@@ -4,13 +4,25 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
+import asyncio
+import threading
+
+import pytest
+
 from app.core.security import (
+    PasswordHashingPool,
+    PasswordHashingPoolSaturated,
     create_access_token,
+    create_password_reset_token,
     create_refresh_token,
+    decode_access_token,
+    decode_refresh_token,
     decode_token,
     get_password_hash,
+    get_password_hash_async,
     get_subject_from_token,
     verify_password,
+    verify_password_async,
 )
 from jose import jwt
 from app.core.config import settings
@@ -35,6 +47,41 @@ def test_password_hashing_and_verification():
     assert verify_password(password, hashed_password), "Verification of correct password should succeed"
     assert not verify_password("wrong_password", hashed_password), "Verification of wrong password should fail"
 
+def test_password_hashing_and_verification_async():
+    """
+    Testa as versões assíncronas (executadas no pool de hashing) de hash e verificação.
+    """
+    async def run() -> None:
+        hashed_password = await get_password_hash_async("a_plain_password")
+        assert await verify_password_async("a_plain_password", hashed_password)
+        assert not await verify_password_async("wrong_password", hashed_password)
+        assert verify_password("a_plain_password", hashed_password)
+
+    asyncio.run(run())
+
+def test_password_hashing_pool_rejects_when_saturated():
+    """
+    Testa o back-pressure do pool: com 1 worker e fila 1, a terceira tarefa simultânea
+    é rejeitada com PasswordHashingPoolSaturated e o slot é liberado ao final.
+    """
+    pool = PasswordHashingPool(kind="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run() -> None:
+        blocked = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.in_flight == 2
+        with pytest.raises(PasswordHashingPoolSaturated):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        assert pool.in_flight == 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+
 def test_create_and_decode_access_token():
     """
     Testa a criação de um token de acesso JWT e sua decodificação.
@@ -129,4 +176,35 @@ def test_decode_and_get_subject_invalid_cases() -> None:
     
     decoded_sub_not_string = decode_token(token_sub_not_string)
     assert decoded_sub_not_string is None, "Token with non-string 'sub' should fail decoding (return None)"
-    assert get_subject_from_token(token_sub_not_string) is None, "Subject from token with non-string 'sub' (which failed decoding) should be None"
\ No newline at end of file
+    assert get_subject_from_token(token_sub_not_string) is None, "Subject from token with non-string 'sub' (which failed decoding) should be None"
+
+
+def test_access_token_carries_typ_and_audience() -> None:
+    """
+    O access token leva header 'typ' = 'at+jwt' e 'aud' = JWT_AUDIENCE; refresh tokens e tokens
+    de recuperação de senha (mesma chave) levam 'aud' próprio e são recusados por
+    decode_access_token, assim como tokens sem 'aud'.
+    """
+    access_token = create_access_token(data={"sub": "aud_user@example.com"})
+    assert jwt.get_unverified_header(access_token)["typ"] == "at+jwt"
+    assert jwt.get_unverified_claims(access_token)["aud"] == settings.JWT_AUDIENCE
+    access_payload = decode_access_token(access_token)
+    assert access_payload is not None and access_payload["sub"] == "aud_user@example.com"
+
+    refresh_token = create_refresh_token(data={"sub": "aud_user@example.com", "fam": "f", "gen": 0})
+    assert jwt.get_unverified_claims(refresh_token)["aud"] == f"{settings.JWT_AUDIENCE}:refresh"
+    assert decode_access_token(refresh_token) is None
+    assert decode_refresh_token(refresh_token) is not None
+    assert decode_refresh_token(access_token) is None
+
+    reset_token = create_password_reset_token("aud_user@example.com")
+    assert decode_access_token(reset_token) is None
+
+    exp = datetime.now(timezone.utc) + timedelta(minutes=5)
+    no_aud_token = jwt.encode({"sub": "aud_user@example.com", "exp": exp}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    assert decode_access_token(no_aud_token) is None
+    other_aud_token = jwt.encode(
+        {"sub": "aud_user@example.com", "exp": exp, "aud": "another-service"},
+        settings.SECRET_KEY, algorithm=settings.ALGORITHM,
+    )
+    assert decode_access_token(other_aud_token) is None
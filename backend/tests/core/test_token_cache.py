@@ -0,0 +1,76 @@
+# tests/core/test_token_cache.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.core import security
+from app.core.security import create_access_token, decode_token
+from app.core.token_cache import (
+    get_verified_claims,
+    store_verified_claims,
+    token_cache,
+    token_digest,
+)
+
+# =======================================================================================================
+# --- Testes ---                                                                                    #####
+# =======================================================================================================
+
+@pytest.fixture(autouse=True)
+def clear_token_cache() -> None:
+    token_cache.clear()
+
+
+def test_decode_token_verifies_once_and_serves_repeats_from_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Testa o caminho rápido: a assinatura é verificada só na primeira decodificação do token;
+    as seguintes vêm do cache e devolvem cópias (alterar o payload não afeta o cache).
+    """
+    token = create_access_token({"sub": "cached@example.com"})
+    calls = []
+    original_decode = security.key_ring.decode
+    monkeypatch.setattr(security.key_ring, "decode", lambda t: calls.append(t) or original_decode(t))
+
+    first = decode_token(token)
+    assert first is not None and first["sub"] == "cached@example.com"
+    first["sub"] = "tampered@example.com"
+    second = decode_token(token)
+    assert second is not None and second["sub"] == "cached@example.com"
+    assert calls == [token]
+
+    assert decode_token(token + "x") is None  # token inválido não é armazenado
+    assert len(token_cache) == 1
+
+
+def test_cached_claims_honor_exp_precisely(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Testa que uma entrada em cache deixa de valer exatamente no `exp` do token (relógio de parede),
+    e que tokens sem `exp` numérico não são armazenados.
+    """
+    now = 1_000_000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+    digest = token_digest("token")
+    store_verified_claims(digest, {"sub": "a@example.com", "exp": int(now) + 10})
+    assert get_verified_claims(digest) == {"sub": "a@example.com", "exp": int(now) + 10}
+
+    now += 10
+    assert get_verified_claims(digest) is None
+    assert len(token_cache) == 0
+
+    store_verified_claims(digest, {"sub": "a@example.com"})
+    store_verified_claims(digest, {"sub": "a@example.com", "exp": int(now) - 1})
+    assert len(token_cache) == 0
+
+
+def test_expired_token_is_rejected_after_being_cached() -> None:
+    """Testa que um token decodificado com sucesso é rejeitado depois de expirar."""
+    token = create_access_token({"sub": "short@example.com"}, expires_delta=timedelta(seconds=1))
+    assert decode_token(token) is not None
+    time.sleep(2.1)  # o python-jose compara o `exp` com segundos inteiros
+    assert decode_token(token) is None
@@ -0,0 +1,51 @@
+# tests/core/test_user_purge.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from contextlib import nullcontext
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.user_purge import UserPurger
+from app.crud import user as crud_user
+from app.db.models.user import User as UserModel
+from tests.utils.user import create_random_user
+
+# =======================================================================================================
+# --- Testes para o Expurgo de Usuários Removidos ---                                               #####
+# =======================================================================================================
+
+def _purger(db_session: Session, grace_seconds: float) -> UserPurger:
+    return UserPurger(
+        session_factory=lambda: nullcontext(db_session),
+        batch_size=2,
+        pause_seconds=0.0,
+        poll_interval=0.05,
+        grace_seconds=grace_seconds,
+    )
+
+
+def _deleted_rows(db_session: Session) -> int:
+    return db_session.scalar(select(func.count()).select_from(UserModel).where(UserModel.deleted_at.is_not(None)))
+
+
+def test_purger_removes_soft_deleted_rows_in_small_batches(db_session: Session) -> None:
+    """
+    Testa que o expurgo remove fisicamente só as linhas já removidas (soft delete), em lotes
+    de no máximo batch_size, e respeita o prazo de carência.
+    """
+    live = create_random_user(db_session)
+    for _ in range(5):
+        crud_user.delete_user(db_session, create_random_user(db_session))
+    assert _deleted_rows(db_session) == 5
+
+    assert _purger(db_session, grace_seconds=3600.0).run_once() == 0
+
+    purger = _purger(db_session, grace_seconds=0.0)
+    assert [purger.run_once() for _ in range(4)] == [2, 2, 1, 0]
+    assert _deleted_rows(db_session) == 0
+    assert purger.stats() == {"running": False, "batches": 3, "purged": 5, "families_pruned": 0}
+    assert crud_user.get_user(db_session, live.id) is not None
@@ -0,0 +1,71 @@
+# tests/crud/test_refresh_token_crud.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud import refresh_token as crud_refresh_token
+from app.crud import user as crud_user
+from app.db.models.refresh_token import RefreshTokenFamily
+from app.schemas.user import UserCreate
+
+# =======================================================================================================
+# --- Testes para CRUD de Famílias de Refresh Tokens ---                                            #####
+# =======================================================================================================
+
+def test_rotate_refresh_token_family(db_session: Session) -> None:
+    """
+    Testa a rotação de uma família:
+    - A geração atual avança e retorna o e-mail atual do usuário.
+    - Uma geração antiga revoga a família; família expirada ou de usuário inativo não rotaciona.
+    """
+    user = crud_user.create_user(db_session, UserCreate(email="family@example.com", password="pw"), hashed_password="x")
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    family = crud_refresh_token.create_refresh_token_family(db_session, user_id=user.id, expires_at=expires_at)
+
+    rotation = crud_refresh_token.rotate_refresh_token_family(db_session, family_id=family.id, generation=0)
+    assert rotation is not None
+    assert rotation.email == "family@example.com" and rotation.generation == 1
+    assert crud_refresh_token.rotate_refresh_token_family(db_session, family_id=family.id, generation=0) is None
+    assert db_session.get(RefreshTokenFamily, family.id).revoked is True  # type: ignore[union-attr]
+    assert crud_refresh_token.rotate_refresh_token_family(db_session, family_id=family.id, generation=1) is None
+    assert crud_refresh_token.rotate_refresh_token_family(db_session, family_id="missing", generation=0) is None
+
+    expired = crud_refresh_token.create_refresh_token_family(
+        db_session, user_id=user.id, expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+    )
+    assert crud_refresh_token.rotate_refresh_token_family(db_session, family_id=expired.id, generation=0) is None
+
+    active = crud_refresh_token.create_refresh_token_family(db_session, user_id=user.id, expires_at=expires_at)
+    crud_user.update_user(db_session, db_user=user, user_in={"is_active": False})
+    assert crud_refresh_token.rotate_refresh_token_family(db_session, family_id=active.id, generation=0) is None
+
+
+def test_prune_refresh_token_families_removes_dead_families_in_batches(db_session: Session) -> None:
+    """
+    Testa o expurgo de famílias: saem as expiradas e as revogadas há mais da carência, em lotes
+    de no máximo `limit`; famílias válidas e revogadas recentemente ficam.
+    """
+    user = crud_user.create_user(db_session, UserCreate(email="prune@example.com", password="pw"), hashed_password="x")
+    now = datetime.now(timezone.utc)
+    create = crud_refresh_token.create_refresh_token_family
+    live = create(db_session, user_id=user.id, expires_at=now + timedelta(days=1))
+    expired = [create(db_session, user_id=user.id, expires_at=now - timedelta(seconds=1)).id for _ in range(2)]
+    revoked = create(db_session, user_id=user.id, expires_at=now + timedelta(days=1)).id
+    crud_refresh_token.revoke_refresh_token_family(db_session, family_id=revoked)
+
+    def remaining() -> set:
+        return set(db_session.scalars(select(RefreshTokenFamily.id)).all())
+
+    prune = crud_refresh_token.prune_refresh_token_families
+    assert prune(db_session, limit=1, revoked_grace_seconds=3600.0) == 1
+    assert prune(db_session, limit=10, revoked_grace_seconds=3600.0) == 1
+    assert remaining() == {live.id, revoked}
+    assert prune(db_session, limit=10, revoked_grace_seconds=0.0) == 1
+    assert remaining() == {live.id}
+    assert not set(expired) & remaining()
@@ -4,11 +4,14 @@
 # --- Importações ---                                                                               #####
 # =======================================================================================================
 
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
+from app.core.config import settings
 from app.crud import user as crud_user
-from app.schemas.user import UserCreate, UserUpdate
+from app.db.models.user import User as UserModel
+from app.schemas.user import UserCreate, UserSearchFilters, UserUpdate
 from app.core.security import verify_password
 
 # =======================================================================================================
@@ -217,4 +220,144 @@ def test_delete_user(db_session: Session) -> None:
     assert user_after_delete is None, "Usuário não deveria ser encontrado no banco após a exclusão."
 
     user_by_email_after_delete = crud_user.get_user_by_email(db=db_session, email=email_to_delete)
-    assert user_by_email_after_delete is None, "Usuário não deveria ser encontrado por e-mail após a exclusão."
\ No newline at end of file
+    assert user_by_email_after_delete is None, "Usuário não deveria ser encontrado por e-mail após a exclusão."
+
+def test_soft_delete_hides_user_and_frees_email(db_session: Session, monkeypatch: Any) -> None:
+    """
+    Testa o soft delete: a linha continua na tabela com deleted_at, mas some das leituras
+    (id, email, listagem, contagem), não aceita atualizações e o email pode ser recadastrado.
+    Com USER_SOFT_DELETE_ENABLED=False, a linha é removida imediatamente.
+    """
+    user = crud_user.create_user(db_session, UserCreate(email="soft_delete@example.com", password="password"))
+    count_before = crud_user.count_users(db_session)
+    crud_user.delete_user(db_session, user)
+
+    row = db_session.get(UserModel, user.id, populate_existing=True)
+    assert row is not None and row.deleted_at is not None
+    assert crud_user.get_user(db_session, user.id) is None
+    assert user.id not in [listed.id for listed in crud_user.get_users(db_session, limit=1000)]
+    assert crud_user.count_users(db_session) == count_before - 1
+    assert crud_user.update_user_by_id(db_session, user.id, {"full_name": "Removido"}) is None
+    assert crud_user.get_existing_emails(db_session, ["soft_delete@example.com"]) == set()
+
+    recreated = crud_user.create_user(db_session, UserCreate(email="soft_delete@example.com", password="password"))
+    assert recreated.id != user.id
+    assert crud_user.get_user_by_email(db_session, "soft_delete@example.com").id == recreated.id
+
+    monkeypatch.setattr(settings, "USER_SOFT_DELETE_ENABLED", False)
+    crud_user.delete_user(db_session, recreated)
+    db_session.expunge_all()
+    assert db_session.get(UserModel, recreated.id) is None
+
+def test_get_users_keyset_pagination(db_session: Session) -> None:
+    """
+    Testa a paginação por keyset em get_users:
+    - Páginas obtidas com `after` (keyset_values da última linha) equivalem às páginas por OFFSET.
+    - is_valid_keyset aceita apenas o formato produzido por keyset_values.
+    """
+    for i in range(6):
+        crud_user.create_user(db=db_session, user=UserCreate(email=f"keyset_{5 - i}@example.com", password="pw"))
+
+    for order_by in ("id", "email"):
+        offset_pages = [crud_user.get_users(db_session, skip=skip, limit=4, order_by=order_by) for skip in (0, 4)]
+        first_page = crud_user.get_users(db_session, limit=4, order_by=order_by)
+        after = crud_user.keyset_values(first_page[-1], order_by)
+        assert crud_user.is_valid_keyset(order_by, after)
+        second_page = crud_user.get_users(db_session, limit=4, order_by=order_by, after=after)
+        assert [u.id for u in first_page] == [u.id for u in offset_pages[0]]
+        assert [u.id for u in second_page] == [u.id for u in offset_pages[1]]
+
+    assert not crud_user.is_valid_keyset("id", ["1"])
+    assert not crud_user.is_valid_keyset("id", [True])
+    assert not crud_user.is_valid_keyset("email", [1])
+
+
+def test_create_users_bulk_falls_back_to_row_by_row_on_conflict(db_session: Session) -> None:
+    """
+    Testa create_users_bulk:
+    - Um lote sem conflitos é inserido com INSERT multi-linha, retornando os ids na ordem.
+    - Um lote com e-mail já existente (ex.: corrida com outra escrita) insere as demais
+      linhas e retorna None apenas para a linha em conflito.
+    """
+    existing = crud_user.create_user(db=db_session, user=UserCreate(email="bulk_existing@example.com", password="pw"))
+    assert crud_user.get_existing_emails(db_session, ["bulk_existing@example.com", "other@example.com"]) == {"bulk_existing@example.com"}
+
+    ids = crud_user.create_users_bulk(db_session, [
+        crud_user.user_insert_values(UserCreate(email=f"bulk_{i}@example.com", password="pw"), "hash")
+        for i in range(3)
+    ])
+    assert len(ids) == 3 and all(ids)
+    assert [crud_user.get_user(db_session, user_id=user_id).email for user_id in ids] == [  # type: ignore[union-attr]
+        "bulk_0@example.com", "bulk_1@example.com", "bulk_2@example.com"
+    ]
+
+    ids = crud_user.create_users_bulk(db_session, [
+        crud_user.user_insert_values(UserCreate(email=email, password="pw"), "hash")
+        for email in ("bulk_a@example.com", existing.email, "bulk_b@example.com")
+    ])
+    assert ids[0] is not None and ids[1] is None and ids[2] is not None
+    assert crud_user.get_user_by_email(db_session, email="bulk_b@example.com") is not None
+
+
+def test_get_users_full_name_keyset_with_nulls_both_directions(db_session: Session) -> None:
+    """
+    Testa o seek por (full_name, id) com nomes repetidos e nulos: percorrer as páginas nas
+    duas direções retorna todas as linhas exatamente uma vez, e a descendente é o inverso da ascendente.
+    """
+    filters = UserSearchFilters(email_prefix="keyset_name_")
+    for i, full_name in enumerate(["Bruno", None, "Ana", "Bruno", None, "Carla"]):
+        crud_user.create_user_by_admin(
+            db_session, UserCreate(email=f"keyset_name_{i}@example.com", password="pw", full_name=full_name), "x"
+        )
+
+    def walk(descending: bool) -> list:
+        seen, after = [], None
+        while True:
+            page = crud_user.get_users(
+                db_session, limit=2, order_by="full_name", after=after, descending=descending, filters=filters
+            )
+            seen.extend(user.email for user in page)
+            if len(page) < 2:
+                return seen
+            after = crud_user.keyset_values(page[-1], "full_name")
+            assert crud_user.is_valid_keyset("full_name", after)
+
+    ascending = walk(False)
+    assert len(ascending) == 6 and len(set(ascending)) == 6
+    assert ascending[-2:] == ["keyset_name_1@example.com", "keyset_name_4@example.com"]
+    assert walk(True) == ascending[::-1]
+
+
+def test_user_changes_deliver_writes_committed_out_of_order(db_session: Session, monkeypatch: Any) -> None:
+    """
+    Testa o delta sync com o snapshot do PostgreSQL (simulado): uma escrita com change_seq menor
+    confirmada depois de outra com change_seq maior ainda é entregue, porque o watermark só
+    passa do change_seq N quando o xmin chega ao xmax lido junto com N.
+    """
+    horizons: List[Tuple[int, int, int]] = []
+    monkeypatch.setattr(crud_user, "_change_horizon", lambda db: horizons[-1])
+    last_seq = db_session.scalar(select(func.max(UserModel.change_seq))) or 0
+    horizons.append((last_seq, 5, 5))  # nada em andamento: tudo até last_seq assentado
+    position = crud_user.get_user_changes(db_session, limit=1000).position
+    assert position.settled == last_seq and position.pending is None
+
+    # A transação 10 recebeu change_seq = last_seq + 1 e ainda não confirmou; a 11 confirma last_seq + 2.
+    later = crud_user.create_user(db_session, UserCreate(email="later@example.com", password="pw"))
+    db_session.execute(update(UserModel).where(UserModel.id == later.id).values(change_seq=last_seq + 2))
+    db_session.commit()
+    horizons.append((last_seq + 2, 10, 12))
+    changes = crud_user.get_user_changes(db_session, position)
+    assert changes.users == [] and changes.position.pending == (last_seq + 2, 12)
+
+    earlier = crud_user.create_user(db_session, UserCreate(email="earlier@example.com", password="pw"))
+    db_session.execute(update(UserModel).where(UserModel.id == earlier.id).values(change_seq=last_seq + 1))
+    db_session.commit()
+    horizons.append((last_seq + 3, 11, 14))  # a 10 terminou, mas a 11 ainda não: nada assentado
+    changes = crud_user.get_user_changes(db_session, changes.position)
+    assert changes.users == []
+
+    horizons.append((last_seq + 3, 12, 14))
+    changes = crud_user.get_user_changes(db_session, changes.position)
+    assert [user.email for user in changes.users] == ["earlier@example.com", "later@example.com"]
+    assert changes.position.after == (last_seq + 2, later.id)
+    assert changes.position.settled == last_seq + 2 and changes.position.pending == (last_seq + 3, 14)
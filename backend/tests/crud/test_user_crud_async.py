@@ -0,0 +1,97 @@
+# tests/crud/test_user_crud_async.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import user as crud_user
+from app.schemas.user import UserCreate, UserUpdate
+from app.core.security import verify_password
+
+pytestmark = pytest.mark.anyio
+
+# =======================================================================================================
+# --- Testes para CRUD Assíncrono de Usuário ---                                                    #####
+# =======================================================================================================
+
+async def test_create_and_get_user_async(async_db_session: AsyncSession) -> None:
+    """
+    Testa a criação de usuário e as buscas por e-mail e ID usando AsyncSession.
+    """
+    user_in = UserCreate(email="async_create@example.com", password="testpassword123", full_name="Async User")
+    db_user = await crud_user.create_user_async(db=async_db_session, user=user_in)
+
+    assert db_user.id is not None
+    assert db_user.is_active is True
+    assert db_user.is_superuser is False
+    assert verify_password("testpassword123", db_user.hashed_password)
+
+    by_email = await crud_user.get_user_by_email_async(async_db_session, email="async_create@example.com")
+    assert by_email is not None and by_email.id == db_user.id
+
+    by_id = await crud_user.get_user_async(async_db_session, user_id=db_user.id)
+    assert by_id is not None and by_id.email == "async_create@example.com"
+
+    assert await crud_user.get_user_by_email_async(async_db_session, email="missing@example.com") is None
+    assert await crud_user.get_user_async(async_db_session, user_id=999999) is None
+
+
+async def test_create_user_by_admin_and_get_users_async(async_db_session: AsyncSession) -> None:
+    """
+    Testa a criação de usuários por admin (com flags) e a listagem paginada usando AsyncSession.
+    """
+    for i in range(5):
+        await crud_user.create_user_by_admin_async(
+            db=async_db_session,
+            user=UserCreate(email=f"async_admin_{i}@example.com", password="pw", is_superuser=(i == 0)),
+            hashed_password="precomputed-hash",
+        )
+
+    users = await crud_user.get_users_async(async_db_session, skip=0, limit=3)
+    assert len(users) == 3
+    assert users[0].is_superuser is True
+    assert users[0].hashed_password == "precomputed-hash"
+
+    remaining = await crud_user.get_users_async(async_db_session, skip=3, limit=10)
+    assert [u.email for u in remaining] == ["async_admin_3@example.com", "async_admin_4@example.com"]
+
+
+async def test_update_and_delete_user_async(async_db_session: AsyncSession) -> None:
+    """
+    Testa a atualização (incluindo senha) e a deleção de um usuário usando AsyncSession.
+    """
+    db_user = await crud_user.create_user_async(
+        db=async_db_session, user=UserCreate(email="async_update@example.com", password="old_password")
+    )
+
+    updated = await crud_user.update_user_async(
+        db=async_db_session,
+        db_user=db_user,
+        user_in=UserUpdate(full_name="Updated Async", password="new_password", is_active=False),
+    )
+    assert updated.full_name == "Updated Async"
+    assert updated.is_active is False
+    assert verify_password("new_password", updated.hashed_password)
+
+    await crud_user.delete_user_async(db=async_db_session, db_user=updated)
+    assert await crud_user.get_user_async(async_db_session, user_id=db_user.id) is None
+
+
+async def test_iter_user_export_batches_async(async_db_session: AsyncSession) -> None:
+    """
+    Testa a exportação em lotes via AsyncSession.stream: todas as linhas, em ordem de id, sem senha.
+    """
+    for i in range(5):
+        await crud_user.create_users_bulk_async(
+            async_db_session,
+            [crud_user.user_insert_values(UserCreate(email=f"async_export_{i}@example.com", password="pw"), "hash")],
+        )
+
+    batches = [batch async for batch in crud_user.iter_user_export_batches_async(async_db_session, batch_size=2)]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    rows = [tuple(row) for batch in batches for row in batch]
+    assert [row[1] for row in rows] == [f"async_export_{i}@example.com" for i in range(5)]
+    assert len(rows[0]) == len(crud_user.USER_EXPORT_COLUMNS)
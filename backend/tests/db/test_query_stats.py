@@ -0,0 +1,110 @@
+# tests/db/test_query_stats.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import contextvars
+import logging
+from typing import Dict, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from app.api.server_timing import ServerTimingMiddleware
+from app.core.config import settings
+from app.db.query_stats import _STARTED_KEY, begin_request_stats, install_query_listeners
+
+# =======================================================================================================
+# --- Testes para Instrumentação de Consultas ---                                                   #####
+# =======================================================================================================
+
+def test_listeners_record_queries_of_the_current_context(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    """
+    Testa que as consultas entram nas estatísticas do contexto em que foram iniciadas (e não
+    nas de outro contexto), com o statement mais lento e o log de consulta lenta.
+    """
+    install_query_listeners()
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+
+    def run_request(statements: List[str]) -> Dict[str, object]:
+        stats = begin_request_stats()
+        with engine.connect() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+        return stats.snapshot()
+
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_SECONDS", 3600.0)
+    first = contextvars.copy_context().run(run_request, ["SELECT 1", "SELECT 2"])
+    second = contextvars.copy_context().run(run_request, ["SELECT 3"])
+    assert first["queries"] == 2 and second["queries"] == 1
+    assert first["slow_queries"] == 0
+    assert first["slowest_statement"] in ("SELECT 1", "SELECT 2")
+
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_SECONDS", 0.0)
+    with caplog.at_level(logging.WARNING, logger="app.db.query_stats"):
+        slow = contextvars.copy_context().run(run_request, ["SELECT 42"])
+    assert slow["slow_queries"] == 1
+    assert any("SELECT 42" in record.getMessage() for record in caplog.records)
+    engine.dispose()
+
+
+def test_failed_statement_does_not_leave_start_time_on_connection() -> None:
+    """
+    Testa que um statement que falha (sem after_cursor_execute) não deixa o início cronometrado
+    na conexão, que volta ao pool e é reutilizada.
+    """
+    install_query_listeners()
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        assert connection.info.get(_STARTED_KEY) == []
+    engine.dispose()
+
+
+def test_server_timing_middleware_header_and_sampled_log(caplog: pytest.LogCaptureFixture) -> None:
+    """
+    Testa o cabeçalho Server-Timing (consultas, tempo no banco, mais lenta) e a amostragem do
+    log estruturado por request.
+    """
+    install_query_listeners()
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    demo = FastAPI()
+
+    @demo.get("/three")
+    def three_queries() -> Dict[str, int]:
+        with engine.connect() as connection:
+            for value in range(3):
+                connection.execute(text(f"SELECT {value}"))
+        return {"ok": 1}
+
+    @demo.get("/none")
+    def no_queries() -> Dict[str, int]:
+        return {"ok": 1}
+
+    sampled = [0.5]
+    demo.add_middleware(ServerTimingMiddleware, sample_rate=0.25, rng=lambda: sampled[0])
+    with TestClient(demo) as client, caplog.at_level(logging.INFO, logger="app.api.server_timing"):
+        response = client.get("/three")
+        assert 'db;dur=' in response.headers["Server-Timing"]
+        assert 'desc="3 queries"' in response.headers["Server-Timing"]
+        assert "db-slowest;dur=" in response.headers["Server-Timing"]
+        assert 'desc="0 queries"' in client.get("/none").headers["Server-Timing"]
+        assert not caplog.records
+
+        sampled[0] = 0.1
+        client.get("/three")
+    assert len(caplog.records) == 1
+    record = caplog.records[0]
+    assert record.http_path == "/three" and record.http_status == 200  # type: ignore[attr-defined]
+    assert record.db["queries"] == 3  # type: ignore[attr-defined]
+    engine.dispose()
@@ -0,0 +1,125 @@
+# tests/db/test_routing.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.db.base_class import Base
+from app.db.models.user import User as UserModel
+from app.db.routing import CLIENT_KEY, ReplicaRouter, RoutingSession, client_key, read_from_primary
+
+# =======================================================================================================
+# --- Helpers ---                                                                                   #####
+# =======================================================================================================
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_database(path: Path, marker: str) -> Engine:
+    """Cria um banco SQLite com um único usuário cujo e-mail identifica o banco."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(UserModel).values(email=f"{marker}@example.com", hashed_password="x"))
+    return engine
+
+
+def served_by(session: RoutingSession) -> List[str]:
+    return list(session.scalars(select(UserModel.email).order_by(UserModel.id)).all())
+
+# =======================================================================================================
+# --- Testes para Roteamento de Réplicas ---                                                        #####
+# =======================================================================================================
+
+def test_routing_session_reads_from_replica_and_sticks_to_primary_after_write(tmp_path: Path) -> None:
+    """
+    Testa que leituras vão para a réplica, escritas para o primário e que, após escrever,
+    a sessão e o cliente (durante a janela) passam a ler do primário.
+    """
+    clock = FakeClock()
+    primary = make_database(tmp_path / "primary.db", "primary")
+    replica = make_database(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [replica], pin_seconds=5.0, clock=clock)
+
+    with RoutingSession(router=router, info={CLIENT_KEY: "client-a"}) as session:
+        assert served_by(session) == ["replica@example.com"]
+        session.add(UserModel(email="new@example.com", hashed_password="x"))
+        session.commit()
+        assert served_by(session) == ["primary@example.com", "new@example.com"]
+
+    with RoutingSession(router=router, info={CLIENT_KEY: "client-a"}) as session:
+        assert served_by(session)[0] == "primary@example.com"
+    with RoutingSession(router=router, info={CLIENT_KEY: "client-b"}) as session:
+        assert served_by(session) == ["replica@example.com"]
+
+    clock.now = 6.0
+    with RoutingSession(router=router, info={CLIENT_KEY: "client-a"}) as session:
+        assert served_by(session) == ["replica@example.com"]
+
+
+def test_read_from_primary_routes_reads_without_pinning_the_client(tmp_path: Path) -> None:
+    """Testa que read_from_primary leva ao primário as leituras do bloco, sem fixar o cliente."""
+    primary = make_database(tmp_path / "primary.db", "primary")
+    replica = make_database(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [replica], pin_seconds=5.0)
+
+    with RoutingSession(router=router, info={CLIENT_KEY: "client-a"}) as session:
+        with read_from_primary(session):
+            assert served_by(session) == ["primary@example.com"]
+        assert served_by(session) == ["replica@example.com"]
+        session.commit()
+    assert not router.is_pinned("client-a")
+
+
+def test_replica_router_round_robin_and_health(tmp_path: Path) -> None:
+    """
+    Testa o rodízio entre réplicas, a retirada de uma réplica que falha ao conectar
+    e sua volta ao rodízio depois de retry_seconds.
+    """
+    clock = FakeClock()
+    primary = make_database(tmp_path / "primary.db", "primary")
+    replica_1 = make_database(tmp_path / "replica1.db", "replica1")
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica2.db'}")
+    router = ReplicaRouter(primary, [replica_1, broken], retry_seconds=10.0, clock=clock)
+
+    assert [router.choose_replica() for _ in range(4)] == [replica_1, broken, replica_1, broken]
+
+    with RoutingSession(router=router) as session:
+        served_by(session)  # replica_1
+    with RoutingSession(router=router) as session, pytest.raises(OperationalError):
+        served_by(session)  # réplica quebrada: falha e sai do rodízio
+    assert router.stats()["replicas_down"] == [1]
+    assert [router.choose_replica() for _ in range(3)] == [replica_1] * 3
+
+    clock.now = 11.0
+    assert router.stats()["replicas_down"] == []
+    assert {router.choose_replica() for _ in range(2)} == {replica_1, broken}
+
+
+def test_routing_session_without_replicas_uses_bind_and_client_key() -> None:
+    """
+    Testa que sem réplicas a sessão usa o bind normal, e que a chave do cliente não
+    expõe o token (hash) e recorre ao IP quando não há token.
+    """
+    engine = create_engine("sqlite://")
+    router = ReplicaRouter(engine)
+    with RoutingSession(router=router, bind=engine) as session:
+        assert session.get_bind() is engine
+
+    key = client_key("Bearer secret-token", "10.0.0.1")
+    assert key is not None and key.startswith("token:") and "secret-token" not in key
+    assert client_key(None, "10.0.0.1") == "ip:10.0.0.1"
+    assert client_key(None, None) is None
@@ -0,0 +1,163 @@
+# tests/test_serve.py
+
+# =======================================================================================================
+# --- Importações ---                                                                               #####
+# =======================================================================================================
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from app import serve
+from app.core.config import settings
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# =======================================================================================================
+# --- Fixtures e Helpers ---                                                                        #####
+# =======================================================================================================
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_health(port: int, timeout: float) -> int:
+    """Repete GET /health até o servidor responder ou o prazo expirar."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=5) as response:
+                return response.status
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+# =======================================================================================================
+# --- Testes para o Runner de Produção ---                                                          #####
+# =======================================================================================================
+
+def test_worker_count_and_max_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Testa que o número de workers segue SERVER_WORKERS (padrão 1; 0 usa as CPUs disponíveis) e
+    que o limite de requests recebe o jitter (0 desativa a reciclagem).
+    """
+    assert type(settings).model_fields["SERVER_WORKERS"].default == 1
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 3)
+    assert serve.worker_count() == 3
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 0)
+    assert serve.worker_count() == len(os.sched_getaffinity(0))
+
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS", 0)
+    assert serve.max_requests_for_worker() is None
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS", 100)
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS_JITTER", 10)
+    limits = {serve.max_requests_for_worker() for _ in range(50)}
+    assert all(limit is not None and 100 <= limit <= 110 for limit in limits)
+    assert len(limits) > 1
+
+
+def test_multi_worker_conflicts_and_proxy_config(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Testa que o estado por processo (limite de login em memória, leitura das próprias escritas
+    com réplicas, cache de principal) impede mais de um worker e que os proxies confiáveis
+    chegam ao uvicorn.
+    """
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["sqlite://"])
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "PRINCIPAL_CACHE_ENABLED", True)
+    assert len(serve.multi_worker_conflicts()) == 3
+
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "resp")
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "PRINCIPAL_CACHE_ENABLED", False)
+    assert serve.multi_worker_conflicts() == []
+
+    monkeypatch.setattr(settings, "SERVER_FORWARDED_ALLOW_IPS", "10.0.0.0/8")
+    config = serve.build_config(object())
+    assert config.proxy_headers is True
+    assert config.forwarded_allow_ips == "10.0.0.0/8"
+
+
+def test_arbiter_reuses_free_slots() -> None:
+    """Testa que um worker substituído herda a posição do anterior (o 0 roda as threads de segundo plano)."""
+    arbiter = serve.Arbiter(object(), socket.socket(), workers=3)
+    arbiter.sock.close()
+    assert arbiter.free_slots() == [0, 1, 2]
+    arbiter.slots = {101: 1, 102: 2}
+    assert arbiter.free_slots() == [0]
+
+
+def test_serve_refuses_multiple_workers_with_process_local_state(tmp_path: Path) -> None:
+    """Testa que o runner não inicia com vários workers e o limite de login em memória."""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'serve.db'}",
+        "CACHE_BACKEND": "memory",
+        "LOGIN_RATE_LIMIT_ENABLED": "true",
+        "SERVER_BIND_PORT": str(_free_port()),
+        "SERVER_WORKERS": "2",
+    }
+    result = subprocess.run(
+        [sys.executable, "-m", "app.serve"], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 2
+    assert "CACHE_BACKEND=resp" in result.stderr
+
+
+def test_serve_recycles_workers_and_drains_on_sigterm(tmp_path: Path) -> None:
+    """
+    Testa o runner em um processo real: os workers são reciclados após SERVER_MAX_REQUESTS
+    (e substituídos sem recusar requests) e o SIGTERM no mestre encerra tudo com código 0.
+    """
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'serve.db'}",
+        "EMAIL_WORKER_ENABLED": "false",
+        "USER_PURGE_ENABLED": "false",
+        "LOGIN_RATE_LIMIT_ENABLED": "false",
+        "PRINCIPAL_CACHE_ENABLED": "false",
+        "SERVER_BIND_HOST": "127.0.0.1",
+        "SERVER_BIND_PORT": str(port),
+        "SERVER_WORKERS": "2",
+        "SERVER_MAX_REQUESTS": "2",
+        "SERVER_GRACEFUL_TIMEOUT_SECONDS": "5",
+    }
+    log_path = tmp_path / "serve.log"
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.serve"], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            assert _get_health(port, timeout=30) == 200
+            # O uvicorn verifica o limite de requests a cada ~1s: segue atendendo até a reciclagem.
+            deadline = time.monotonic() + 30
+            while "(reciclagem)" not in log_path.read_text() and time.monotonic() < deadline:
+                assert _get_health(port, timeout=10) == 200
+                time.sleep(0.05)
+            for _ in range(5):
+                assert _get_health(port, timeout=10) == 200
+        finally:
+            process.send_signal(signal.SIGTERM)
+            try:
+                exit_code = process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                raise
+
+    output = log_path.read_text()
+    assert exit_code == 0, output
+    assert "(reciclagem)" in output
+    assert "Encerrando" in output
@@ -0,0 +1,119 @@
+# tests/utils/resp_server.py
+
+"""
+Servidor RESP2 mínimo em memória (loopback, porta efêmera) para testar o RespCacheBackend sem
+depender de um Redis real. Suporta PING, AUTH, SELECT, GET, MGET, SET (PX/NX), INCRBY, PEXPIRE,
+DEL e FLUSHALL.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeRespServer:
+    def __init__(self, password: Optional[str] = None) -> None:
+        self.password = password
+        self.data: Dict[bytes, Tuple[Optional[float], bytes]] = {}
+        self.commands: List[bytes] = []
+        self.connections = 0
+        self.open_connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        port = self._server.sockets[0].getsockname()[1]
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{port}/0"
+
+    async def start(self) -> "FakeRespServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _run(self, args: List[bytes], authenticated: bool) -> Tuple[bytes, bool]:
+        command = args[0].upper()
+        self.commands.append(command)
+        if command == b"AUTH":
+            if args[-1].decode() == self.password:
+                return b"+OK\r\n", True
+            return b"-WRONGPASS invalid password\r\n", False
+        if self.password and not authenticated:
+            return b"-NOAUTH Authentication required.\r\n", False
+        if command in (b"PING",):
+            return b"+PONG\r\n", authenticated
+        if command in (b"SELECT", b"FLUSHALL"):
+            if command == b"FLUSHALL":
+                self.data.clear()
+            return b"+OK\r\n", authenticated
+        if command == b"GET":
+            value = self._get(args[1])
+            return (b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)), authenticated
+        if command == b"SET":
+            key, value, options = args[1], args[2], [option.upper() for option in args[3:]]
+            if b"NX" in options and self._get(key) is not None:
+                return b"$-1\r\n", authenticated
+            expires_at = None
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+            self.data[key] = (expires_at, value)
+            return b"+OK\r\n", authenticated
+        if command == b"MGET":
+            values = [self._get(key) for key in args[1:]]
+            parts = [b"*%d\r\n" % len(values)]
+            parts += [b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value) for value in values]
+            return b"".join(parts), authenticated
+        if command == b"INCRBY":
+            key = args[1]
+            entry = self.data.get(key)
+            expires_at = entry[0] if entry is not None and self._get(key) is not None else None
+            value = int(self._get(key) or 0) + int(args[2])
+            self.data[key] = (expires_at, str(value).encode())
+            return b":%d\r\n" % value, authenticated
+        if command == b"PEXPIRE":
+            value = self._get(args[1])
+            if value is None:
+                return b":0\r\n", authenticated
+            self.data[args[1]] = (time.monotonic() + int(args[2]) / 1000, value)
+            return b":1\r\n", authenticated
+        if command == b"DEL":
+            removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+            return b":%d\r\n" % removed, authenticated
+        return b"-ERR unknown command '%s'\r\n" % command, authenticated
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.open_connections += 1
+        authenticated = False
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                reply, authenticated = self._run(args, authenticated)
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
@@ -0,0 +1,107 @@
+# tests/utils/smtp_server.py
+
+"""
+Servidor SMTP mínimo em memória (loopback, porta efêmera, uma thread por conexão) para testar
+a fila de emails sem um servidor real. Suporta EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP e QUIT
+(sem STARTTLS/AUTH). `replies` permite forçar respostas ao DATA (ex.: 451 temporário, 550
+permanente), consumidas na ordem.
+"""
+
+import socketserver
+import threading
+from typing import List, NamedTuple, Optional
+
+
+class ReceivedMessage(NamedTuple):
+    mail_from: str
+    recipients: List[str]
+    data: str
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_TCPServer"
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self) -> None:
+        fake = self.server.fake
+        with fake.lock:
+            fake.connections += 1
+        self._reply("220 fake-smtp ready")
+        mail_from: Optional[str] = None
+        recipients: List[str] = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode().rstrip("\r\n")
+            command = line[:4].upper()
+            with fake.lock:
+                fake.commands.append(command)
+            if command in ("EHLO", "HELO"):
+                self._reply("250-fake-smtp\r\n250 8BITMIME" if command == "EHLO" else "250 fake-smtp")
+            elif command == "MAIL":
+                mail_from, recipients = line.split(":", 1)[1].strip(" <>").split(">")[0], []
+                self._reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(line.split(":", 1)[1].strip(" <>"))
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline().decode()
+                    if data_line in (".\r\n", ".\n", ""):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith("..") else data_line)
+                with fake.lock:
+                    reply = fake.replies.pop(0) if fake.replies else None
+                    if reply is None:
+                        fake.messages.append(ReceivedMessage(mail_from or "", recipients, "".join(lines)))
+                self._reply(reply or "250 OK queued")
+                mail_from, recipients = None, []
+            elif command == "RSET":
+                mail_from, recipients = None, []
+                self._reply("250 OK")
+            elif command == "NOOP":
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    fake: "FakeSMTPServer"
+
+
+class FakeSMTPServer:
+    def __init__(self) -> None:
+        self.messages: List[ReceivedMessage] = []
+        self.commands: List[str] = []
+        self.replies: List[str] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._server: Optional[_TCPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None
+        return self._server.server_address[1]
+
+    def start(self) -> "FakeSMTPServer":
+        self._server = _TCPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,61 @@
+# tests/utils/webhook_server.py
+
+"""
+Receptor HTTP mínimo em memória (loopback, porta efêmera) no papel do webhook do relay do
+outbox. Guarda o corpo JSON de cada POST recebido com sucesso; `statuses` permite forçar
+respostas (ex.: 503), consumidas na ordem antes das respostas 204 padrão.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+
+    def do_POST(self) -> None:
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with fake.lock:
+            status = fake.statuses.pop(0) if fake.statuses else 204
+            if status < 300:
+                fake.received.append(json.loads(body))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeWebhookServer"
+
+
+class FakeWebhookServer:
+    def __init__(self) -> None:
+        self.received: List[Any] = []
+        self.statuses: List[int] = []
+        self.lock = threading.Lock()
+        self._server: Optional[_HTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        return f"http://127.0.0.1:{self._server.server_address[1]}/events"
+
+    def start(self) -> "FakeWebhookServer":
+        self._server = _HTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()